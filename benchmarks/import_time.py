@@ -0,0 +1,61 @@
+"""Measure the time to import the modules in code/.
+
+Every import is measured in a fresh interpreter, as in a newly spawned
+worker process. The script also lists which of the heavy dependencies
+were imported along with the module.
+
+Usage: python import_time.py [--repeat N] [module ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+CODE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "..", "code")
+MODULES = ["knapsack", "resources", "native", "optimization", "simulation",
+           "sampling", "linqaoa", "quadqaoa", "qwqaoa", "circuits",
+           "visualization"]
+HEAVY_DEPENDENCIES = ["qiskit", "qiskit_aer", "matplotlib", "scipy.optimize",
+                      "scipy.sparse"]
+
+MEASUREMENT = """
+import sys, time, json
+sys.path.insert(0, {directory!r})
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [name for name in {dependencies!r}
+                            if name in sys.modules]]))
+"""
+
+
+def measure(module, repeat=5):
+    """Return the median import time of module and its heavy dependencies."""
+    times = []
+    for __ in range(repeat):
+        code = MEASUREMENT.format(directory=CODE_DIRECTORY, module=module,
+                                  dependencies=HEAVY_DEPENDENCIES)
+        output = subprocess.run([sys.executable, "-c", code], check=True,
+                                capture_output=True, text=True).stdout
+        seconds, dependencies = json.loads(output.splitlines()[-1])
+        times.append(seconds)
+    return statistics.median(times), dependencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(f"{'module':<15}{'median [s]':>12}  heavy dependencies")
+    for module in args.modules:
+        seconds, dependencies = measure(module, args.repeat)
+        print(f"{module:<15}{seconds:>12.3f}  {', '.join(dependencies) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Compare the optimizers of optimizers.py by their evaluations to a target.
+
+For every approach and depth p, every optimizer optimizes the angles of
+random instances with the native simulation, each with several seeds. The
+target is relative to the approximation ratio that SHGO, the default of
+optimization.optimize_angles, reaches on the same instance without a
+budget, as the ratios reachable at low p differ widely between the
+approaches. The report lists how often an optimizer reached the target
+and the median evaluations and seconds it needed, and names the cheapest
+optimizer per approach and depth, i.e. the one reaching the target most
+often with the fewest evaluations.
+
+Usage: python optimizers.py [--target FRACTION] [--budget N] [--instances N]
+       [--N N] [--seeds N] [--p P ...] [--approach NAME ...]
+       [--optimizer NAME ...] [--output FILE]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "code"))
+
+import instances
+import knapsack
+import linqaoa
+import native
+import optimization
+import optimizers
+import problem_tables
+import quadqaoa
+
+
+def simulation_and_penalties(approach, problem, p):
+    if approach == "linqaoa":
+        return native.NativeLinQAOA(problem, p), (2 * linqaoa.amin(problem),)
+    if approach == "quadqaoa":
+        return (native.NativeQuadQAOA(problem, p),
+                (1, 2 * quadqaoa.bmin(1, problem)))
+    return native.NativeQuantumWalkQAOA(problem, p, 1), ()
+
+
+def run(approach, p, names, target, budget, problems, seeds):
+    """Return the reports of all optimizers for all problems.
+
+    The target of an instance is the fraction target of the approximation
+    ratio of the angles found by SHGO."""
+    reports = []
+    for index, problem in enumerate(problems):
+        simulation, penalties = simulation_and_penalties(approach, problem, p)
+        best = knapsack.value(
+            problem_tables.best_known_solutions(problem)[0], problem)
+
+        def angles_to_value(angles):
+            return - simulation.expectation_value(angles, *penalties)
+
+        def angles_to_ratio(angles):
+            return (simulation.comparable_expectation_value(angles, *penalties)
+                    / best)
+
+        gamma_range = simulation.gamma_range(*penalties)
+        beta_range = simulation.beta_range()
+        reference = angles_to_ratio(optimization.optimize_angles(
+            p, angles_to_value, gamma_range, beta_range))
+        for report in optimizers.evaluations_to_target(
+                names, p, angles_to_value, gamma_range, beta_range,
+                angles_to_ratio, target * reference, budget, seeds):
+            reports.append({"approach": approach, "p": p, "instance": index,
+                            "reference": reference,
+                            "target": target * reference, **report})
+    return reports
+
+
+def summary(reports):
+    """Return per optimizer the rate of reaching the target and the medians."""
+    rows = {}
+    for name in dict.fromkeys(report["optimizer"] for report in reports):
+        runs = [report for report in reports if report["optimizer"] == name]
+        reached = [report for report in runs if report["reached"]]
+        rows[name] = {
+            "rate": len(reached) / len(runs),
+            "evaluations": statistics.median(
+                [report["target_evaluations"] for report in reached] or [None]),
+            "seconds": statistics.median(
+                [report["target_seconds"] for report in reached] or [None]),
+        }
+    return rows
+
+
+def cheapest(rows):
+    """Return the optimizer reaching the target most often and fastest, or None."""
+    name = min(rows, key=lambda name: (-rows[name]["rate"],
+                                       rows[name]["evaluations"] or 0))
+    return name if rows[name]["rate"] > 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", type=float, default=0.95,
+                        help="fraction of the ratio reached by SHGO")
+    parser.add_argument("--budget", type=int, default=200)
+    parser.add_argument("--instances", type=int, default=3)
+    parser.add_argument("--N", type=int, default=5)
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--p", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--approach", nargs="+",
+                        default=["linqaoa", "quadqaoa", "qwqaoa"])
+    parser.add_argument("--optimizer", nargs="+",
+                        default=list(optimizers.OPTIMIZERS))
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    problems = [instances.random_problem(args.N, R=5, seed=seed)
+                for seed in range(args.instances)]
+    reports = []
+    for approach in args.approach:
+        for p in args.p:
+            results = run(approach, p, args.optimizer, args.target,
+                          args.budget, problems, range(args.seeds))
+            rows = summary(results)
+            reference = statistics.median(report["reference"]
+                                          for report in results)
+            name = cheapest(rows)
+            print(f"{approach} p={p}, median SHGO ratio {reference:.3f}, "
+                  + (f"cheapest: {name}" if name is not None else
+                     "no optimizer reached the target"))
+            for name, row in rows.items():
+                evaluations = row["evaluations"]
+                seconds = row["seconds"]
+                print(f"  {name:<24}{row['rate']:>6.0%}"
+                      f"{evaluations if evaluations is not None else '-':>8}"
+                      + (f"{seconds:>10.3f}s" if seconds is not None else ""),
+                      flush=True)
+            reports.extend(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
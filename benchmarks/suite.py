@@ -0,0 +1,208 @@
+"""Benchmark suite for the three approaches.
+
+For every approach and every point of a grid over N, p and m, the suite
+times the construction and the transpilation of the circuit, a single
+evaluation of the objective function with qiskit and natively, and
+optionally a full find_optimal_angles. Every case runs in a fresh process,
+so its peak memory (the maximum resident set size) can be recorded. The
+results are stored as JSON, together with the commit they were measured
+at, and two result files can be compared.
+
+Usage:
+python suite.py [--quick] [--optimize] [--repeat N] [--output FILE]
+python suite.py --compare OLD NEW [--threshold RATIO]
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+
+CODE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "..", "code")
+
+GRID = {
+    "linqaoa": {"N": [3, 4, 5, 6], "p": [1, 2, 3]},
+    "quadqaoa": {"N": [3, 4], "p": [1, 2]},
+    "qwqaoa": {"N": [3, 4, 5], "p": [1, 2], "m": [1, 3]},
+}
+QUICK_GRID = {
+    "linqaoa": {"N": [3], "p": [1]},
+    "quadqaoa": {"N": [3], "p": [1]},
+    "qwqaoa": {"N": [3], "p": [1], "m": [1]},
+}
+
+
+def cases(grid):
+    """Yield the cases of a grid as dicts of approach, N, p and m."""
+    for approach, axes in grid.items():
+        for values in itertools.product(*axes.values()):
+            yield {"approach": approach, **dict(zip(axes, values))}
+
+
+def case_name(case):
+    return " ".join(f"{key}={value}" for key, value in case.items())
+
+
+def generated_problem(N, seed=0):
+    """Return a random uncorrelated instance with N items and weights up to 5."""
+    import instances
+    return instances.random_problem(N, R=5, seed=seed)
+
+
+def best_time(function, repeat):
+    """Return the minimum time of repeat calls of function."""
+    times = []
+    for __ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_case(case, repeat=3, optimize=False):
+    """Run a case and return the times of its stages and its peak memory."""
+    sys.path.insert(0, CODE_DIRECTORY)
+    import numpy as np
+    from qiskit import transpile
+    import circuits
+    import linqaoa
+    import quadqaoa
+    import qwqaoa
+    import native
+    import simulation as sim
+
+    problem = generated_problem(case["N"])
+    p = case["p"]
+    angles = np.linspace(0.1, 1, 2 * p)
+    if case["approach"] == "linqaoa":
+        a = 2 * linqaoa.amin(problem)
+        build = lambda: circuits.LinQAOA(problem, p)
+        native_circuit = native.NativeLinQAOA(problem, p)
+        evaluate = lambda circuit: linqaoa.get_expectation_value(
+            circuit, problem, angles, a)
+        find_angles = lambda circuit: linqaoa.find_optimal_angles(
+            circuit, problem, a)
+    elif case["approach"] == "quadqaoa":
+        a = 1
+        b = 2 * quadqaoa.bmin(a, problem)
+        build = lambda: circuits.QuadQAOA(problem, p)
+        native_circuit = native.NativeQuadQAOA(problem, p)
+        evaluate = lambda circuit: quadqaoa.get_expectation_value(
+            circuit, problem, angles, a, b)
+        find_angles = lambda circuit: quadqaoa.find_optimal_angles(
+            circuit, problem, a, b)
+    else:
+        m = case["m"]
+        build = lambda: circuits.QuantumWalkQAOA(problem, p, m)
+        native_circuit = native.NativeQuantumWalkQAOA(problem, p, m)
+        evaluate = lambda circuit: qwqaoa.get_expectation_value(
+            circuit, problem, angles)
+        find_angles = lambda circuit: qwqaoa.find_optimal_angles(
+            circuit, problem)
+
+    circuit = build()
+    times = {
+        "build": best_time(build, repeat),
+        "transpile": best_time(lambda: transpile(circuit, sim.backend), repeat),
+    }
+    sim.transpile_circuit(circuit)
+    times["evaluate"] = best_time(lambda: evaluate(circuit), repeat)
+    times["evaluate_native"] = best_time(lambda: evaluate(native_circuit),
+                                         repeat)
+    times["optimize_native"] = best_time(lambda: find_angles(native_circuit), 1)
+    if optimize:
+        times["optimize"] = best_time(lambda: find_angles(circuit), 1)
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {"case": case, "times": times, "peak_memory": peak_memory,
+            "qubits": circuit.num_qubits}
+
+
+def commit():
+    """Return the current commit, or None outside of a git repository."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], check=True,
+                              capture_output=True, text=True,
+                              cwd=CODE_DIRECTORY).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(grid, repeat=3, optimize=False):
+    """Run all cases of grid, each in a fresh process, and return the results."""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases(grid):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_case, (case, repeat, optimize))
+        print(f"{case_name(case):<30}"
+              + " ".join(f"{stage}={seconds:.3f}s"
+                         for stage, seconds in result["times"].items())
+              + f" peak={result['peak_memory'] / 2**20:.0f}MiB", flush=True)
+        results.append(result)
+    return {
+        "commit": commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(old, new, threshold=1.2):
+    """Print the ratios new/old of the times of the cases in both files.
+
+    Returns the number of stages slower by more than threshold."""
+    old_times = {case_name(result["case"]): result["times"]
+                 for result in old["results"]}
+    regressions = 0
+    print(f"{old['commit']} -> {new['commit']}")
+    for result in new["results"]:
+        name = case_name(result["case"])
+        if name not in old_times:
+            continue
+        for stage, seconds in result["times"].items():
+            if stage not in old_times[name]:
+                continue
+            ratio = seconds / old_times[name][stage]
+            marker = " slower" if ratio > threshold else ""
+            if ratio > threshold:
+                regressions += 1
+            print(f"{name:<30}{stage:<16}{ratio:>8.2f}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true",
+                        help="run the smallest case of every approach only")
+    parser.add_argument("--optimize", action="store_true",
+                        help="also time find_optimal_angles with qiskit")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        sys.exit(1 if compare(old, new, args.threshold) else 0)
+    results = run(QUICK_GRID if args.quick else GRID, args.repeat,
+                  args.optimize)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
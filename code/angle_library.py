@@ -0,0 +1,118 @@
+"""Library of optimized angles, reused for similar instances.
+
+Optimal QAOA angles concentrate across similar instances, so angles found
+for previous instances are a good guess for new ones. The library stores
+them per key (approach, p, m, normalized penalty factors) and returns their
+(elementwise) median, or the median of their largest cluster.
+
+The cost functions scale with the values of the items, so the gammas are
+stored multiplied by a problem specific scale, see normalization, and
+divided by the scale of the new instance when looked up.
+"""
+import json
+
+import numpy as np
+
+
+def normalization(approach, problem, penalties=()):
+    """Return the normalized penalty factors and the scale of the gammas.
+
+    penalties are (a,) for linqaoa, (a, b) for quadqaoa and () for qwqaoa."""
+    max_value = max(problem.values)
+    if approach == "linqaoa":
+        a, = penalties
+        return (float(a) / max_value,), max_value
+    if approach == "quadqaoa":
+        a, b = penalties
+        return (float(b) / (float(a) * max_value),), float(a) * max_value
+    if approach == "qwqaoa":
+        return (), max_value
+    raise ValueError(f"Unknown approach {approach!r}.")
+
+
+class AngleLibrary:
+    """Normalized angles of previous optimizations.
+
+    Attributes:
+    entries (dict): normalized angles, as lists, by key
+    method (str): "median" or "cluster", see angles
+    refine (bool): whether library angles are refined locally before use
+    update (bool): whether new optimizations are added to the library
+    decimals (int): the normalized penalty factors are rounded to decimals
+        digits in keys
+    """
+
+    def __init__(self, entries=None, method="median", refine=True,
+                 update=True, decimals=2):
+        self.entries = entries if entries is not None else {}
+        self.method = method
+        self.refine = refine
+        self.update = update
+        self.decimals = decimals
+
+    def key(self, approach, p, m=None, normalized_penalties=()):
+        """Return the key of the entries of the given parameters."""
+        penalties = tuple(round(penalty, self.decimals)
+                          for penalty in normalized_penalties)
+        return (approach, p, m, penalties)
+
+    def add(self, key, normalized_angles):
+        """Add normalized angles to the entries of key."""
+        self.entries.setdefault(key, []).append(list(map(float,
+                                                         normalized_angles)))
+
+    def angles(self, key, tolerance=0.1):
+        """Return the normalized angles of key, or None if there are none.
+
+        The result is the elementwise median of all entries of key for
+        method "median". For method "cluster", it is the median of the
+        entries within tolerance (relative to the norm of the entry) of the
+        entry with the most such neighbors."""
+        if key not in self.entries:
+            return None
+        entries = np.array(self.entries[key])
+        if self.method == "cluster":
+            distances = np.linalg.norm(entries[:, None] - entries[None, :],
+                                       axis=2)
+            scales = tolerance * np.maximum(np.linalg.norm(entries, axis=1), 1)
+            neighbors = distances <= scales[:, None]
+            entries = entries[neighbors[np.argmax(neighbors.sum(axis=1))]]
+        return np.median(entries, axis=0)
+
+    def lookup(self, approach, problem, p, m=None, penalties=()):
+        """Return the angles for an instance, or None if there are none."""
+        normalized_penalties, scale = normalization(approach, problem,
+                                                    penalties)
+        angles = self.angles(self.key(approach, p, m, normalized_penalties))
+        if angles is None:
+            return None
+        angles = angles.copy()
+        angles[0::2] /= scale
+        return angles
+
+    def record(self, approach, problem, p, m=None, penalties=(), angles=()):
+        """Add the optimized angles of an instance to the library."""
+        normalized_penalties, scale = normalization(approach, problem,
+                                                    penalties)
+        normalized_angles = np.array(angles, dtype=float)
+        normalized_angles[0::2] *= scale
+        self.add(self.key(approach, p, m, normalized_penalties),
+                 normalized_angles)
+
+    def save(self, path):
+        """Save the entries as JSON."""
+        entries = [{"approach": approach, "p": p, "m": m,
+                    "penalties": list(penalties), "angles": angles}
+                   for (approach, p, m, penalties), angles
+                   in self.entries.items()]
+        with open(path, "w") as f:
+            json.dump(entries, f, indent=1)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Load a library saved by save, kwargs as for AngleLibrary."""
+        with open(path) as f:
+            entries = json.load(f)
+        return cls({(entry["approach"], entry["p"], entry["m"],
+                     tuple(entry["penalties"])): entry["angles"]
+                    for entry in entries}, **kwargs)
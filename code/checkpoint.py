@@ -0,0 +1,206 @@
+"""Resumable optimizations of the angles by a journal of the evaluations.
+
+The internal state of SHGO (its simplicial complex, the local minimizations
+in progress) cannot be saved, but SHGO is deterministic, so its state is a
+function of the values it has seen, as for seeded random optimizers. A
+Journal therefore appends every evaluation of angles_to_value to a file.
+When an optimization is restarted with the same journal, the evaluations
+are answered from the journal as long as the optimizer requests the same
+angles, which rebuilds its state (including simplices and populations)
+without simulating, and the optimization continues from there. For
+deterministic optimizers and objective functions the result is the same as
+that of an uninterrupted run.
+
+This does not hold for objective functions with a state of their own, such
+as sampling.SampledObjective: its samples are random, and the replayed
+evaluations neither draw them nor update its best estimate and shot count,
+so a resumed optimization continues with a different state.
+
+The journal starts with a digest of a key, which describes the optimization
+(the approach, the problem, the penalty factors, p, the bounds and the
+optimizer), so a journal of another optimization is never replayed. It is
+removed when the optimization is complete.
+
+Usage:
+angles = linqaoa.find_optimal_angles(circuit, problem, a,
+                                     checkpoint="angles.journal")
+"""
+import functools
+import hashlib
+import inspect
+import os
+import time
+import warnings
+
+import numpy as np
+
+
+# the journal starts with MAGIC and the digest of its key
+MAGIC = b"QAOAJRN1"
+HEADER_SIZE = len(MAGIC) + hashlib.sha256().digest_size
+
+
+def describe(obj):
+    """Return a description of obj that is the same in every process.
+
+    Functions and classes are described by their qualified names, objects
+    without a repr of their own by their class and their attributes of
+    basic types. Raises a ValueError if the repr of obj contains a memory
+    address."""
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return repr(obj)
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        return "(" + ", ".join(describe(item) for item in obj) + ")"
+    if isinstance(obj, functools.partial):
+        return (f"partial({describe(obj.func)}, {describe(obj.args)}, "
+                f"{describe(sorted(obj.keywords.items()))})")
+    if inspect.ismethod(obj):
+        return f"{describe(obj.__self__)}.{obj.__func__.__name__}"
+    if inspect.isroutine(obj) or inspect.isclass(obj):
+        return f"{obj.__module__}.{obj.__qualname__}"
+    if type(obj).__repr__ is object.__repr__:
+        attributes = {name: describe(value)
+                      for name, value in getattr(obj, "__dict__", {}).items()
+                      if value is None or isinstance(
+                          value, (bool, int, float, str, tuple, list))}
+        return f"{type(obj).__module__}.{type(obj).__qualname__}({attributes})"
+    description = repr(obj)
+    if " at 0x" in description:
+        raise ValueError(f"{description} has no description that is the same "
+                         f"in every process, pass a checkpoint_key instead.")
+    return description
+
+
+def digest(key):
+    """Return the SHA-256 digest of the description of key."""
+    return hashlib.sha256(describe(key).encode()).digest()
+
+
+class Journal:
+    """Append-only file of the evaluations (angles, value) of angles_to_value.
+
+    After the header, every record consists of the angles and the value as
+    float64. The file is flushed to disk at least every interval seconds,
+    so at most the evaluations of the last interval are lost. An incomplete
+    last record, e.g. of a process killed while writing, is ignored. A
+    journal with another key is discarded with a warning.
+
+    Attributes:
+    path (str): the file of the journal
+    dimension (int): the number of angles, 2p
+    key: the description of the optimization, see describe
+    interval (float): the maximum time in seconds between flushes
+    angles (list): the angles of all journaled evaluations
+    values (list): their values
+    replayed (int): the number of evaluations answered from the journal
+    """
+
+    def __init__(self, path, dimension, key=None, interval=10.0):
+        self.path = path
+        self.dimension = dimension
+        self.key = key
+        self.interval = interval
+        self.replayed = 0
+        self.angles = []
+        self.values = []
+        self._header = MAGIC + digest((key, dimension))
+        if os.path.exists(path):
+            self._read()
+        self._position = 0
+        self._file = None
+        self._last_flush = time.monotonic()
+
+    def _read(self):
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            data = np.frombuffer(f.read(), dtype=np.float64)
+        if header != self._header:
+            warnings.warn(f"The journal {self.path} belongs to another "
+                          f"optimization, discarding it.")
+            os.remove(self.path)
+            return
+        count = len(data) // (self.dimension + 1)
+        records = data[:count * (self.dimension + 1)].reshape(count, -1)
+        if len(data) > records.size:
+            with open(self.path, "r+b") as f:
+                f.truncate(HEADER_SIZE + records.nbytes)
+        self.angles = list(records[:, :self.dimension])
+        self.values = list(records[:, self.dimension])
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def best_angles(self):
+        """Return the angles of the lowest value journaled, None if empty."""
+        if not len(self):
+            return None
+        return self.angles[int(np.argmin(self.values))]
+
+    @property
+    def best_value(self):
+        return min(self.values, default=np.inf)
+
+    def wrap(self, angles_to_value):
+        """Return angles_to_value, replaying and journaling its evaluations."""
+        def journaled(angles):
+            angles = np.asarray(angles, dtype=np.float64)
+            if self._position < len(self):
+                if np.array_equal(self.angles[self._position], angles):
+                    self._position += 1
+                    self.replayed += 1
+                    return self.values[self._position - 1]
+                warnings.warn(f"The optimization diverged from the journal "
+                              f"{self.path} after {self._position} "
+                              f"evaluations, discarding the rest of it.")
+                self._truncate()
+            value = float(angles_to_value(angles))
+            self._append(angles, value)
+            return value
+        return journaled
+
+    def _truncate(self):
+        del self.angles[self._position:]
+        del self.values[self._position:]
+        self.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER_SIZE + self._position * (self.dimension + 1) * 8)
+
+    def _append(self, angles, value):
+        if self._file is None:
+            new = not os.path.exists(self.path)
+            self._file = open(self.path, "ab")
+            if new:
+                self._file.write(self._header)
+        self._file.write(np.append(angles, value).tobytes())
+        self.angles.append(angles)
+        self.values.append(value)
+        self._position += 1
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Write the journaled evaluations to disk."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flush and close the file, it is reopened by further evaluations."""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Close and delete the file, e.g. when the optimization is complete."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
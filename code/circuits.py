@@ -8,17 +8,54 @@ This includes ...
 All implementations have been kept general, in the sense that they have
 been defined for arbitrary instances of the knapsack problem.
 """
-from functools import partial
+from functools import lru_cache, partial
 from itertools import product
 from fractions import Fraction
 from qiskit import QuantumRegister, ClassicalRegister, QuantumCircuit
-from qiskit import Aer, transpile, execute
 from qiskit.circuit import Parameter
+# registers QuantumCircuit.save_statevector, used by the circuits below
+import qiskit_aer  # noqa: F401
 import numpy as np
 from knapsack import KnapsackProblem
 import math
 
 
+def value_parameter_list(problem, value_parameters):
+    """Return Parameters for the item values if value_parameters, else None."""
+    if not value_parameters:
+        return None
+    return [Parameter(f"value{j}") for j in range(problem.N)]
+
+
+def value_parameter_map(circuit, parameter_map):
+    """Extend parameter_map by the other parameters of circuit, unchanged.
+
+    to_instruction requires a map of all parameters of the circuit, which
+    includes the value Parameters of templates."""
+    parameter_map = dict(parameter_map)
+    for parameter in circuit.parameters:
+        parameter_map.setdefault(parameter, parameter)
+    return parameter_map
+
+
+@lru_cache(maxsize=16)
+def _template(circuit_class, weights, max_weight, p, m):
+    problem = KnapsackProblem(values=[0] * len(weights), weights=list(weights),
+                              max_weight=max_weight)
+    args = (p,) if m is None else (p, m)
+    return circuit_class(problem, *args, value_parameters=True)
+
+
+def template(circuit_class, problem, p, m=None):
+    """Return a circuit of circuit_class with value Parameters.
+
+    The circuit is shared by all instances with the same weights and
+    capacity, so it is built (and by simulation.transpile_circuit
+    transpiled) only once for all of them."""
+    return _template(circuit_class, tuple(problem.weights), problem.max_weight,
+                     p, m)
+
+
 class QFT(QuantumCircuit):
     """Compute the quantum fourier transform up to ordering of qubits."""
 
@@ -102,20 +139,24 @@ class FeasibilityOracle(QuantumCircuit):
 
 
 class DephaseValue(QuantumCircuit):
-    """Dephase Value of an item choice."""
+    """Dephase Value of an item choice.
 
-    def __init__(self, choice_reg, problem):
+    values replace the values of the problem, e.g. by Parameters."""
+
+    def __init__(self, choice_reg, problem, values=None):
         """Initialize the circuit."""
         self.gamma = Parameter("gamma")
         super().__init__(choice_reg, name="Dephase Value")
-        for qubit, value in zip(choice_reg, problem.values):
+        values = problem.values if values is None else values
+        for qubit, value in zip(choice_reg, values):
             super().p(- self.gamma * value, qubit)
 
 
 class LinPhaseCirc(QuantumCircuit):
     """Phase seperation circuit for QAOA with linear soft constraints."""
 
-    def __init__(self, choice_reg, weight_reg, flag_reg, problem: KnapsackProblem):
+    def __init__(self, choice_reg, weight_reg, flag_reg, problem: KnapsackProblem,
+                 values=None):
         """Initialize the circuit."""
         c = math.floor(math.log2(problem.max_weight)) + 1
         self.a = Parameter("a")
@@ -124,9 +165,10 @@ class LinPhaseCirc(QuantumCircuit):
         # initialize flag qubit
         super().x(flag_reg)
         # dephase value
-        value_circ = DephaseValue(choice_reg, problem)
-        super().append(value_circ.to_instruction({value_circ.gamma: self.gamma}),
-                       choice_reg)
+        value_circ = DephaseValue(choice_reg, problem, values)
+        super().append(value_circ.to_instruction(
+            value_parameter_map(value_circ, {value_circ.gamma: self.gamma})),
+            choice_reg)
         # dephase penalty
         feasibility_oracle = FeasibilityOracle(choice_reg, weight_reg,
                                                flag_reg, problem,
@@ -207,14 +249,18 @@ class DefaultMixer(QuantumCircuit):
 
 
 class LinQAOA(QuantumCircuit):
-    """QAOA Circuit for Knapsack Problem with linear soft constraints."""
+    """QAOA Circuit for Knapsack Problem with linear soft constraints.
+
+    If value_parameters, the item values are Parameters (self.values), so
+    the circuit serves all instances with the same weights and capacity."""
 
-    def __init__(self, problem: KnapsackProblem, p: int):
+    def __init__(self, problem: KnapsackProblem, p: int, value_parameters=False):
         """Initialize the circuit."""
         self.p = p
         self.betas = [Parameter(f"beta{i}") for i in range(p)]
         self.gammas = [Parameter(f"gamma{i}") for i in range(p)]
         self.a = Parameter("a")
+        self.values = value_parameter_list(problem, value_parameters)
 
         n = math.floor(math.log2(problem.total_weight)) + 1
         c = math.floor(math.log2(problem.max_weight)) + 1
@@ -227,7 +273,8 @@ class LinQAOA(QuantumCircuit):
 
         super().__init__(choice_reg, weight_reg, flag_reg, name=f"LinQAOA {p=}")
 
-        phase_circ = LinPhaseCirc(choice_reg, weight_reg, flag_reg, problem)
+        phase_circ = LinPhaseCirc(choice_reg, weight_reg, flag_reg, problem,
+                                  self.values)
         mix_circ = DefaultMixer(choice_reg)
 
         # initial state
@@ -236,10 +283,10 @@ class LinQAOA(QuantumCircuit):
         # alternatingly apply phase seperation circuits and mixers
         for gamma, beta in zip(self.gammas, self.betas):
             # apply phase seperation circuit
-            phase_params = {
+            phase_params = value_parameter_map(phase_circ, {
                 phase_circ.gamma: gamma,
                 phase_circ.a: self.a,
-            }
+            })
             super().append(phase_circ.to_instruction(phase_params),
                            [*choice_reg, *weight_reg, flag_reg])
 
@@ -262,14 +309,18 @@ class LinQAOA(QuantumCircuit):
 
 
 class QuantumWalkQAOA(QuantumCircuit):
-    """QAOA Circuit for Knapsack Problem with hard constraints."""
+    """QAOA Circuit for Knapsack Problem with hard constraints.
 
-    def __init__(self, problem: KnapsackProblem, p: int, m: int):
+    value_parameters as for LinQAOA."""
+
+    def __init__(self, problem: KnapsackProblem, p: int, m: int,
+                 value_parameters=False):
         """Initialize the circuit."""
         self.p = p
         self.m = m
         self.betas = [Parameter(f"beta{i}") for i in range(p)]
         self.gammas = [Parameter(f"gamma{i}") for i in range(p)]
+        self.values = value_parameter_list(problem, value_parameters)
 
         n = math.floor(math.log2(problem.total_weight)) + 1
         c = math.floor(math.log2(problem.max_weight)) + 1
@@ -285,15 +336,16 @@ class QuantumWalkQAOA(QuantumCircuit):
 
         super().__init__(choice_reg, weight_reg, *flag_regs,
                          name=f"QuantumWalkQAOA {m=},{p=}")
-        phase_circ = DephaseValue(choice_reg, problem)
+        phase_circ = DephaseValue(choice_reg, problem, self.values)
         mix_circ = QuantumWalkMixer(choice_reg, weight_reg, flag_regs,
                                     problem, m)
         # start in |0>
         # alternatingly apply phase seperation circuits and mixers
         for gamma, beta in zip(self.gammas, self.betas):
             # apply phase seperation circuit
-            super().append(phase_circ.to_instruction({phase_circ.gamma: gamma}),
-                           choice_reg)
+            super().append(phase_circ.to_instruction(
+                value_parameter_map(phase_circ, {phase_circ.gamma: gamma})),
+                choice_reg)
             # apply mixer
             super().append(mix_circ.to_instruction({mix_circ.beta: beta}),
                            [*choice_reg, *weight_reg, *flag_regs])
@@ -312,15 +364,17 @@ class QuantumWalkQAOA(QuantumCircuit):
 class QuadPhaseCirc(QuantumCircuit):
     """Phase seperation circuit for Knapsack QAOA with quadratic soft constraints."""
 
-    def __init__(self, choice_reg, weight_reg, problem: KnapsackProblem):
+    def __init__(self, choice_reg, weight_reg, problem: KnapsackProblem,
+                 values=None):
         """Initialize the circuit."""
         self.gamma = Parameter("gamma")
         self.a = Parameter("a")
         self.b = Parameter("b")
         super().__init__(choice_reg, weight_reg, name="UPhase")
+        values = problem.values if values is None else values
 
         # Single-qubit rotations on choice register
-        for qubit, value, weight in zip(choice_reg, problem.values, problem.weights):
+        for qubit, value, weight in zip(choice_reg, values, problem.weights):
             angle = self.gamma * (self.a * value - self.b * (problem.total_weight - (problem.max_weight**2 + problem.max_weight) / 2) * weight)
             super().rz(angle, qubit)
 
@@ -353,21 +407,24 @@ class QuadPhaseCirc(QuantumCircuit):
 
 
 class QuadQAOA(QuantumCircuit):
-    """QAOA Circuit for Knapsack Problem with quadratic soft constraints."""
+    """QAOA Circuit for Knapsack Problem with quadratic soft constraints.
+
+    value_parameters as for LinQAOA."""
 
-    def __init__(self, problem: KnapsackProblem, p: int):
+    def __init__(self, problem: KnapsackProblem, p: int, value_parameters=False):
         """Initialize the circuit."""
         self.p = p
         self.betas = [Parameter(f"beta{i}") for i in range(p)]
         self.gammas = [Parameter(f"gamma{i}") for i in range(p)]
         self.a = Parameter("a")
         self.b = Parameter("b")
+        self.values = value_parameter_list(problem, value_parameters)
 
         choice_reg = QuantumRegister(problem.N, name="choice")
         weight_reg = QuantumRegister(problem.max_weight, name="weight")
         super().__init__(choice_reg, weight_reg, name=f"QuadQAOA {p=}")
 
-        phase_circ = QuadPhaseCirc(choice_reg, weight_reg, problem)
+        phase_circ = QuadPhaseCirc(choice_reg, weight_reg, problem, self.values)
         mix_circ = DefaultMixer([*choice_reg, *weight_reg])
 
         # initial state
@@ -376,11 +433,11 @@ class QuadQAOA(QuantumCircuit):
         # alternatingly apply phase seperation circuit and mixer
         for gamma, beta in zip(self.gammas, self.betas):
             # apply phase seperation circuit
-            phase_params = {
+            phase_params = value_parameter_map(phase_circ, {
                 phase_circ.gamma: gamma,
                 phase_circ.a: self.a,
                 phase_circ.b: self.b,
-            }
+            })
             super().append(phase_circ.to_instruction(phase_params),
                            [*choice_reg, *weight_reg])
             # apply mixer
@@ -405,7 +462,7 @@ class QuadQAOA(QuantumCircuit):
         a1 = fraca.numerator
         a2 = fraca.denominator
         b1 = fracb.numerator
-        b2 = fracb.numerator
+        b2 = fracb.denominator
         # lowest common multiple lcm(a2, b2)
         lcm = abs(a2 * b2) / math.gcd(a2, b2)
         # greatest common divisor
@@ -0,0 +1,158 @@
+"""Fundamental domains of the angles, derived from symmetries of the QAOA.
+
+The expectation values are invariant under
+- shifting a single gamma by the period 2 pi / g, where g is the greatest
+  common divisor of the differences of the eigenvalues of the phase
+  separation (a global phase does not matter),
+- shifting a single beta by the period of the mixer, pi for the Rx mixer
+  and 2 m pi for the quantum walk mixer, whose single qubit walks have the
+  eigenvalues -1, 0 and 1, see walk_beta_period (the continuous-time walk
+  is not periodic),
+- time reversal (gamma, beta) -> (-gamma, -beta) of all angles at once, as
+  the cost and the mixers are real and the initial state is real, so the
+  reversed state is the complex conjugate.
+The fundamental domain is thus the box of the periods, with the first gamma
+restricted to the first half of its period. The periods can be much smaller
+than the ranges of the circuits, e.g. for penalty factors with a large
+common divisor.
+"""
+from dataclasses import dataclass
+from fractions import Fraction
+import math
+
+import numpy as np
+
+import native
+
+
+def rational_gcd(numbers, max_denominator=1000, tolerance=1e-9):
+    """Return the greatest common divisor of rational numbers as a Fraction.
+
+    Returns None if a number is not (close to) a fraction with denominator
+    up to max_denominator, or if all numbers are 0."""
+    fractions = set()
+    for number in numbers:
+        fraction = Fraction(float(number)).limit_denominator(max_denominator)
+        if abs(float(fraction) - number) > tolerance * max(abs(number), 1):
+            return None
+        if fraction != 0:
+            fractions.add(abs(fraction))
+    if not fractions:
+        return None
+    denominator = math.lcm(*(fraction.denominator for fraction in fractions))
+    numerator = math.gcd(*(int(fraction * denominator)
+                           for fraction in fractions))
+    return Fraction(numerator, denominator)
+
+
+def gamma_period(costs, default):
+    """Return the period of gamma for phase separations exp(-i gamma cost).
+
+    costs are the eigenvalues of the phase separations of all layers, e.g.
+    of both parities of LinQAOA. default is returned if they are not
+    rational."""
+    differences = np.concatenate([np.unique(cost) - np.min(cost)
+                                  for cost in costs])
+    gcd = rational_gcd(differences)
+    if gcd is None:
+        return default
+    return 2 * math.pi / gcd
+
+
+@dataclass
+class AngleDomain:
+    """Box of the angles modulo the symmetries.
+
+    Attributes:
+    gamma_period (float): the period of every gamma
+    beta_period (float): the period of every beta, None if the mixer is
+        not periodic
+    reversal (bool): whether the expectation values are invariant under
+        time reversal, so the first gamma is restricted to half its period;
+        requires periodic betas
+    beta_limit (float): the upper bound of the betas if not periodic
+    """
+
+    gamma_period: float
+    beta_period: float
+    reversal: bool = True
+    beta_limit: float = None
+
+    @property
+    def gamma_range(self):
+        return 0, self.gamma_period
+
+    @property
+    def beta_range(self):
+        if self.beta_period is None:
+            return 0, self.beta_limit
+        return 0, self.beta_period
+
+    def bounds(self, p):
+        """Return the bounds of angles = [gamma0, beta0, gamma1, ...]."""
+        bounds = np.array([self.gamma_range, self.beta_range] * p, dtype=float)
+        if self.reversal and p > 0:
+            bounds[0, 1] = self.gamma_period / 2
+        return bounds
+
+    def volume_fraction(self, p, gamma_range, beta_range):
+        """Return the volume of the domain relative to the box of the ranges."""
+        bounds = self.bounds(p)
+        full = np.array([gamma_range, beta_range] * p, dtype=float)
+        return np.prod((bounds[:, 1] - bounds[:, 0]) / (full[:, 1] - full[:, 0]))
+
+    def canonical(self, angles):
+        """Return the equivalent angles within bounds."""
+        angles = np.array(angles, dtype=float)
+        angles[0::2] = np.mod(angles[0::2], self.gamma_period)
+        if self.beta_period is None:
+            return angles
+        angles[1::2] = np.mod(angles[1::2], self.beta_period)
+        if self.reversal and len(angles) and angles[0] > self.gamma_period / 2:
+            angles[0::2] = np.mod(-angles[0::2], self.gamma_period)
+            angles[1::2] = np.mod(-angles[1::2], self.beta_period)
+        return angles
+
+
+def walk_beta_period(simulation):
+    """Return the period of beta of the quantum walk mixer with m steps.
+
+    A single qubit walk j with angle beta / m + pi is the walk with angle
+    beta / m times -1 on the choices with a feasible neighbor in item j, so
+    the period is m pi if every item can be flipped in all or in none of
+    the feasible choices (e.g. if all choices are feasible), else 2 m pi."""
+    F = len(simulation.states)
+    if all(2 * len(lower) in (0, F) for lower, __ in simulation.pairs):
+        return simulation.m * math.pi
+    return 2 * simulation.m * math.pi
+
+
+def angle_domain(approach, problem, penalties=(), m=None, beta_limit=None):
+    """Return the AngleDomain of an approach and instance.
+
+    penalties are (a,) for linqaoa, (a, b) for quadqaoa and () for qwqaoa,
+    m is the number of walk steps of qwqaoa. beta_limit is the upper bound
+    of beta of the continuous-time walk (m = None), by default that of
+    native.NativeQuantumWalkQAOA."""
+    if approach == "linqaoa":
+        a, = penalties
+        simulation = native.NativeLinQAOA(problem, 1)
+        costs = [simulation.cost(a, layer) for layer in range(2)]
+        default = simulation.gamma_range(a)[1]
+    elif approach == "quadqaoa":
+        simulation = native.NativeQuadQAOA(problem, 1)
+        costs = [simulation.cost(*penalties)]
+        default = simulation.gamma_range(*penalties)[1]
+    elif approach == "qwqaoa":
+        simulation = native.NativeQuantumWalkQAOA(problem, 1, m)
+        period = gamma_period([simulation.cost()], simulation.gamma_range()[1])
+        if m is None:
+            if beta_limit is None:
+                beta_limit = simulation.beta_range()[1]
+            return AngleDomain(period, None, reversal=False,
+                               beta_limit=beta_limit)
+        return AngleDomain(period, walk_beta_period(simulation))
+    else:
+        raise ValueError(f"Unknown approach {approach!r}.")
+    return AngleDomain(gamma_period(costs, default),
+                       simulation.beta_range()[1])
@@ -3,16 +3,13 @@ sys.path.append("../../")
 
 from functools import partial
 
-import numpy as np
 import matplotlib.pyplot as plt
 
 import linqaoa
 import quadqaoa
 import qwqaoa
 import knapsack
-import circuits
-import optimization
-import visualization
+import simulation as sim
 
 name = "p_dependence"
 problem = knapsack.toy_problems[-1]
@@ -22,10 +19,11 @@ ps = list(range(1, 6))
 print("QuadQAOA")
 a = 1
 b = 2 * quadqaoa.bmin(a, problem)
-ratios = []
-for p in ps:
-    ratio = quadqaoa.approximation_ratio(problem, p, a, b)
-    ratios.append(ratio)
+ratios = sim.sweep(
+    ps, partial(quadqaoa.prepare_circuit, problem),
+    lambda p, circuit: quadqaoa.approximation_ratio(problem, p, a, b,
+                                                    circuit=circuit))
+for p, ratio in zip(ps, ratios):
     print(f"{p = }: rho = {ratio}")
 plt.scatter(ps, ratios, label="quad")
 
@@ -45,10 +43,11 @@ with open(f"{name}.txt", "w") as f:
 # linqaoa p-dependece
 print("LinQAOA")
 a = 2 * linqaoa.amin(problem)
-ratios = []
-for p in ps:
-    ratio = linqaoa.approximation_ratio(problem, p, a)
-    ratios.append(ratio)
+ratios = sim.sweep(
+    ps, partial(linqaoa.prepare_circuit, problem),
+    lambda p, circuit: linqaoa.approximation_ratio(problem, p, a,
+                                                   circuit=circuit))
+for p, ratio in zip(ps, ratios):
     print(f"{p = }: rho = {ratio}")
 plt.scatter(ps, ratios, label="lin")
 
@@ -63,10 +62,11 @@ with open(f"{name}.txt", "a") as f:
 # qwqaoa p-dependence
 print("QWQAOA")
 m = 3
-ratios = []
-for p in ps:
-    ratio = qwqaoa.approximation_ratio(problem, p, m)
-    ratios.append(ratio)
+ratios = sim.sweep(
+    ps, lambda p: qwqaoa.prepare_circuit(problem, p, m),
+    lambda p, circuit: qwqaoa.approximation_ratio(problem, p, m,
+                                                  circuit=circuit))
+for p, ratio in zip(ps, ratios):
     print(f"{p = }: rho = {ratio}")
 plt.scatter(ps, ratios, label="qw")
 
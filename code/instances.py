@@ -0,0 +1,155 @@
+"""Random instances of the knapsack problem and their storage on disk.
+
+The generator follows the standard families of Pisinger's "Where are the
+hard knapsack problems?", with weights drawn uniformly from 1 to R:
+- "uncorrelated": values drawn uniformly from 1 to R,
+- "weakly correlated": values drawn uniformly from w - R/10 to w + R/10,
+- "strongly correlated": values w + R/10,
+- "subset sum": values equal to the weights.
+The capacity is a fraction of the total weight of an instance.
+
+Batches of instances are stored in a columnar layout: the values and the
+weights of all instances are concatenated, and offsets[i] is the position
+of the first item of instance i. On disk, a batch is a directory of .npy
+files, which are memory-mapped when loaded.
+"""
+import os
+
+import numpy as np
+
+from knapsack import KnapsackProblem
+
+
+FAMILIES = ["uncorrelated", "weakly correlated", "strongly correlated",
+            "subset sum"]
+
+
+def generate_arrays(count, N, family="uncorrelated", R=10,
+                    capacity_ratio=0.5, rng=None):
+    """Return values, weights (both count x N) and capacities of instances."""
+    rng = rng if rng is not None else np.random.default_rng()
+    weights = rng.integers(1, R + 1, (count, N))
+    spread = max(R // 10, 1)
+    if family == "uncorrelated":
+        values = rng.integers(1, R + 1, (count, N))
+    elif family == "weakly correlated":
+        values = np.maximum(weights + rng.integers(-spread, spread + 1,
+                                                   (count, N)), 1)
+    elif family == "strongly correlated":
+        values = weights + spread
+    elif family == "subset sum":
+        values = weights.copy()
+    else:
+        raise ValueError(f"Unknown family {family!r}, expected one of {FAMILIES}.")
+    capacities = np.maximum((capacity_ratio * weights.sum(axis=1)).astype(int), 1)
+    return values, weights, capacities
+
+
+def random_problem(N, family="uncorrelated", R=10, capacity_ratio=0.5,
+                   seed=None):
+    """Return a random instance with N items of the given family."""
+    rng = np.random.default_rng(seed)
+    values, weights, capacities = generate_arrays(1, N, family, R,
+                                                  capacity_ratio, rng)
+    return KnapsackProblem(values=values[0].tolist(),
+                           weights=weights[0].tolist(),
+                           max_weight=int(capacities[0]))
+
+
+class ProblemBatch:
+    """Many instances of the knapsack problem in a columnar layout.
+
+    Attributes:
+    values (np.ndarray): the values of all items of all instances
+    weights (np.ndarray): the weights of all items of all instances
+    offsets (np.ndarray): the items of instance i are those from
+        offsets[i] to offsets[i + 1]
+    capacities (np.ndarray): the maximum weights of the instances
+    """
+
+    files = ["values", "weights", "offsets", "capacities"]
+
+    def __init__(self, values, weights, offsets, capacities):
+        self.values = values
+        self.weights = weights
+        self.offsets = offsets
+        self.capacities = capacities
+
+    @classmethod
+    def from_problems(cls, problems):
+        """Create the batch of a list of KnapsackProblems."""
+        sizes = [problem.N for problem in problems]
+        return cls(
+            np.concatenate([problem.values for problem in problems]).astype(np.int64),
+            np.concatenate([problem.weights for problem in problems]).astype(np.int64),
+            np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+            np.array([problem.max_weight for problem in problems], dtype=np.int64),
+        )
+
+    @classmethod
+    def generate(cls, count, N, family="uncorrelated", R=10,
+                 capacity_ratio=0.5, seed=None):
+        """Generate count random instances with N items, see generate_arrays."""
+        rng = np.random.default_rng(seed)
+        values, weights, capacities = generate_arrays(count, N, family, R,
+                                                      capacity_ratio, rng)
+        return cls(values.ravel().astype(np.int64),
+                   weights.ravel().astype(np.int64),
+                   np.arange(0, count * N + 1, N, dtype=np.int64),
+                   capacities.astype(np.int64))
+
+    @classmethod
+    def concatenate(cls, batches):
+        """Return the batch of the instances of all batches."""
+        offsets = [batches[0].offsets[:1]]
+        for batch in batches:
+            offsets.append(batch.offsets[1:] - batch.offsets[0]
+                           + offsets[-1][-1])
+        return cls(np.concatenate([batch.values for batch in batches]),
+                   np.concatenate([batch.weights for batch in batches]),
+                   np.concatenate(offsets),
+                   np.concatenate([batch.capacities for batch in batches]))
+
+    def save(self, directory):
+        """Save the batch as .npy files in directory."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.files:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Load a batch saved by save, memory-mapped unless mmap_mode is None."""
+        return cls(*(np.load(os.path.join(directory, f"{name}.npy"),
+                             mmap_mode=mmap_mode) for name in cls.files))
+
+    def __len__(self):
+        return len(self.capacities)
+
+    @property
+    def sizes(self):
+        """The numbers of items N of the instances."""
+        return np.diff(self.offsets)
+
+    def arrays(self, i):
+        """Return views of the values and the weights of instance i."""
+        items = slice(self.offsets[i], self.offsets[i + 1])
+        return self.values[items], self.weights[items]
+
+    def __getitem__(self, i):
+        """Return instance i as a KnapsackProblem."""
+        values, weights = self.arrays(i)
+        return KnapsackProblem(values=values.tolist(), weights=weights.tolist(),
+                               max_weight=int(self.capacities[i]))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def select(self, indices):
+        """Return the batch of the instances with the given indices."""
+        indices = np.asarray(indices)
+        sizes = self.sizes[indices]
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        items = np.arange(offsets[-1]) + np.repeat(
+            self.offsets[indices] - offsets[:-1], sizes)
+        return ProblemBatch(self.values[items], self.weights[items], offsets,
+                            self.capacities[indices])
@@ -71,19 +71,91 @@ def best_known_solutions(problem: KnapsackProblem):
     """Calculate the best known solutions of a problem instance.
     
     Returns a list of item choices, represented by numpy arrays of length N with entries 0 and 1.
-    Uses an inefficient algorithm, but this is good enough for the small instances used here."""
-    def choices_from_number(problem, number):
-        return np.array(list(map(int, list(reversed(bin(number)[2:])))) + [0] * (problem.N - len(bin(number)[2:])))
-    best = 0
+    Only the feasible choices are enumerated, see feasible_choices."""
+    best = -np.inf
     solutions = []
-    for i in range(2**problem.N):
-        choice = choices_from_number(problem, i)
-        value = choice.dot(problem.values)
-        weight = choice.dot(problem.weights)
-        is_legal = weight <= problem.max_weight
-        if is_legal and value > best:
-            best = value
-            solutions = [choice]
-        elif is_legal and value == best:
-            solutions.append(choice)
-    return np.array(solutions)
+    values = np.array(problem.values)
+    for block in feasible_choices(problem):
+        block_values = choice_bits(block, problem.N) @ values
+        block_best = block_values.max()
+        if block_best > best:
+            best = block_best
+            solutions = [block[block_values == best]]
+        elif block_best == best:
+            solutions.append(block[block_values == best])
+    return choice_bits(np.sort(np.concatenate(solutions)), problem.N)
+
+
+def choice_bits(choices, N):
+    """Convert choices packed into integers (item j is bit j) to rows of bits."""
+    return (np.asarray(choices)[:, None] >> np.arange(N)) & 1
+
+
+def feasible_choices(problem: KnapsackProblem, block_size=2**16,
+                     inner_items=12):
+    """Enumerate the feasible choices in blocks of integers (item j is bit j).
+
+    The items are sorted by weight. A depth-first search over the heaviest
+    items backtracks as soon as the next item does not fit, so only
+    feasible partial choices are visited. Every partial choice is completed
+    by all fitting subsets of the inner_items lightest items at once, which
+    are a prefix of these subsets sorted by weight. The work is thus
+    proportional to the number of feasible choices instead of 2^N. The
+    blocks have at least block_size choices (except the last one) and are
+    not sorted."""
+    order = np.argsort(problem.weights, kind="stable")
+    inner = order[:inner_items]
+    outer = order[inner_items:]
+    # all subsets of the inner items, sorted by weight
+    subsets = np.arange(2**len(inner))
+    bits = (subsets[:, None] >> np.arange(len(inner))) & 1
+    inner_weights = bits @ np.array(problem.weights)[inner]
+    inner_masks = bits @ (1 << inner.astype(np.int64))
+    by_weight = np.argsort(inner_weights, kind="stable")
+    inner_weights = inner_weights[by_weight]
+    inner_masks = inner_masks[by_weight]
+    outer_weights = [problem.weights[j] for j in outer]
+
+    block = []
+    size = 0
+    # stack of (mask, weight, next outer item)
+    stack = [(0, 0, 0)]
+    while stack:
+        mask, weight, start = stack.pop()
+        count = np.searchsorted(inner_weights, problem.max_weight - weight,
+                                side="right")
+        block.append(mask | inner_masks[:count])
+        size += count
+        if size >= block_size:
+            yield np.concatenate(block)
+            block = []
+            size = 0
+        for k in range(start, len(outer)):
+            if weight + outer_weights[k] > problem.max_weight:
+                break
+            stack.append((mask | (1 << int(outer[k])),
+                          weight + outer_weights[k], k + 1))
+    if block:
+        yield np.concatenate(block)
+
+
+def feasible_states(problem: KnapsackProblem):
+    """Return all feasible choices as sorted integers, see feasible_choices."""
+    return np.sort(np.concatenate(list(feasible_choices(problem))))
+
+
+def neighbor_index(states, N):
+    """Return the single bit flip neighbors within sorted choices states.
+
+    For every item j, the result contains a pair of arrays (lower, upper)
+    of the positions in states of the choices x without item j and x + 2^j,
+    for all such pairs that are both in states."""
+    pairs = []
+    for j in range(N):
+        neighbors = states ^ (1 << j)
+        positions = np.searchsorted(states, neighbors)
+        positions[positions == len(states)] = 0
+        has_neighbor = states[positions] == neighbors
+        lower = has_neighbor & ((states >> j) & 1 == 0)
+        pairs.append((np.flatnonzero(lower), positions[lower]))
+    return pairs
@@ -0,0 +1,797 @@
+"""Native simulation of the QAOA approaches using numpy.
+
+Instead of simulating the circuits of circuits.py gate by gate, the states
+are represented on the choice register (and for QuadQAOA on the weight
+register) only, as all other registers are returned to |0> by the circuits.
+The phase separation circuits are applied as diagonals and the mixers are
+applied directly.
+
+Items with identical values and weights can be grouped. The cost and the
+default mixer are invariant under permutations within a group, so the
+simulation of LinQAOA and QuadQAOA can be restricted to the symmetric
+subspace spanned by the Dicke states of every group. Its dimension is the
+product of (group size + 1) instead of 2^N.
+"""
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from fractions import Fraction
+from math import comb
+import math
+
+import numpy as np
+
+import knapsack
+from knapsack import KnapsackProblem
+import resources
+
+
+def identical_items(problem: KnapsackProblem):
+    """Return groups of the indices of items with identical value and weight."""
+    groups = defaultdict(list)
+    for idx, item in enumerate(zip(problem.values, problem.weights)):
+        groups[item].append(idx)
+    return list(groups.values())
+
+
+@lru_cache
+def _dicke_mixer_eigh(size):
+    """Diagonalize the sum of X over size qubits on the symmetric subspace."""
+    k = np.arange(size)
+    off_diagonal = np.sqrt((k + 1) * (size - k))
+    generator = np.diag(off_diagonal, 1) + np.diag(off_diagonal, -1)
+    return np.linalg.eigh(generator)
+
+
+def dicke_mixer(size, beta):
+    """Return exp(-i beta sum X) on the Dicke states of size qubits."""
+    eigenvalues, eigenvectors = _dicke_mixer_eigh(size)
+    phases = np.exp(-1j * beta * eigenvalues)
+    return (eigenvectors * phases) @ eigenvectors.T
+
+
+class Basis:
+    """Basis of a register whose qubits are divided into symmetric groups.
+
+    A basis state is given by the number k_g of qubits in state |1> for
+    every group g, i.e. it is the (normalized) Dicke state of the group. If
+    every group consists of a single qubit, this is the computational basis
+    with the qubit ordering of qiskit.
+
+    Attributes:
+    groups (list): lists of qubit indices
+    num_qubits (int): the number of qubits
+    shape (tuple): the shape of a state tensor, the last axis belongs to
+        the first group
+    dimension (int): the number of basis states
+    counts (np.ndarray): k_g of all basis states, shape (groups, dimension)
+    multiplicities (np.ndarray): the number of computational basis states
+        represented by each basis state
+    """
+
+    def __init__(self, groups):
+        """Initialize the basis."""
+        self.groups = [list(group) for group in groups]
+        self.num_qubits = sum(map(len, self.groups))
+        sizes = [len(group) for group in self.groups]
+        self.shape = tuple(size + 1 for size in reversed(sizes))
+        self.dimension = math.prod(self.shape)
+        self.counts = np.indices(self.shape).reshape(len(sizes), -1)[::-1]
+        self.multiplicities = np.ones(self.dimension, dtype=int)
+        for size, counts in zip(sizes, self.counts):
+            self.multiplicities *= np.array([comb(size, k) for k in counts])
+
+    @classmethod
+    def full(cls, num_qubits):
+        """Return the computational basis of num_qubits qubits."""
+        return cls([[qubit] for qubit in range(num_qubits)])
+
+    def sums(self, coefficients):
+        """Return sum(coefficients[q] * x_q) for all basis states.
+
+        The coefficients must be identical within each group."""
+        group_coefficients = [coefficients[group[0]] for group in self.groups]
+        return np.dot(group_coefficients, self.counts)
+
+    def plus_state(self):
+        """Return the state |+>^n."""
+        return np.sqrt(self.multiplicities / 2**self.num_qubits).astype(complex)
+
+    def zero_state(self):
+        """Return the state |0>^n."""
+        state = np.zeros(self.dimension, dtype=complex)
+        state[0] = 1
+        return state
+
+    def apply_mixer(self, state, beta):
+        """Apply exp(-i beta X) to every qubit."""
+        tensor = state.reshape(self.shape)
+        for idx, group in enumerate(self.groups):
+            axis = len(self.groups) - 1 - idx
+            unitary = dicke_mixer(len(group), beta)
+            tensor = np.moveaxis(np.tensordot(unitary, tensor, ([1], [axis])),
+                                 0, axis)
+        return tensor.reshape(-1)
+
+    def expand(self, probabilities):
+        """Expand probabilities to the computational basis of all qubits."""
+        indices = np.arange(2**self.num_qubits)
+        basis_indices = np.zeros_like(indices)
+        stride = 1
+        for group in self.groups:
+            counts = sum((indices >> qubit) & 1 for qubit in group)
+            basis_indices += stride * counts
+            stride *= len(group) + 1
+        return probabilities[basis_indices] / self.multiplicities[basis_indices]
+
+    def probabilities_dict(self, probabilities):
+        """Return probabilities in the format of Statevector.probabilities_dict."""
+        return probabilities_dict(self.expand(probabilities), self.num_qubits)
+
+
+def computational_sums(coefficients, indices):
+    """Return sum(coefficients[q] * x_q) for computational basis states."""
+    sums = np.zeros(len(indices))
+    for qubit, coefficient in enumerate(coefficients):
+        sums += coefficient * ((indices >> qubit) & 1)
+    return sums
+
+
+def table_sums(problem, problem_tables, sums, repeat=1):
+    """Return sums, but taking the sums of the values and of the weights of
+    the choices from problem_tables (a problem_tables.ProblemTables).
+
+    The choice register must be in the computational basis and make up the
+    lowest qubits of the basis. The tables are returned as they are, without
+    copying them. If repeat > 1, i.e. for repeat basis states of the
+    remaining qubits, all sums are returned with the shape (repeat, 2^N),
+    with the tables broadcast along the first axis."""
+    N = problem.N
+
+    def sums_from_tables(coefficients):
+        if not any(coefficients[N:]):
+            choice_coefficients = list(coefficients[:N])
+            for table, item_coefficients in [
+                    (problem_tables.values, problem.values),
+                    (problem_tables.weights, problem.weights)]:
+                if choice_coefficients == list(item_coefficients):
+                    if repeat == 1:
+                        return table
+                    return np.broadcast_to(table, (repeat, len(table)))
+        result = sums(coefficients)
+        return result if repeat == 1 else result.reshape(repeat, -1)
+
+    return sums_from_tables
+
+
+def _attached_tables(problem, groups):
+    """Return the tables of problem attached by problem_tables.attach_worker,
+    if the groups of the basis of the choices are single items, else None."""
+    if groups != [[j] for j in range(problem.N)]:
+        return None
+    import problem_tables
+    return problem_tables.attached_tables(problem)
+
+
+def probabilities_dict(probabilities, num_qubits):
+    """Return probabilities of the computational basis states in the format
+    of Statevector.probabilities_dict."""
+    return {format(idx, f"0{num_qubits}b"): probability
+            for idx, probability in enumerate(probabilities)
+            if probability != 0}
+
+
+def _oracle_register(problem, weights):
+    """Return the weight register of the feasibility oracle and its c.
+
+    The state is feasible if the register is below 2^c."""
+    n = resources.weight_register_size(problem)
+    c = math.floor(math.log2(problem.max_weight)) + 1
+    w0 = 2**c - problem.max_weight - 1
+    return (weights + w0) % 2**n, c
+
+
+# The following functions take sums(coefficients), which returns
+# sum(coefficients[q] * x_q) for all states of interest.
+
+def comparable_objective(problem, sums):
+    """Return the approach independent objective."""
+    values = sums(problem.values)
+    weights = sums(problem.weights)
+    return np.where(weights <= problem.max_weight, values, 0)
+
+
+def linqaoa_cost(problem, a, sums, layer=0):
+    """Return f with phase separation exp(-i gamma f), as in LinPhaseCirc.
+
+    LinPhaseCirc leaves its flag qubit in |1>, so the penalty applies to
+    the infeasible choices in even layers (counting from 0) and to the
+    feasible choices in odd layers."""
+    register, c = _oracle_register(problem, sums(problem.weights))
+    penalized = (register >= 2**c) == (layer % 2 == 0)
+    penalty = np.where(penalized, float(a) * (register - 2**c), 0)
+    return sums(problem.values) - penalty
+
+
+def linqaoa_objective(problem, a, sums):
+    """Return linqaoa.objective_function."""
+    excess = np.maximum(sums(problem.weights) - problem.max_weight, 0)
+    return sums(problem.values) - float(a) * excess
+
+
+def _quadqaoa_coefficients(problem):
+    """Return the coefficients of the values, weights, y_k and k y_k."""
+    N = problem.N
+    W = problem.max_weight
+    return ([*problem.values, *([0] * W)],
+            [*problem.weights, *([0] * W)],
+            [*([0] * N), *([1] * W)],
+            [*([0] * N), *range(1, W + 1)])
+
+
+def quadqaoa_cost(problem, a, b, sums):
+    """Return E with phase separation exp(-i gamma E), as in QuadPhaseCirc."""
+    # the penalty factors may be Fractions
+    a, b = float(a), float(b)
+    T = problem.total_weight
+    W = problem.max_weight
+    weights = np.array(problem.weights)
+    choice_values, choice_weights, y, ky = _quadqaoa_coefficients(problem)
+
+    def z_sums(coefficients):
+        return sum(coefficients) - 2 * sums(coefficients)
+
+    # single qubit rotations, the choice register's in terms of the sums of
+    # the values and weights
+    s_v = z_sums(choice_values)
+    s_w = z_sums(choice_weights)
+    weight_angles = [-b * (W - 2 + k * ((W**2 + W) / 2 - T))
+                     for k in range(1, W + 1)]
+    energy = a * s_v - b * (T - (W**2 + W) / 2) * s_w
+    energy += z_sums([*([0] * len(weights)), *weight_angles])
+    # two qubit rotations
+    s_1 = z_sums(y)
+    s_k = z_sums(ky)
+    energy += -b * (s_w**2 - np.sum(weights**2)) / 2
+    energy += -b * (s_1**2 - W) / 2
+    energy += -b * (s_k**2 - sum(k**2 for k in range(1, W + 1))) / 2
+    energy += b * s_w * s_k
+    # rz(theta) = exp(-i theta Z / 2)
+    return energy / 2
+
+
+def quadqaoa_objective(problem, a, b, sums):
+    """Return quadqaoa.objective_function."""
+    values, weights, y, ky = _quadqaoa_coefficients(problem)
+    penalty = (1 - sums(y))**2 + (sums(ky) - sums(weights))**2
+    return float(a) * sums(values) - float(b) * penalty
+
+
+class PrefixCache:
+    """States after the first layers of the circuit, by their angles.
+
+    When angles are optimized layer by layer, the angles of the first
+    layers do not change between evaluations, so their state can be reused
+    and only the remaining layers are applied. The least recently used
+    states are dropped beyond max_states.
+
+    Attributes:
+    max_states (int): the maximum number of cached states
+    states (OrderedDict): the states by (penalty factors, prefix angles)
+    applied_layers (int): the number of layers applied so far
+    """
+
+    def __init__(self, max_states=64):
+        self.max_states = max_states
+        self.states = OrderedDict()
+        self.applied_layers = 0
+
+    def lookup(self, penalties, angles):
+        """Return (k, state) for the longest cached prefix of k < p layers.
+
+        Returns (0, None) if no prefix of the angles is cached."""
+        for k in range(len(angles) // 2 - 1, 0, -1):
+            key = (penalties, tuple(angles[:2 * k]))
+            if key in self.states:
+                self.states.move_to_end(key)
+                return k, self.states[key]
+        return 0, None
+
+    def store(self, penalties, angles, k, state):
+        """Cache the state after the first k layers of angles."""
+        self.states[(penalties, tuple(angles[:2 * k]))] = state
+        while len(self.states) > self.max_states:
+            self.states.popitem(last=False)
+
+
+class NativeSimulation:
+    """Base class for simulations that can replace the circuits of circuits.py.
+
+    The approach modules accept instances in place of circuits. Subclasses
+    implement probabilities_dict, expectation_value and
+    comparable_expectation_value, which take the angles followed by the
+    penalty factors of the approach.
+
+    Attributes:
+    prefix_cache (PrefixCache): cache of the states after the first
+        layers, None (the default) to simulate all layers every time
+    """
+
+    prefix_cache = None
+
+    def cache_prefixes(self, max_states=64):
+        """Reuse the states of previously evaluated prefixes of the angles."""
+        self.prefix_cache = PrefixCache(max_states)
+        return self
+
+    def _evolve(self, state, angles, penalties, apply_layer):
+        """Apply the layers of angles to the initial state.
+
+        apply_layer(state, layer, gamma, beta) returns the state after a
+        layer. The states after all but the last layer are cached in
+        prefix_cache, so the returned state is never shared with the cache."""
+        p = len(angles) // 2
+        start = 0
+        if self.prefix_cache is not None:
+            start, cached = self.prefix_cache.lookup(penalties, angles)
+            if cached is not None:
+                state = cached
+        for layer in range(start, p):
+            state = apply_layer(state, layer, angles[2 * layer],
+                                angles[2 * layer + 1])
+            if self.prefix_cache is not None:
+                self.prefix_cache.applied_layers += 1
+                if layer + 1 < p:
+                    self.prefix_cache.store(penalties, angles, layer + 1,
+                                            state)
+        return state
+
+
+class NativeLinQAOA(NativeSimulation):
+    """Native simulation of circuits.LinQAOA."""
+
+    def __init__(self, problem: KnapsackProblem, p: int, symmetric=True):
+        """Initialize the simulation."""
+        self.problem = problem
+        self.p = p
+        N = problem.N
+        groups = identical_items(problem) if symmetric else [[j] for j in range(N)]
+        self.basis = Basis(groups)
+        self.sums = self.basis.sums
+        attached = _attached_tables(problem, self.basis.groups)
+        if attached is not None:
+            self.sums = table_sums(problem, attached, self.sums)
+
+    def cost(self, a, layer=0):
+        """Return f with phase separation exp(-i gamma f), see linqaoa_cost."""
+        return linqaoa_cost(self.problem, a, self.sums, layer)
+
+    def objective(self, a):
+        """Return linqaoa.objective_function for all basis states."""
+        return linqaoa_objective(self.problem, a, self.sums)
+
+    def comparable_objective(self):
+        """Return the approach independent objective for all basis states."""
+        return comparable_objective(self.problem, self.sums)
+
+    def statevector(self, angles, a):
+        """Return the state for angles = [gamma0, beta0, gamma1, ...]."""
+        costs = [self.cost(a, layer) for layer in range(2)]
+
+        def apply_layer(state, layer, gamma, beta):
+            state = state * np.exp(-1j * gamma * costs[layer % 2])
+            return self.basis.apply_mixer(state, beta)
+
+        return self._evolve(self.basis.plus_state(), angles, (a,), apply_layer)
+
+    def probabilities(self, angles, a):
+        """Return the probabilities of the basis states of the choice register."""
+        return np.abs(self.statevector(angles, a))**2
+
+    def probabilities_dict(self, angles, a):
+        """Return the probabilities in the format of Statevector.probabilities_dict."""
+        return self.basis.probabilities_dict(self.probabilities(angles, a))
+
+    def expectation_value(self, angles, a):
+        """Return the expectation value of the objective function."""
+        return self.probabilities(angles, a).dot(self.objective(a))
+
+    def comparable_expectation_value(self, angles, a):
+        """Return the expectation value of the approach independent objective."""
+        return self.probabilities(angles, a).dot(self.comparable_objective())
+
+    @staticmethod
+    def beta_range():
+        return 0, math.pi
+
+    @staticmethod
+    def gamma_range(a):
+        denominator = Fraction(a).denominator
+        return 0, denominator * 2 * math.pi
+
+
+class NativeQuadQAOA(NativeSimulation):
+    """Native simulation of circuits.QuadQAOA."""
+
+    def __init__(self, problem: KnapsackProblem, p: int, symmetric=True):
+        """Initialize the simulation."""
+        self.problem = problem
+        self.p = p
+        N = problem.N
+        W = problem.max_weight
+        groups = identical_items(problem) if symmetric else [[j] for j in range(N)]
+        self.choice_basis = Basis(groups)
+        self.basis = Basis(groups + [[N + k] for k in range(W)])
+        self.choice_dimension = self.choice_basis.dimension
+        self.sums = self.basis.sums
+        self.choice_sums = self.choice_basis.sums
+        attached = _attached_tables(problem, self.choice_basis.groups)
+        if attached is not None:
+            self.sums = table_sums(problem, attached, self.sums, 2**W)
+            self.choice_sums = table_sums(problem, attached, self.choice_sums)
+
+    def cost(self, a, b):
+        """Return E with phase separation exp(-i gamma E), see quadqaoa_cost."""
+        return quadqaoa_cost(self.problem, a, b, self.sums).reshape(-1)
+
+    def objective(self, a, b):
+        """Return quadqaoa.objective_function for all basis states."""
+        return quadqaoa_objective(self.problem, a, b, self.sums).reshape(-1)
+
+    def comparable_objective(self):
+        """Return the approach independent objective for the choice register."""
+        return comparable_objective(self.problem, self.choice_sums)
+
+    def statevector(self, angles, a, b):
+        """Return the state for angles = [gamma0, beta0, gamma1, ...]."""
+        cost = self.cost(a, b)
+
+        def apply_layer(state, layer, gamma, beta):
+            state = state * np.exp(-1j * gamma * cost)
+            return self.basis.apply_mixer(state, beta)
+
+        return self._evolve(self.basis.plus_state(), angles, (a, b),
+                            apply_layer)
+
+    def probabilities(self, angles, a, b, choices_only=True):
+        """Return the probabilities of the basis states.
+
+        If choices_only, the weight register is traced out."""
+        probabilities = np.abs(self.statevector(angles, a, b))**2
+        if choices_only:
+            probabilities = probabilities.reshape(-1, self.choice_dimension)
+            probabilities = probabilities.sum(axis=0)
+        return probabilities
+
+    def probabilities_dict(self, angles, a, b, choices_only=True):
+        """Return the probabilities in the format of Statevector.probabilities_dict."""
+        probabilities = self.probabilities(angles, a, b, choices_only)
+        basis = self.choice_basis if choices_only else self.basis
+        return basis.probabilities_dict(probabilities)
+
+    def expectation_value(self, angles, a, b):
+        """Return the expectation value of the objective function."""
+        probabilities = self.probabilities(angles, a, b, choices_only=False)
+        return probabilities.dot(self.objective(a, b))
+
+    def comparable_expectation_value(self, angles, a, b):
+        """Return the expectation value of the approach independent objective."""
+        return self.probabilities(angles, a, b).dot(self.comparable_objective())
+
+    @staticmethod
+    def beta_range():
+        """Return range of values for beta."""
+        return 0, math.pi
+
+    @staticmethod
+    def gamma_range(a, b):
+        """Return range of values for gamma."""
+        gamma_min = 0
+        fraca = Fraction(a)
+        fracb = Fraction(b)
+        a1 = fraca.numerator
+        a2 = fraca.denominator
+        b1 = fracb.numerator
+        b2 = fracb.denominator
+        # lowest common multiple lcm(a2, b2)
+        lcm = abs(a2 * b2) / math.gcd(a2, b2)
+        # greatest common divisor
+        gcd = math.gcd(a1, b1)
+        gamma_max = lcm / gcd * 2 * math.pi
+        return gamma_min, gamma_max
+
+
+class NativeQuantumWalkQAOA(NativeSimulation):
+    """Native simulation of circuits.QuantumWalkQAOA.
+
+    The state never leaves the span of the feasible choices, so it is
+    simulated on the feasible subspace only. The generators of the single
+    qubit walks, i.e. the pairs of feasible neighbors, are built once. The
+    quantum walk mixer is either applied walk by walk (m * N steps), or as
+    the m-th power of the product of the N walks, calculated by repeated
+    squaring. The latter is independent of m up to a logarithmic factor,
+    but scales with the cube of the number of feasible choices.
+
+    For m = None, the mixer is the continuous-time quantum walk
+    exp(-i beta A), where A is the adjacency matrix of the feasible
+    neighbors, i.e. the limit m -> infinity. It is applied using an
+    eigendecomposition of A, which is calculated once, or for large
+    feasible sets using expm_multiply.
+
+    The quantum walk mixer applies its single qubit walks in a fixed order,
+    so it is not invariant under permutations of identical items and the
+    simulation does not use the symmetric subspace.
+
+    Attributes:
+    states (np.ndarray): the feasible choices, as integers
+    pairs (list): for every item j, the positions in states of the pairs of
+        feasible choices differing in item j
+    mixer_method (str): "direct", "power" or "auto"
+    tables (problem_tables.ProblemTables): the tables of the problem
+        attached by problem_tables.attach_worker, None if there are none
+    beta_max (float): the upper bound of beta for m = None
+    """
+
+    # maximum number of feasible choices for an eigendecomposition of A
+    max_eigh_dimension = 4096
+
+    def __init__(self, problem: KnapsackProblem, p: int, m, mixer_method="auto",
+                 beta_max=2 * math.pi):
+        """Initialize the simulation."""
+        self.problem = problem
+        self.p = p
+        self.m = m
+        self.mixer_method = mixer_method
+        self.beta_max = beta_max
+        self.tables = _attached_tables(problem, [[j] for j in range(problem.N)])
+        register, c = _oracle_register(problem, problem.total_weight)
+        if register >= problem.total_weight and self.tables is not None:
+            self.states = np.flatnonzero(self.tables.feasible)
+        elif register >= problem.total_weight:
+            # the register does not overflow, so the oracle accepts exactly
+            # the choices within the capacity
+            self.states = knapsack.feasible_states(problem)
+        else:
+            indices = np.arange(2**problem.N)
+            weights = computational_sums(problem.weights, indices)
+            register, c = _oracle_register(problem, weights)
+            self.states = indices[register < 2**c]
+        self.pairs = knapsack.neighbor_index(self.states, problem.N)
+        self._mixers = {}
+        self._adjacency = None
+        self._eigh = None
+
+    def sums(self, coefficients):
+        """Return sum(coefficients[q] * x_q) for the feasible choices."""
+        if self.tables is not None:
+            if list(coefficients) == list(self.problem.values):
+                return self.tables.values[self.states]
+            if list(coefficients) == list(self.problem.weights):
+                return self.tables.weights[self.states]
+        return computational_sums(coefficients, self.states)
+
+    def cost(self):
+        """Return f with phase separation exp(-i gamma f), as in DephaseValue."""
+        return self.sums(self.problem.values)
+
+    def objective(self):
+        """Return qwqaoa.objective_function for the feasible choices."""
+        return self.sums(self.problem.values)
+
+    def comparable_objective(self):
+        """Return the approach independent objective for the feasible choices."""
+        return comparable_objective(self.problem, self.sums)
+
+    def _use_power(self):
+        """Return whether to apply the mixer as a power of the walk product."""
+        if self.mixer_method != "auto":
+            return self.mixer_method == "power"
+        # rough operation counts, including the overhead of numpy calls
+        F = len(self.states)
+        N = self.problem.N
+        overhead = 3000
+        direct = self.m * N * (F + overhead)
+        power = (N * (F**2 + overhead)
+                 + 2 * math.ceil(math.log2(self.m)) * (F**3 / 8 + overhead))
+        return power < direct
+
+    def _apply_walks(self, state, beta):
+        """Apply the N single qubit walks with angle beta to the rows of state."""
+        c = np.cos(beta)
+        s = np.sin(beta)
+        for lower, upper in self.pairs:
+            x0 = state[lower]
+            x1 = state[upper]
+            state[lower] = c * x0 - 1j * s * x1
+            state[upper] = c * x1 - 1j * s * x0
+        return state
+
+    def mixer(self, beta):
+        """Return the matrix of the quantum walk mixer on the feasible subspace."""
+        if beta not in self._mixers:
+            if len(self._mixers) > 64:
+                self._mixers.clear()
+            identity = np.eye(len(self.states), dtype=complex)
+            walks = self._apply_walks(identity, beta / self.m)
+            self._mixers[beta] = np.linalg.matrix_power(walks, self.m)
+        return self._mixers[beta]
+
+    def adjacency(self):
+        """Return the sparse adjacency matrix of the feasible neighbors."""
+        from scipy.sparse import coo_matrix
+        if self._adjacency is None:
+            rows = np.concatenate([lower for lower, __ in self.pairs])
+            columns = np.concatenate([upper for __, upper in self.pairs])
+            F = len(self.states)
+            adjacency = coo_matrix((np.ones(len(rows)), (rows, columns)),
+                                   shape=(F, F))
+            self._adjacency = (adjacency + adjacency.T).tocsr()
+        return self._adjacency
+
+    def apply_continuous_mixer(self, state, beta):
+        """Apply the continuous-time quantum walk exp(-i beta A)."""
+        if len(self.states) > self.max_eigh_dimension:
+            from scipy.sparse.linalg import expm_multiply
+            return expm_multiply(-1j * beta * self.adjacency(), state)
+        if self._eigh is None:
+            self._eigh = np.linalg.eigh(self.adjacency().toarray())
+        eigenvalues, eigenvectors = self._eigh
+        phases = np.exp(-1j * beta * eigenvalues)
+        return eigenvectors @ (phases * (eigenvectors.T @ state))
+
+    def apply_mixer(self, state, beta):
+        """Apply the quantum walk mixer, as in QuantumWalkMixer."""
+        if self.m is None:
+            return self.apply_continuous_mixer(state, beta)
+        if self._use_power():
+            return self.mixer(beta) @ state
+        state = state.copy()
+        for __ in range(self.m):
+            state = self._apply_walks(state, beta / self.m)
+        return state
+
+    def statevector(self, angles):
+        """Return the state on the feasible subspace for angles = [gamma0, beta0, gamma1, ...]."""
+        cost = self.cost()
+        state = np.zeros(len(self.states), dtype=complex)
+        state[0] = 1
+
+        def apply_layer(state, layer, gamma, beta):
+            state = state * np.exp(-1j * gamma * cost)
+            return self.apply_mixer(state, beta)
+
+        return self._evolve(state, angles, (), apply_layer)
+
+    def probabilities(self, angles):
+        """Return the probabilities of the feasible choices."""
+        return np.abs(self.statevector(angles))**2
+
+    def probabilities_dict(self, angles):
+        """Return the probabilities in the format of Statevector.probabilities_dict."""
+        probabilities = np.zeros(2**self.problem.N)
+        probabilities[self.states] = self.probabilities(angles)
+        return probabilities_dict(probabilities, self.problem.N)
+
+    def expectation_value(self, angles):
+        """Return the expectation value of the objective function."""
+        return self.probabilities(angles).dot(self.objective())
+
+    def comparable_expectation_value(self, angles):
+        """Return the expectation value of the approach independent objective."""
+        return self.probabilities(angles).dot(self.comparable_objective())
+
+    def beta_range(self):
+        if self.m is None:
+            # exp(-i beta A) is not periodic unless the feasible choices
+            # form the full hypercube (period pi), so the range is a choice
+            return 0, self.beta_max
+        return 0, self.m * math.pi
+
+    @staticmethod
+    def gamma_range():
+        return 0, 2 * math.pi
+
+
+class BatchedLinQAOA:
+    """Native simulation of circuits.LinQAOA for many instances at once.
+
+    The states of B instances with the same number of items N are stacked
+    into a B x 2^N array, so the phase separation and the mixer are applied
+    to all instances in single vectorized operations. The angles and the
+    penalty factor a are either shared by all instances or given per
+    instance, i.e. with an additional leading axis of length B. The
+    symmetric subspace is not used, as its groups differ between instances.
+
+    Attributes:
+    batch (instances.ProblemBatch): the instances
+    values (np.ndarray): the values of all choices, B x 2^N
+    weights (np.ndarray): the weights of all choices, B x 2^N
+    """
+
+    def __init__(self, batch, p: int):
+        """Initialize the simulation of a ProblemBatch or list of problems."""
+        import instances
+        if not isinstance(batch, instances.ProblemBatch):
+            batch = instances.ProblemBatch.from_problems(batch)
+        sizes = batch.sizes
+        if len(sizes) and np.any(sizes != sizes[0]):
+            raise ValueError("All instances of a batch need the same number of items.")
+        self.batch = batch
+        self.p = p
+        self.N = N = int(sizes[0]) if len(sizes) else 0
+        B = len(batch)
+        bits = (np.arange(2**N)[None, :] >> np.arange(N)[:, None]) & 1
+        self.values = np.reshape(batch.values, (B, N)) @ bits
+        self.weights = np.reshape(batch.weights, (B, N)) @ bits
+        self.capacities = np.asarray(batch.capacities)[:, None]
+        # the feasibility oracle, as in _oracle_register
+        total_weights = np.reshape(batch.weights, (B, N)).sum(axis=1)
+        n = np.frexp(total_weights)[1]
+        c = np.frexp(batch.capacities)[1]
+        n = np.where(c == n, n + 1, n)
+        w0 = 2**c - batch.capacities - 1
+        self._register = (self.weights + w0[:, None]) % 2**n[:, None]
+        self._threshold = 2**c[:, None]
+
+    def cost(self, a, layer=0):
+        """Return f with phase separation exp(-i gamma f), see linqaoa_cost."""
+        a = np.reshape(a, (-1, 1))
+        penalized = (self._register >= self._threshold) == (layer % 2 == 0)
+        penalty = np.where(penalized, a * (self._register - self._threshold), 0)
+        return self.values - penalty
+
+    def objective(self, a):
+        """Return linqaoa.objective_function for all choices of all instances."""
+        a = np.reshape(a, (-1, 1))
+        return self.values - a * np.maximum(self.weights - self.capacities, 0)
+
+    def comparable_objective(self):
+        """Return the approach independent objective of all instances."""
+        return np.where(self.weights <= self.capacities, self.values, 0)
+
+    def _apply_mixer(self, state, betas):
+        """Apply exp(-i beta X) to every qubit, with beta per instance.
+
+        The state has shape 2^N x B, so the operations on every qubit act
+        on contiguous blocks of the B instances."""
+        c = np.cos(betas)
+        s = -1j * np.sin(betas)
+        for qubit in range(self.N):
+            tensor = state.reshape(-1, 2, 2**qubit, len(betas))
+            x0 = tensor[:, 0].copy()
+            tensor[:, 0] *= c
+            tensor[:, 0] += s * tensor[:, 1]
+            tensor[:, 1] *= c
+            tensor[:, 1] += s * x0
+        return state
+
+    def statevector(self, angles, a):
+        """Return the B x 2^N states for angles = [gamma0, beta0, gamma1, ...]."""
+        angles = np.broadcast_to(angles, (len(self.batch), 2 * self.p))
+        costs = [np.ascontiguousarray(self.cost(a, layer).T) for layer in range(2)]
+        state = np.full((2**self.N, len(self.batch)), 2**(-self.N / 2),
+                        dtype=complex)
+        for layer in range(self.p):
+            state *= np.exp(-1j * angles[:, 2 * layer] * costs[layer % 2])
+            state = self._apply_mixer(state, angles[:, 2 * layer + 1])
+        return state.T
+
+    def probabilities(self, angles, a):
+        """Return the probabilities of the choices of all instances."""
+        return np.abs(self.statevector(angles, a))**2
+
+    def expectation_values(self, angles, a):
+        """Return the expectation values of the objective function."""
+        return np.sum(self.probabilities(angles, a) * self.objective(a), axis=1)
+
+    def comparable_expectation_values(self, angles, a):
+        """Return the expectation values of the approach independent objective."""
+        return np.sum(self.probabilities(angles, a) * self.comparable_objective(),
+                      axis=1)
+
+    def best_values(self):
+        """Return the values of the optimal choices of all instances."""
+        return self.comparable_objective().max(axis=1)
+
+    def approximation_ratios(self, angles, a):
+        """Return the approximation ratios of all instances."""
+        return self.comparable_expectation_values(angles, a) / self.best_values()
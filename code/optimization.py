@@ -1,6 +1,5 @@
 """Helper functions for optimizing the parameters beta, gamma."""
 import numpy as np
-from scipy.optimize import shgo
 
 
 def average_value(probs_dict, func):
@@ -11,8 +10,221 @@ def average_value(probs_dict, func):
     return sum(values * probs)
 
 
-def optimize_angles(p, angles_to_value, gamma_range, beta_range):
-    """Optimize the parameters beta, gamma for a given function angles_to_value"""
-    bounds = np.array([gamma_range, beta_range] * p)
-    result = shgo(angles_to_value, bounds, iters=3)
+def refine_angles(angles_to_value, angles, gamma_range, beta_range,
+                  maxiter=100, bounds=None):
+    """Locally optimize the parameters beta, gamma, starting from angles.
+
+    bounds (a 2p x 2 array) replace the ranges if given."""
+    from scipy.optimize import minimize
+    if bounds is None:
+        bounds = np.array([gamma_range, beta_range] * (len(angles) // 2))
+    angles = np.clip(angles, bounds[:, 0], bounds[:, 1])
+    result = minimize(angles_to_value, angles, method="Nelder-Mead",
+                      bounds=bounds, options={"maxiter": maxiter})
     return result.x
+
+
+def refine_layerwise(angles_to_value, angles, gamma_range, beta_range,
+                     sweeps=1, maxiter=50, bounds=None):
+    """Locally optimize one layer of angles at a time, from the last to the first.
+
+    Only the angles of later layers change while a layer is optimized, so
+    with a native simulation with cache_prefixes, every evaluation only
+    applies the remaining layers, see cache_prefixes_for. bounds (a 2p x 2
+    array) replace the ranges if given."""
+    from scipy.optimize import minimize
+    if bounds is None:
+        bounds = np.array([gamma_range, beta_range] * (len(angles) // 2))
+    angles = np.clip(np.array(angles, dtype=float), bounds[:, 0], bounds[:, 1])
+    for __ in range(sweeps):
+        for layer in reversed(range(len(angles) // 2)):
+            def layer_to_value(layer_angles):
+                angles[2 * layer:2 * layer + 2] = layer_angles
+                return angles_to_value(angles)
+
+            start = angles[2 * layer:2 * layer + 2].copy()
+            result = minimize(layer_to_value, start, method="Nelder-Mead",
+                              bounds=bounds[2 * layer:2 * layer + 2],
+                              options={"maxiter": maxiter})
+            angles[2 * layer:2 * layer + 2] = result.x
+    return angles
+
+
+def cache_prefixes_for(circuit, optimizer):
+    """Enable cache_prefixes of native simulations for the layerwise optimizer.
+
+    optimizer is the name "layerwise" or an optimizers.Layerwise. Circuits of
+    circuits.py and simulations that already cache their prefixes are left
+    as they are."""
+    import optimizers
+    layerwise = (optimizer == "layerwise"
+                 or isinstance(optimizer, optimizers.Layerwise))
+    if layerwise and getattr(circuit, "prefix_cache", False) is None:
+        circuit.cache_prefixes()
+
+
+def fourier_angles(coefficients, p):
+    """Expand Fourier coefficients to angles = [gamma0, beta0, gamma1, ...].
+
+    coefficients = [u1, v1, u2, v2, ...] define the schedules of the
+    FOURIER parametrization of Zhou et al., arXiv:1812.01041:
+    gamma_i = sum_k u_k sin((k - 1/2) (i - 1/2) pi / p),
+    beta_i = sum_k v_k cos((k - 1/2) (i - 1/2) pi / p)."""
+    coefficients = np.asarray(coefficients)
+    q = len(coefficients) // 2
+    phases = np.outer(np.arange(p) + 0.5, np.arange(q) + 0.5) * np.pi / p
+    angles = np.empty(2 * p)
+    angles[0::2] = np.sin(phases) @ coefficients[0::2]
+    angles[1::2] = np.cos(phases) @ coefficients[1::2]
+    return angles
+
+
+def optimize_fourier_angles(p, angles_to_value, gamma_range, beta_range,
+                            max_q=None, tolerance=1e-3):
+    """Optimize the parameters beta, gamma in the FOURIER parametrization.
+
+    The optimization starts with q = 1 pair of coefficients, which is
+    optimized globally. Then q is increased by one, starting from the
+    previous coefficients, as long as this improves the value by more than
+    tolerance (relative to the value) and q <= max_q (default p)."""
+    from scipy.optimize import minimize, shgo
+    max_q = min(max_q or p, p)
+
+    def coefficients_to_value(coefficients):
+        return angles_to_value(fourier_angles(coefficients, p))
+
+    result = shgo(coefficients_to_value, [gamma_range, beta_range], iters=3)
+    coefficients, value = result.x, result.fun
+    gamma_width = gamma_range[1] - gamma_range[0]
+    beta_width = beta_range[1] - beta_range[0]
+    for q in range(2, max_q + 1):
+        bounds = [(-gamma_width, gamma_width), (-beta_width, beta_width)] * q
+        result = minimize(coefficients_to_value, [*coefficients, 0, 0],
+                          method="Nelder-Mead", bounds=bounds)
+        improvement = value - result.fun
+        if improvement > 0:
+            coefficients, value = result.x, result.fun
+        if improvement <= tolerance * max(abs(value), 1):
+            break
+    return fourier_angles(coefficients, p)
+
+
+def optimize_angles(p, angles_to_value, gamma_range, beta_range,
+                    initial_angles=None, refine=True, fourier=None,
+                    optimizer=None, domain=None, checkpoint=None,
+                    checkpoint_key=None):
+    """Optimize the parameters beta, gamma for a given function angles_to_value
+
+    If initial_angles are given, e.g. from an angle_library.AngleLibrary,
+    they are only refined locally, or returned as they are if not refine.
+    If fourier is given, the angles are optimized in the FOURIER
+    parametrization with at most fourier pairs of coefficients, see
+    optimize_fourier_angles. Otherwise, optimizer(p, angles_to_value,
+    gamma_range, beta_range) is used instead of SHGO, if given, e.g. a
+    surrogate.SurrogateOptimizer, or the name of an optimizer in
+    optimizers.OPTIMIZERS.
+
+    If domain (a domains.AngleDomain) is given, the search is restricted to
+    its fundamental domain, also for the local refinement and for the
+    optimizer, which then has to accept bounds as keyword argument, and the
+    result is returned in canonical form. The FOURIER parametrization cannot
+    be restricted to a box of the angles, so it raises a ValueError with a
+    domain.
+
+    If checkpoint (a path) is given, the evaluations are journaled there,
+    and an interrupted optimization is resumed from it when called again,
+    see checkpoint.Journal. checkpoint_key describes angles_to_value, e.g.
+    the approach, the problem and the penalty factors; together with the
+    other arguments it identifies the journal. The journal is removed when
+    the optimization is complete."""
+    if checkpoint is not None:
+        import checkpoint as ckpt
+        key = (checkpoint_key, p, gamma_range, beta_range, initial_angles,
+               refine, fourier, optimizer, domain)
+        journal = ckpt.Journal(checkpoint, 2 * p, key)
+        try:
+            angles = optimize_angles(p, journal.wrap(angles_to_value),
+                                     gamma_range, beta_range, initial_angles,
+                                     refine, fourier, optimizer, domain)
+        finally:
+            journal.close()
+        journal.remove()
+        return angles
+    bounds = np.array([gamma_range, beta_range] * p)
+    if domain is not None:
+        gamma_range, beta_range = domain.gamma_range, domain.beta_range
+        bounds = domain.bounds(p)
+        if initial_angles is not None:
+            initial_angles = domain.canonical(initial_angles)
+    if initial_angles is not None:
+        if not refine:
+            angles = np.asarray(initial_angles)
+        else:
+            angles = refine_angles(angles_to_value, initial_angles,
+                                   gamma_range, beta_range, bounds=bounds)
+    elif fourier is not None:
+        if domain is not None:
+            raise ValueError("The FOURIER parametrization cannot be "
+                             "restricted to a domain of the angles.")
+        angles = optimize_fourier_angles(p, angles_to_value, gamma_range,
+                                         beta_range, fourier)
+    elif optimizer is not None:
+        if isinstance(optimizer, str):
+            import optimizers
+            optimizer = optimizers.get_optimizer(optimizer)
+        if domain is not None:
+            angles = optimizer(p, angles_to_value, gamma_range, beta_range,
+                               bounds=bounds)
+        else:
+            angles = optimizer(p, angles_to_value, gamma_range, beta_range)
+    else:
+        from scipy.optimize import shgo
+        angles = shgo(angles_to_value, bounds, iters=3).x
+    if domain is not None:
+        angles = domain.canonical(angles)
+    return angles
+
+
+def optimize_approach_angles(approach, circuit, problem, penalties, m,
+                             angles_to_value, gamma_range, sampling=None,
+                             library=None, fourier=None, optimizer=None,
+                             domain=None, initial_angles=None,
+                             checkpoint=None):
+    """Optimize the angles of the circuit of an approach for an instance.
+
+    This implements find_optimal_angles of linqaoa, quadqaoa and qwqaoa,
+    which pass their objective function angles_to_value, their gamma_range,
+    the penalty factors and the number of walk steps m (None for linqaoa
+    and quadqaoa). sampling (a smp.SamplingConfig) only distinguishes the
+    checkpoint, angles_to_value is estimated from samples already.
+
+    If library (an angle_library.AngleLibrary) has angles for the instance,
+    they are used instead of a global optimization. If fourier is given,
+    the angles are optimized in the FOURIER parametrization with at most
+    fourier pairs of coefficients. optimizer replaces SHGO, see
+    optimize_angles; for "layerwise", cache_prefixes of native simulations
+    is enabled. domain (a domains.AngleDomain, or True for the domain of
+    the instance) restricts the search to the fundamental domain of the
+    angles. initial_angles, e.g. of a neighboring penalty factor, are
+    refined locally instead of a global optimization. checkpoint is a file
+    to resume an interrupted optimization from, which reproduces it exactly
+    unless sampling, see checkpoint.py."""
+    cache_prefixes_for(circuit, optimizer)
+    if domain is True:
+        import domains
+        domain = domains.angle_domain(approach, problem, penalties, m,
+                                      circuit.beta_range()[1])
+    from_library = False
+    if library is not None and initial_angles is None:
+        initial_angles = library.lookup(approach, problem, circuit.p, m,
+                                        penalties)
+        from_library = initial_angles is not None
+    angles = optimize_angles(circuit.p, angles_to_value, gamma_range,
+                             circuit.beta_range(), initial_angles,
+                             not from_library or library.refine, fourier,
+                             optimizer, domain, checkpoint,
+                             (approach, problem, penalties, m, sampling))
+    if library is not None and library.update and not from_library:
+        library.record(approach, problem, circuit.p, m, penalties,
+                       angles=angles)
+    return angles
@@ -0,0 +1,337 @@
+"""Registry of optimizers of the angles with a common interface.
+
+Every optimizer is called as optimizer(p, angles_to_value, gamma_range,
+beta_range), like surrogate.SurrogateOptimizer, so it can be passed to
+optimization.optimize_angles and the find_optimal_angles functions, or
+selected there by its name in OPTIMIZERS. Every optimizer stops after at
+most max_evaluations evaluations of angles_to_value, and the Run of its
+last call records how many evaluations and how much time it needed to
+reach a target, e.g. an approximation ratio, see evaluations_to_target.
+"""
+import time
+
+import numpy as np
+
+
+class BudgetExhausted(Exception):
+    """Raised by Run when the maximum number of evaluations is reached."""
+
+
+class Run:
+    """The evaluations of one optimization.
+
+    Attributes:
+    angles_to_value (callable): the function to minimize
+    max_evaluations (int): the budget, None for no limit
+    angles_to_score (callable): angles_to_score(angles), e.g. the
+        approximation ratio, is evaluated for every improvement of the best
+        value, None if there is no target
+    target (float): the score to reach
+    evaluations (int): the number of evaluations so far
+    best_angles (np.ndarray): the best angles so far
+    best_value (float): the value of the best angles
+    best_score (float): the score of the best angles
+    target_evaluations (int): the number of evaluations until the target
+        was reached, None if it was not
+    target_seconds (float): the time until the target was reached
+    seconds (float): the total time of the optimization, without the time
+        spent in angles_to_score
+    """
+
+    def __init__(self, angles_to_value, max_evaluations=None,
+                 angles_to_score=None, target=None):
+        self.angles_to_value = angles_to_value
+        self.max_evaluations = max_evaluations
+        self.angles_to_score = angles_to_score
+        self.target = target
+        self.evaluations = 0
+        self.best_angles = None
+        self.best_value = np.inf
+        self.best_score = None
+        self.target_evaluations = None
+        self.target_seconds = None
+        self.seconds = 0.0
+        self._start = time.perf_counter()
+        # time spent in angles_to_score, which is not charged to the optimizer
+        self._scoring = 0.0
+
+    @property
+    def reached(self):
+        return self.target_evaluations is not None
+
+    def _elapsed(self):
+        return time.perf_counter() - self._start - self._scoring
+
+    def __call__(self, angles):
+        if (self.max_evaluations is not None
+                and self.evaluations >= self.max_evaluations):
+            raise BudgetExhausted
+        value = float(self.angles_to_value(angles))
+        self.evaluations += 1
+        if value < self.best_value:
+            self.best_value = value
+            self.best_angles = np.array(angles, dtype=float)
+            if self.angles_to_score is not None:
+                elapsed = self._elapsed()
+                scoring = time.perf_counter()
+                self.best_score = self.angles_to_score(self.best_angles)
+                self._scoring += time.perf_counter() - scoring
+                if (not self.reached and self.target is not None
+                        and self.best_score >= self.target):
+                    self.target_evaluations = self.evaluations
+                    self.target_seconds = elapsed
+        self.seconds = self._elapsed()
+        return value
+
+
+class Optimizer:
+    """Base class of the optimizers, which implement minimize.
+
+    Attributes:
+    max_evaluations (int): the budget of an optimization, None for the
+        default of the method
+    seed (int): seed of the random starting points and samples
+    run (Run): the evaluations of the last optimization
+    """
+
+    def __init__(self, max_evaluations=None, seed=None):
+        self.max_evaluations = max_evaluations
+        self.seed = seed
+        self.run = None
+
+    def minimize(self, function, bounds, rng):
+        """Minimize function within bounds (an n x 2 array)."""
+        raise NotImplementedError
+
+    def __call__(self, p, angles_to_value, gamma_range, beta_range,
+                 angles_to_score=None, target=None, bounds=None):
+        """Return the best angles found within the budget.
+
+        bounds (a 2p x 2 array) replace the ranges, e.g. the bounds of a
+        domains.AngleDomain."""
+        if bounds is None:
+            bounds = np.array([gamma_range, beta_range] * p, dtype=float)
+        bounds = np.asarray(bounds, dtype=float)
+        self.run = Run(angles_to_value, self.max_evaluations, angles_to_score,
+                       target)
+        try:
+            self.minimize(self.run, bounds, np.random.default_rng(self.seed))
+        except BudgetExhausted:
+            pass
+        return self.run.best_angles
+
+
+def random_start(bounds, rng):
+    return rng.uniform(bounds[:, 0], bounds[:, 1])
+
+
+class SHGO(Optimizer):
+    """SciPy's simplicial homology global optimization, as by default."""
+
+    def __init__(self, iters=3, **kwargs):
+        super().__init__(**kwargs)
+        self.iters = iters
+
+    def minimize(self, function, bounds, rng):
+        from scipy.optimize import shgo
+        shgo(function, bounds, iters=self.iters)
+
+
+class LocalOptimizer(Optimizer):
+    """A local method of scipy.optimize.minimize from a random start."""
+
+    def __init__(self, method, **kwargs):
+        super().__init__(**kwargs)
+        self.method = method
+
+    def minimize(self, function, bounds, rng):
+        from scipy.optimize import minimize
+        minimize(function, random_start(bounds, rng), method=self.method,
+                 bounds=bounds)
+
+
+class Layerwise(Optimizer):
+    """optimization.refine_layerwise from a random start.
+
+    The find_optimal_angles functions enable cache_prefixes of native
+    simulations for it, so most evaluations only apply the last layers."""
+
+    def __init__(self, sweeps=2, **kwargs):
+        super().__init__(**kwargs)
+        self.sweeps = sweeps
+
+    def minimize(self, function, bounds, rng):
+        from optimization import refine_layerwise
+        refine_layerwise(function, random_start(bounds, rng), None, None,
+                         self.sweeps, bounds=bounds)
+
+
+class DifferentialEvolution(Optimizer):
+    """SciPy's differential evolution."""
+
+    def __init__(self, popsize=8, **kwargs):
+        super().__init__(**kwargs)
+        self.popsize = popsize
+
+    def minimize(self, function, bounds, rng):
+        from scipy.optimize import differential_evolution
+        differential_evolution(function, bounds, popsize=self.popsize,
+                               seed=rng, polish=False)
+
+
+class SPSA(Optimizer):
+    """Simultaneous perturbation stochastic approximation.
+
+    Every iteration estimates the gradient from two evaluations along a
+    random direction, in coordinates scaled to the unit box. The step size
+    is calibrated such that the first step has length step."""
+
+    def __init__(self, max_evaluations=200, perturbation=0.1, step=0.1,
+                 alpha=0.602, gamma=0.101, **kwargs):
+        super().__init__(max_evaluations or 200, **kwargs)
+        self.perturbation = perturbation
+        self.step = step
+        self.alpha = alpha
+        self.gamma = gamma
+
+    def minimize(self, function, bounds, rng):
+        lower, width = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+
+        def scaled(u):
+            return function(lower + width * np.clip(u, 0, 1))
+
+        def gradient(u, c):
+            delta = rng.choice([-1, 1], len(u))
+            return (scaled(u + c * delta) - scaled(u - c * delta)) / (2 * c) * delta
+
+        u = rng.uniform(0, 1, len(bounds))
+        calibration = np.mean([np.abs(gradient(u, self.perturbation)).mean()
+                               for __ in range(3)])
+        stability = 0.1 * self.max_evaluations / 2
+        a = self.step * (1 + stability)**self.alpha / max(calibration, 1e-12)
+        # every iteration takes two evaluations, after six for the calibration
+        for k in range((self.max_evaluations - 6) // 2):
+            c = self.perturbation / (k + 1)**self.gamma
+            step = a / (k + 1 + stability)**self.alpha
+            u = np.clip(u - step * gradient(u, c), 0, 1)
+        return lower + width * u
+
+
+class CMAES(Optimizer):
+    """Covariance matrix adaptation evolution strategy.
+
+    The standard (mu/mu_w, lambda)-CMA-ES of Hansen, arXiv:1604.00772, in
+    coordinates scaled to the unit box, with candidates clipped to it."""
+
+    def __init__(self, max_evaluations=200, sigma=0.3, **kwargs):
+        super().__init__(max_evaluations or 200, **kwargs)
+        self.sigma = sigma
+
+    def minimize(self, function, bounds, rng):
+        lower, width = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+        n = len(bounds)
+        population = 4 + int(3 * np.log(n))
+        mu = population // 2
+        weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        weights /= weights.sum()
+        mu_eff = 1 / np.sum(weights**2)
+        cc = (4 + mu_eff / n) / (n + 4 + 2 * mu_eff / n)
+        cs = (mu_eff + 2) / (n + mu_eff + 5)
+        c1 = 2 / ((n + 1.3)**2 + mu_eff)
+        cmu = min(1 - c1, 2 * (mu_eff - 2 + 1 / mu_eff) / ((n + 2)**2 + mu_eff))
+        damps = 1 + 2 * max(0, np.sqrt((mu_eff - 1) / (n + 1)) - 1) + cs
+        chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n**2))
+        generations = self.max_evaluations // population
+
+        mean = rng.uniform(0, 1, n)
+        sigma = self.sigma
+        covariance = np.eye(n)
+        pc = np.zeros(n)
+        ps = np.zeros(n)
+        for generation in range(1, generations + 1):
+            eigenvalues, B = np.linalg.eigh(covariance)
+            D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+            z = rng.standard_normal((population, n))
+            x = np.clip(mean + sigma * (z * D) @ B.T, 0, 1)
+            values = [function(lower + width * candidate) for candidate in x]
+            x = x[np.argsort(values)[:mu]]
+            y = (x - mean) / sigma
+            y_w = weights @ y
+            mean = weights @ x
+            ps = (1 - cs) * ps + np.sqrt(cs * (2 - cs) * mu_eff) * (B @ ((B.T @ y_w) / D))
+            hsig = (np.linalg.norm(ps) / np.sqrt(1 - (1 - cs)**(2 * generation))
+                    / chi_n < 1.4 + 2 / (n + 1))
+            pc = (1 - cc) * pc + hsig * np.sqrt(cc * (2 - cc) * mu_eff) * y_w
+            covariance = ((1 - c1 - cmu) * covariance
+                          + c1 * (np.outer(pc, pc)
+                                  + (1 - hsig) * cc * (2 - cc) * covariance)
+                          + cmu * (y.T * weights) @ y)
+            sigma *= np.exp(cs / damps * (np.linalg.norm(ps) / chi_n - 1))
+        return lower + width * mean
+
+
+class Surrogate(Optimizer):
+    """The Gaussian process surrogate optimizer of surrogate.py."""
+
+    def __init__(self, max_evaluations=40, seed=None, **options):
+        super().__init__(max_evaluations or 40, seed)
+        self.options = options
+
+    def minimize(self, function, bounds, rng):
+        import surrogate
+        optimizer = surrogate.SurrogateOptimizer(
+            budget=self.max_evaluations, seed=rng.integers(2**31),
+            **self.options)
+        optimizer(len(bounds) // 2, function, tuple(bounds[0]),
+                  tuple(bounds[1]), bounds=bounds)
+
+
+OPTIMIZERS = {
+    "shgo": SHGO,
+    "cobyla": lambda **kwargs: LocalOptimizer("COBYLA", **kwargs),
+    "nelder-mead": lambda **kwargs: LocalOptimizer("Nelder-Mead", **kwargs),
+    "l-bfgs-b": lambda **kwargs: LocalOptimizer("L-BFGS-B", **kwargs),
+    "layerwise": Layerwise,
+    "differential-evolution": DifferentialEvolution,
+    "spsa": SPSA,
+    "cma-es": CMAES,
+    "surrogate": Surrogate,
+}
+
+
+def get_optimizer(name, **options):
+    """Return a new optimizer of the given name in OPTIMIZERS."""
+    if name not in OPTIMIZERS:
+        raise ValueError(f"Unknown optimizer {name!r}, expected one of "
+                         f"{list(OPTIMIZERS)}.")
+    return OPTIMIZERS[name](**options)
+
+
+def evaluations_to_target(names, p, angles_to_value, gamma_range, beta_range,
+                          angles_to_score, target, max_evaluations=200,
+                          seeds=(0,)):
+    """Run every optimizer of names with every seed and report its cost.
+
+    Returns a list of dicts of the optimizer, the seed, whether the target
+    score was reached, the evaluations and seconds until then, the total
+    evaluations and seconds and the best score. SHGO does not support a
+    budget of its own, so it is stopped at max_evaluations."""
+    reports = []
+    for name in names:
+        for seed in seeds:
+            optimizer = get_optimizer(name, max_evaluations=max_evaluations,
+                                      seed=seed)
+            optimizer(p, angles_to_value, gamma_range, beta_range,
+                      angles_to_score, target)
+            run = optimizer.run
+            reports.append({
+                "optimizer": name,
+                "seed": seed,
+                "reached": run.reached,
+                "target_evaluations": run.target_evaluations,
+                "target_seconds": run.target_seconds,
+                "evaluations": run.evaluations,
+                "seconds": run.seconds,
+                "best_score": run.best_score,
+            })
+    return reports
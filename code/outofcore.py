@@ -0,0 +1,278 @@
+"""Out-of-core native simulation using memory-mapped statevectors.
+
+For instances whose statevector does not fit into memory, the statevector is
+stored in a file on local disk and processed in chunks of 2^L amplitudes.
+The qubits are ordered such that the L lowest qubits are local to a chunk:
+a diagonal phase layer and the mixer on the local qubits are applied in a
+single pass over the chunks. The remaining H = n - L global qubits are local
+to slabs of 2^(L - H) columns of all 2^H chunks, so the mixer on them is
+applied in a second pass over the slabs. Every layer thus streams twice
+through the file, independent of the number of qubits.
+
+The phases are calculated per chunk from tables for the local qubits, so
+no table of size 2^n is held in memory either. Expectation values are
+accumulated chunk by chunk, whereas probabilities are only available for
+up to L qubits, as those of more qubits would not fit into memory.
+
+Usage:
+with outofcore.OutOfCoreLinQAOA(problem, p, directory="/scratch") as circuit:
+    angles = linqaoa.find_optimal_angles(circuit, problem, a)
+"""
+import math
+import tempfile
+
+import numpy as np
+
+from knapsack import KnapsackProblem
+import native
+
+
+DTYPES = {
+    "double": np.complex128,
+    "single": np.complex64,
+}
+
+
+def apply_rx(state, beta, qubits):
+    """Apply exp(-i beta X) in place to the given qubits of a flat array."""
+    c = np.cos(beta)
+    s = np.sin(beta)
+    for qubit in qubits:
+        tensor = state.reshape(-1, 2, 2**qubit)
+        x0 = tensor[:, 0, :].copy()
+        tensor[:, 0, :] *= c
+        tensor[:, 0, :] -= 1j * s * tensor[:, 1, :]
+        tensor[:, 1, :] *= c
+        tensor[:, 1, :] -= 1j * s * x0
+
+
+class ChunkedStatevector:
+    """Statevector stored in a memory-mapped file and processed in chunks.
+
+    Attributes:
+    num_qubits (int): the number of qubits n
+    chunk_qubits (int): the number of qubits L local to a chunk
+    global_qubits (int): the number of qubits H = n - L
+    data (np.memmap): the amplitudes, with shape (2^H, 2^L)
+    """
+
+    def __init__(self, num_qubits, chunk_qubits=22, directory=None,
+                 precision="double"):
+        """Create the file of the statevector in directory."""
+        chunk_qubits = min(num_qubits, max(chunk_qubits,
+                                           math.ceil(num_qubits / 2)))
+        self.num_qubits = num_qubits
+        self.chunk_qubits = chunk_qubits
+        self.global_qubits = num_qubits - chunk_qubits
+        self._file = tempfile.NamedTemporaryFile(dir=directory,
+                                                 suffix=".statevector")
+        self.data = np.memmap(self._file, dtype=DTYPES[precision], mode="w+",
+                              shape=(2**self.global_qubits, 2**chunk_qubits))
+        self._tables = {}
+
+    def close(self):
+        """Delete the file of the statevector."""
+        if self._file.closed:
+            return
+        del self.data
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _table(self, coefficients):
+        """Return sum(coefficients[q] * x_q) over the local qubits."""
+        key = tuple(coefficients[:self.chunk_qubits])
+        if key not in self._tables:
+            if len(self._tables) > 64:
+                self._tables.clear()
+            indices = np.arange(2**self.chunk_qubits)
+            table = np.zeros(2**self.chunk_qubits)
+            for qubit, coefficient in enumerate(key):
+                table += coefficient * ((indices >> qubit) & 1)
+            self._tables[key] = table
+        return self._tables[key]
+
+    def sums(self, chunk):
+        """Return sums(coefficients) for the basis states of a chunk.
+
+        See the functions of native.py for the meaning of sums."""
+        def chunk_sums(coefficients):
+            coefficients = list(coefficients)
+            coefficients += [0] * (self.num_qubits - len(coefficients))
+            high = sum(coefficient * ((chunk >> k) & 1) for k, coefficient
+                       in enumerate(coefficients[self.chunk_qubits:]))
+            return self._table(coefficients) + high
+        return chunk_sums
+
+    def fill(self, amplitude):
+        """Set all amplitudes to the given value."""
+        for chunk in range(len(self.data)):
+            self.data[chunk] = amplitude
+
+    def apply_layer(self, phase, beta):
+        """Apply exp(-i phase) followed by exp(-i beta X) on every qubit.
+
+        phase(sums) returns the phases of a chunk, given its sums."""
+        for chunk in range(len(self.data)):
+            amplitudes = np.array(self.data[chunk])
+            amplitudes *= np.exp(-1j * phase(self.sums(chunk)))
+            apply_rx(amplitudes, beta, range(self.chunk_qubits))
+            self.data[chunk] = amplitudes
+        self.apply_global_mixer(beta)
+
+    def apply_global_mixer(self, beta):
+        """Apply exp(-i beta X) on the global qubits, slab by slab."""
+        if not self.global_qubits:
+            return
+        slab_bits = self.chunk_qubits - self.global_qubits
+        global_qubits = range(slab_bits, slab_bits + self.global_qubits)
+        for start in range(0, 2**self.chunk_qubits, 2**slab_bits):
+            columns = slice(start, start + 2**slab_bits)
+            slab = np.array(self.data[:, columns])
+            apply_rx(slab.reshape(-1), beta, global_qubits)
+            self.data[:, columns] = slab
+
+    def reduce(self, function):
+        """Return the sum of function(sums, probabilities) over all chunks."""
+        return sum(function(self.sums(chunk), np.abs(self.data[chunk])**2)
+                   for chunk in range(len(self.data)))
+
+    def probabilities(self, num_qubits=None):
+        """Return the probabilities of the lowest num_qubits qubits.
+
+        Raises a ValueError if num_qubits exceeds chunk_qubits, use reduce
+        to accumulate quantities of the probabilities of all qubits."""
+        num_qubits = num_qubits or self.num_qubits
+        if num_qubits > self.chunk_qubits:
+            raise ValueError(f"The probabilities of {num_qubits} qubits do not "
+                             f"fit into a chunk of {self.chunk_qubits} qubits.")
+        probabilities = np.zeros(2**num_qubits)
+        for chunk in range(len(self.data)):
+            chunk_probabilities = np.abs(self.data[chunk])**2
+            probabilities += chunk_probabilities.reshape(
+                -1, 2**num_qubits).sum(axis=0)
+        return probabilities
+
+
+class OutOfCoreSimulation(native.NativeSimulation):
+    """Base class of the out-of-core simulations.
+
+    The file of the statevector is deleted by close or at the end of a with
+    statement.
+
+    Attributes:
+    state (ChunkedStatevector): the statevector
+    """
+
+    def close(self):
+        """Delete the file of the statevector."""
+        self.state.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class OutOfCoreLinQAOA(OutOfCoreSimulation):
+    """Out-of-core simulation of circuits.LinQAOA.
+
+    The statevector is kept in a file in directory (default: the temporary
+    directory) and evolved anew for every set of angles."""
+
+    def __init__(self, problem: KnapsackProblem, p: int, chunk_qubits=22,
+                 directory=None, precision="double"):
+        """Initialize the simulation and create the file of the statevector."""
+        self.problem = problem
+        self.p = p
+        self.state = ChunkedStatevector(problem.N, chunk_qubits, directory,
+                                        precision)
+
+    def evolve(self, angles, a):
+        """Evolve the state for angles = [gamma0, beta0, gamma1, ...]."""
+        self.state.fill(2**(-self.problem.N / 2))
+        for layer, (gamma, beta) in enumerate(zip(angles[0::2], angles[1::2])):
+            def phase(sums):
+                return gamma * native.linqaoa_cost(self.problem, a, sums, layer)
+            self.state.apply_layer(phase, beta)
+
+    def probabilities(self, angles, a):
+        """Return the probabilities of the choice register.
+
+        Only available if N <= chunk_qubits, see ChunkedStatevector."""
+        self.evolve(angles, a)
+        return self.state.probabilities()
+
+    def probabilities_dict(self, angles, a):
+        """Return the probabilities in the format of Statevector.probabilities_dict."""
+        return native.probabilities_dict(self.probabilities(angles, a), self.problem.N)
+
+    def expectation_value(self, angles, a):
+        """Return the expectation value of the objective function."""
+        self.evolve(angles, a)
+        return self.state.reduce(lambda sums, probabilities: probabilities.dot(
+            native.linqaoa_objective(self.problem, a, sums)))
+
+    def comparable_expectation_value(self, angles, a):
+        """Return the expectation value of the approach independent objective."""
+        self.evolve(angles, a)
+        return self.state.reduce(lambda sums, probabilities: probabilities.dot(
+            native.comparable_objective(self.problem, sums)))
+
+    beta_range = staticmethod(native.NativeLinQAOA.beta_range)
+    gamma_range = staticmethod(native.NativeLinQAOA.gamma_range)
+
+
+class OutOfCoreQuadQAOA(OutOfCoreSimulation):
+    """Out-of-core simulation of circuits.QuadQAOA.
+
+    The choice register consists of the lowest qubits, so its probabilities
+    are available if N <= L."""
+
+    def __init__(self, problem: KnapsackProblem, p: int, chunk_qubits=22,
+                 directory=None, precision="double"):
+        """Initialize the simulation and create the file of the statevector."""
+        self.problem = problem
+        self.p = p
+        self.num_qubits = problem.N + problem.max_weight
+        self.state = ChunkedStatevector(self.num_qubits, chunk_qubits,
+                                        directory, precision)
+
+    def evolve(self, angles, a, b):
+        """Evolve the state for angles = [gamma0, beta0, gamma1, ...]."""
+        self.state.fill(2**(-self.num_qubits / 2))
+        for gamma, beta in zip(angles[0::2], angles[1::2]):
+            def phase(sums):
+                return gamma * native.quadqaoa_cost(self.problem, a, b, sums)
+            self.state.apply_layer(phase, beta)
+
+    def probabilities(self, angles, a, b, choices_only=True):
+        """Return the probabilities of the choice register or of all qubits."""
+        self.evolve(angles, a, b)
+        return self.state.probabilities(self.problem.N if choices_only else None)
+
+    def probabilities_dict(self, angles, a, b, choices_only=True):
+        """Return the probabilities in the format of Statevector.probabilities_dict."""
+        probabilities = self.probabilities(angles, a, b, choices_only)
+        num_qubits = self.problem.N if choices_only else self.num_qubits
+        return native.probabilities_dict(probabilities, num_qubits)
+
+    def expectation_value(self, angles, a, b):
+        """Return the expectation value of the objective function."""
+        self.evolve(angles, a, b)
+        return self.state.reduce(lambda sums, probabilities: probabilities.dot(
+            native.quadqaoa_objective(self.problem, a, b, sums)))
+
+    def comparable_expectation_value(self, angles, a, b):
+        """Return the expectation value of the approach independent objective."""
+        self.evolve(angles, a, b)
+        return self.state.reduce(lambda sums, probabilities: probabilities.dot(
+            native.comparable_objective(self.problem, sums)))
+
+    beta_range = staticmethod(native.NativeQuadQAOA.beta_range)
+    gamma_range = staticmethod(native.NativeQuadQAOA.gamma_range)
@@ -0,0 +1,166 @@
+"""Tuning of the penalty scaling factors a (LinQAOA) and b (QuadQAOA).
+
+Instead of optimizing the angles on a dense grid of penalty factors, the
+approximation ratio is maximized by a golden-section search between the
+minimum feasible factor (linqaoa.amin, quadqaoa.bmin) and an upper bound.
+Every optimization of the angles after the first is warm-started from the
+angles of the nearest factor evaluated so far and only refined locally.
+Optionally, the smallest factor whose ratio is within a tolerance of the
+best is then found by bisection.
+
+The factors are rounded to multiples of step, as the range of gamma grows
+with the denominator of the factor. QuadQAOA depends on b / a only, so a
+is fixed to 1 there.
+"""
+from dataclasses import dataclass, field
+from fractions import Fraction
+from functools import partial
+import math
+
+import knapsack
+import linqaoa
+import native as nsim
+import optimization
+import problem_tables
+import quadqaoa
+
+
+@dataclass
+class PenaltyTuning:
+    """Result of tune_penalty.
+
+    Attributes:
+    factor (Fraction): the selected penalty factor
+    ratio (float): its approximation ratio
+    angles (np.ndarray): its optimized angles
+    evaluations (dict): (ratio, angles) of every evaluated factor
+    """
+
+    factor: Fraction
+    ratio: float
+    angles: object
+    evaluations: dict = field(default_factory=dict)
+
+    @property
+    def optimizations(self):
+        return len(self.evaluations)
+
+
+def _evaluator(approach, problem, circuit, warm_start):
+    """Return evaluate(factor, evaluations) -> (ratio, angles)."""
+    best = problem_tables.best_known_solutions(problem)[0]
+    best_value = knapsack.value(best, problem)
+    if approach == "linqaoa":
+        module = linqaoa
+        penalties = lambda factor: (factor,)
+    elif approach == "quadqaoa":
+        module = quadqaoa
+        penalties = lambda factor: (1, factor)
+    else:
+        raise ValueError(f"Approach {approach!r} has no penalty factor.")
+
+    def evaluate(factor, evaluations):
+        initial_angles = None
+        if warm_start and evaluations:
+            nearest = min(evaluations, key=lambda other: abs(other - factor))
+            initial_angles = evaluations[nearest][1]
+        angles = module.find_optimal_angles(circuit, problem,
+                                            *penalties(factor),
+                                            initial_angles=initial_angles)
+        if isinstance(circuit, nsim.NativeSimulation):
+            expectation = circuit.comparable_expectation_value(
+                angles, *penalties(factor))
+        else:
+            probs = module.get_probs_dict(circuit, problem, angles,
+                                          *penalties(factor))
+            expectation = optimization.average_value(
+                probs, partial(module.comparable_objective_function,
+                               problem=problem))
+        return expectation / best_value, angles
+
+    return evaluate
+
+
+def tune_penalty(approach, problem, p, mode="best", tolerance=0.01,
+                 lower=None, upper=None, step=None, max_optimizations=10,
+                 native=False, circuit=None, warm_start=True):
+    """Return the PenaltyTuning of the penalty factor of an approach.
+
+    mode "best" returns the factor of the best approximation ratio found in
+    [lower, upper] (default [amin, 4 amin] or [bmin, 4 bmin]), mode
+    "smallest" the smallest factor whose ratio is within tolerance of the
+    best. At most max_optimizations optimizations of the angles are run.
+    step is the resolution of the factors; by default about lower / 10, but
+    a multiple of 1 / denominator(lower), i.e. an integer for integer lower,
+    so the factors have no larger denominator than lower and the range of
+    gamma does not grow. native and circuit are as for
+    linqaoa.approximation_ratio."""
+    if mode not in ("best", "smallest"):
+        raise ValueError(f"Unknown mode {mode!r}, expected 'best' or 'smallest'.")
+    if lower is None:
+        lower = (linqaoa.amin(problem) if approach == "linqaoa"
+                 else quadqaoa.bmin(1, problem))
+    lower = Fraction(lower)
+    upper = Fraction(upper) if upper is not None else 4 * lower
+    if step is None:
+        step = Fraction(max(1, lower.numerator // 10), lower.denominator)
+    step = Fraction(step)
+    if circuit is None:
+        module = linqaoa if approach == "linqaoa" else quadqaoa
+        circuit = module.prepare_circuit(problem, p, native)
+    evaluate = _evaluator(approach, problem, circuit, warm_start)
+    evaluations = {}
+
+    def snap(factor):
+        return min(max(round(Fraction(factor) / step) * step, lower), upper)
+
+    def ratio(factor):
+        factor = snap(factor)
+        if factor not in evaluations:
+            evaluations[factor] = evaluate(factor, evaluations)
+        return evaluations[factor][0]
+
+    def budget_left():
+        return len(evaluations) < max_optimizations
+
+    # golden-section search for the maximum of the ratio
+    inverse_phi = (math.sqrt(5) - 1) / 2
+    low, high = float(lower), float(upper)
+    ratio(lower)
+    x1 = high - inverse_phi * (high - low)
+    x2 = low + inverse_phi * (high - low)
+    f1 = ratio(x1) if budget_left() else -math.inf
+    f2 = ratio(x2) if budget_left() else -math.inf
+    while budget_left() and snap(x1) != snap(x2):
+        if f1 >= f2:
+            high, x2, f2 = x2, x1, f1
+            x1 = high - inverse_phi * (high - low)
+            f1 = ratio(x1)
+        else:
+            low, x1, f1 = x1, x2, f2
+            x2 = low + inverse_phi * (high - low)
+            f2 = ratio(x2)
+    best = max(evaluations, key=lambda factor: evaluations[factor][0])
+
+    if mode == "smallest":
+        target = evaluations[best][0] - tolerance
+        # bisection between a factor below the target and one above it
+        failing = max((factor for factor in evaluations
+                       if factor < best and evaluations[factor][0] < target),
+                      default=None)
+        passing = min(factor for factor in evaluations
+                      if evaluations[factor][0] >= target
+                      and (failing is None or factor > failing))
+        while (failing is not None and passing - failing > step
+               and budget_left()):
+            middle = snap((failing + passing) / 2)
+            if middle in (failing, passing):
+                break
+            if ratio(middle) >= target:
+                passing = middle
+            else:
+                failing = middle
+        best = passing
+
+    ratio_, angles = evaluations[best]
+    return PenaltyTuning(best, ratio_, angles, evaluations)
@@ -0,0 +1,217 @@
+"""Tables of a problem over all 2^N choices, shared between processes.
+
+The value, the weight and the feasibility of every choice, and the best
+solutions derived from them, are needed by every worker of a sweep over the
+same problem. Instead of recomputing and holding them in every process, the
+tables are computed once and published into a block of shared memory (or
+saved as .npy files, which are memory-mapped when loaded), and the workers
+attach read-only NumPy views to it without copying.
+
+Usage:
+with problem_tables.ProblemTables.compute(problem).publish() as shared:
+    with multiprocessing.Pool(initializer=problem_tables.attach_worker,
+                              initargs=(shared.handle,)) as pool:
+        ...  # workers call problem_tables.worker_tables()
+
+The native simulations of a problem whose tables are attached in a process
+take them from there, as do the approximation ratios via
+best_known_solutions, see attached_tables.
+"""
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+import knapsack
+from knapsack import KnapsackProblem
+import native
+
+
+class ProblemTables:
+    """The tables of a problem, indexed by the choices as integers.
+
+    As in qiskit, bit q of a choice is item q.
+
+    Attributes:
+    values (np.ndarray): the value of every choice
+    weights (np.ndarray): the weight of every choice
+    feasible (np.ndarray): whether every choice is feasible
+    max_weight (int): the maximum weight of the problem
+    """
+
+    arrays = ["values", "weights", "feasible"]
+
+    def __init__(self, values, weights, feasible, max_weight):
+        self.values = values
+        self.weights = weights
+        self.feasible = feasible
+        self.max_weight = max_weight
+        self._shared_memory = None
+
+    @classmethod
+    def compute(cls, problem: KnapsackProblem):
+        """Compute the tables of a problem."""
+        indices = np.arange(2**problem.N)
+        values = native.computational_sums(problem.values,
+                                           indices).astype(np.int64)
+        weights = native.computational_sums(problem.weights,
+                                            indices).astype(np.int64)
+        return cls(values, weights, weights <= problem.max_weight,
+                   problem.max_weight)
+
+    @property
+    def N(self):
+        return len(self.values).bit_length() - 1
+
+    def matches(self, problem: KnapsackProblem):
+        """Return whether the tables belong to problem."""
+        if (len(self.values) != 2**problem.N
+                or self.max_weight != problem.max_weight):
+            return False
+        # the choices of single items
+        singles = 1 << np.arange(problem.N)
+        return (np.array_equal(self.values[singles], problem.values)
+                and np.array_equal(self.weights[singles], problem.weights))
+
+    def comparable_objective(self):
+        """Return the approach independent objective of every choice."""
+        return np.where(self.feasible, self.values, 0)
+
+    def best_value(self):
+        return int(self.comparable_objective().max())
+
+    def best_choices(self):
+        """Return the best solutions as integers."""
+        objective = self.comparable_objective()
+        return np.flatnonzero(objective == objective.max())
+
+    def best_known_solutions(self):
+        """Return the best solutions as in knapsack.best_known_solutions."""
+        return (self.best_choices()[:, None] >> np.arange(self.N)) & 1
+
+    def publish(self):
+        """Copy the tables into a new block of shared memory, see SharedTables."""
+        layout = []
+        offset = 0
+        for name in self.arrays:
+            array = getattr(self, name)
+            layout.append((name, array.dtype.str, array.shape, offset))
+            # keep every array aligned to 8 bytes
+            offset += -(-array.nbytes // 8) * 8
+        memory = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        handle = TablesHandle(memory.name, tuple(layout), self.max_weight)
+        for name, dtype, shape, offset in layout:
+            view = np.ndarray(shape, dtype, buffer=memory.buf, offset=offset)
+            view[...] = getattr(self, name)
+        return SharedTables(memory, handle)
+
+    @classmethod
+    def attach(cls, handle):
+        """Return read-only views of tables published in shared memory.
+
+        The block stays mapped as long as the returned tables exist."""
+        memory = shared_memory.SharedMemory(name=handle.name)
+        arrays = []
+        for __, dtype, shape, offset in handle.layout:
+            view = np.ndarray(shape, dtype, buffer=memory.buf, offset=offset)
+            view.flags.writeable = False
+            arrays.append(view)
+        tables = cls(*arrays, handle.max_weight)
+        tables._shared_memory = memory
+        return tables
+
+    def save(self, directory):
+        """Save the tables as .npy files in directory."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.arrays:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        np.save(os.path.join(directory, "max_weight.npy"), self.max_weight)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Load tables saved by save, memory-mapped unless mmap_mode is None."""
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"),
+                          mmap_mode=mmap_mode) for name in cls.arrays]
+        max_weight = int(np.load(os.path.join(directory, "max_weight.npy")))
+        return cls(*arrays, max_weight)
+
+
+@dataclass(frozen=True)
+class TablesHandle:
+    """Picklable reference to tables in shared memory, see ProblemTables.attach.
+
+    Attributes:
+    name (str): the name of the block of shared memory
+    layout (tuple): (name, dtype, shape, offset) of every array
+    max_weight (int): the maximum weight of the problem
+    """
+
+    name: str
+    layout: tuple
+    max_weight: int
+
+
+class SharedTables:
+    """Owner of tables in shared memory.
+
+    The block is removed by close, or when leaving the with statement, and
+    must outlive the workers using it.
+
+    Attributes:
+    handle (TablesHandle): the reference to pass to the workers
+    """
+
+    def __init__(self, memory, handle):
+        self._memory = memory
+        self.handle = handle
+
+    def close(self):
+        """Release and remove the block of shared memory."""
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# tables attached by attach_worker, by the name of their block
+_worker_tables = {}
+
+
+def attach_worker(*handles):
+    """Attach tables in a worker, e.g. as initializer of a multiprocessing.Pool."""
+    for handle in handles:
+        _worker_tables[handle.name] = ProblemTables.attach(handle)
+
+
+def attached_tables(problem: KnapsackProblem):
+    """Return the tables of problem attached by attach_worker, None if there are none.
+
+    native and best_known_solutions use them instead of recomputing the
+    values, weights and feasibility of the choices."""
+    for tables in _worker_tables.values():
+        if tables.matches(problem):
+            return tables
+    return None
+
+
+def best_known_solutions(problem: KnapsackProblem):
+    """Return knapsack.best_known_solutions, from the attached tables if any."""
+    tables = attached_tables(problem)
+    if tables is not None:
+        return tables.best_known_solutions()
+    return knapsack.best_known_solutions(problem)
+
+
+def worker_tables(handle=None):
+    """Return the tables attached by attach_worker.
+
+    handle may be omitted if exactly one block was attached."""
+    if handle is None:
+        tables, = _worker_tables.values()
+        return tables
+    return _worker_tables[handle.name]
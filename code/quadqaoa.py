@@ -2,13 +2,13 @@
 from functools import partial
 
 import numpy as np
-from qiskit import transpile
 
 import knapsack
-import circuits
-import visualization
 import simulation as sim
+import native as nsim
 import optimization
+import problem_tables
+import sampling as smp
 
 
 def bmin(a, problem):
@@ -41,10 +41,23 @@ def objective_function(bitstring, problem, a, b):
     return a * value - b * penalty
 
 
-def to_parameter_dict(angles, a, b, circuit):
+def objective_values(bits, problem, a, b):
+    """Vectorized objective_function for the rows of a matrix of bits."""
+    x = bits[:, :problem.N]
+    y = bits[:, problem.N:]
+    value = x @ problem.values
+    penalty = ((1 - y.sum(axis=1))**2
+               + (y @ np.arange(1, problem.max_weight + 1)
+                  - x @ problem.weights)**2)
+    return a * value - b * penalty
+
+
+def to_parameter_dict(angles, a, b, circuit, problem=None):
     """Create a circuit specific parameter dict from given parameters.
     
-    angles = np.array([gamma0, beta0, gamma1, beta1, ...])"""
+    angles = np.array([gamma0, beta0, gamma1, beta1, ...])
+    The item values of problem are bound to the value Parameters of
+    circuits built as templates, see circuits.template."""
     gammas = angles[0::2]
     betas = angles[1::2]
     parameters = {}
@@ -54,44 +67,91 @@ def to_parameter_dict(angles, a, b, circuit):
         parameters[parameter] = value
     parameters[circuit.a] = float(a)
     parameters[circuit.b] = float(b)
+    if getattr(circuit, "values", None) is not None:
+        if problem is None:
+            raise ValueError("The circuit is a template, pass the problem "
+                             "to bind its item values.")
+        parameters.update(zip(circuit.values, map(float, problem.values)))
     return parameters
 
 
 def get_probs_dict(circuit, problem, angles, a, b, choices_only=True):
     """Simulate circuit for given parameters and return probability dict."""
-    transpiled_circuit = transpile(circuit, sim.backend)
-    parameter_dict = to_parameter_dict(angles, a, b, circuit)
-    statevector = sim.get_statevector(transpiled_circuit, parameter_dict)
-    if choices_only:
-        probs_dict = statevector.probabilities_dict(range(problem.N))
-    else:
-        probs_dict = statevector.probabilities_dict()
+    if isinstance(circuit, nsim.NativeSimulation):
+        return circuit.probabilities_dict(angles, a, b, choices_only)
+    transpiled_circuit = sim.transpile_circuit(circuit)
+    parameter_dict = to_parameter_dict(angles, a, b, circuit, problem)
+    qubits = range(problem.N) if choices_only else None
+    probs_dict = sim.get_probabilities(transpiled_circuit, parameter_dict,
+                                       qubits, approach="quadqaoa")
     return probs_dict
 
 
-def get_expectation_value(circuit, problem, angles, a, b):
-    """Return the expectation value of the objective function for given parameters."""
-    probs_dict = get_probs_dict(circuit, angles, a, b)
+def sampled_objective(circuit, problem, a, b, sampling):
+    """Return a smp.SampledObjective of the objective function of circuit.
+
+    The objective function depends on both registers, so all qubits are
+    measured."""
+    if isinstance(circuit, nsim.NativeSimulation):
+        draw = smp.native_sampler(
+            lambda angles: circuit.probabilities_dict(angles, a, b, False),
+            sampling)
+    else:
+        transpiled_circuit = sim.transpile_circuit(circuit)
+        angles_to_parameters = partial(to_parameter_dict, circuit=circuit,
+                                       problem=problem, a=a, b=b)
+        draw = smp.circuit_sampler(transpiled_circuit, angles_to_parameters,
+                                   range(circuit.num_qubits), "quadqaoa",
+                                   sampling)
+    objective = partial(objective_values, problem=problem, a=a, b=b)
+    return smp.SampledObjective(draw, objective, sampling)
+
+
+def get_expectation_value(circuit, problem, angles, a, b, sampling=None):
+    """Return the expectation value of the objective function for given parameters.
+
+    If sampling (a smp.SamplingConfig) is given, the expectation value is
+    estimated from sampling.shots samples instead."""
+    if sampling is not None:
+        objective = sampled_objective(circuit, problem, a, b, sampling)
+        return objective.estimate(objective.draw(angles, sampling.shots))[0]
+    probs_dict = get_probs_dict(circuit, problem, angles, a, b,
+                                choices_only=False)
     obj = partial(objective_function, problem=problem, a=a, b=b)
     return optimization.average_value(probs_dict, obj)
 
 
-def find_optimal_angles(circuit, problem, a, b):
-    """Optimize the parameters beta, gamma for given circuit and parameters."""
-    transpiled_circuit = transpile(circuit, sim.backend)
-    obj = partial(objective_function, problem=problem, a=a, b=b)
-    angles_to_parameters = partial(to_parameter_dict, circuit=circuit, a=a, b=b)
+def find_optimal_angles(circuit, problem, a, b, sampling=None, **options):
+    """Optimize the parameters beta, gamma for given circuit and parameters.
 
-    def angles_to_value(angles):
-        parameter_dict = angles_to_parameters(angles)
-        statevector = sim.get_statevector(transpiled_circuit, parameter_dict)
-        probs_dict = statevector.probabilities_dict()
-        value = - optimization.average_value(probs_dict, obj)
-        return value
+    If sampling (a smp.SamplingConfig) is given, the objective function is
+    estimated from samples, see smp.SampledObjective. The options library,
+    fourier, optimizer, domain, initial_angles and checkpoint are those of
+    optimization.optimize_approach_angles."""
+    if sampling is not None:
+        angles_to_value = sampled_objective(circuit, problem, a, b, sampling)
 
-    return optimization.optimize_angles(circuit.p, angles_to_value,
-                                        circuit.gamma_range(a, b),
-                                        circuit.beta_range())
+    elif isinstance(circuit, nsim.NativeSimulation):
+        def angles_to_value(angles):
+            return - circuit.expectation_value(angles, a, b)
+
+    else:
+        transpiled_circuit = sim.transpile_circuit(circuit)
+        obj = partial(objective_function, problem=problem, a=a, b=b)
+        angles_to_parameters = partial(to_parameter_dict, circuit=circuit,
+                                       problem=problem, a=a, b=b)
+
+        def angles_to_value(angles):
+            parameter_dict = angles_to_parameters(angles)
+            probs_dict = sim.get_probabilities(transpiled_circuit,
+                                               parameter_dict,
+                                               approach="quadqaoa")
+            value = - optimization.average_value(probs_dict, obj)
+            return value
+
+    return optimization.optimize_approach_angles(
+        "quadqaoa", circuit, problem, (a, b), None,
+        angles_to_value, circuit.gamma_range(a, b), sampling, **options)
 
 
 def comparable_objective_function(bitstring, problem):
@@ -102,20 +162,47 @@ def comparable_objective_function(bitstring, problem):
     return 0
 
 
-def comparable_expectation_value(problem, p, a, b):
-    """Calculate the expectation value of the approach independent objective function for given parameters."""
-    circuit = circuits.QuadQAOA(problem, p)
-    angles = find_optimal_angles(circuit, problem, a, b)
+def prepare_circuit(problem, p, native=False, template=False):
+    """Build and transpile the circuit, e.g. as the prepare step of sim.pipeline.
+
+    If template, the circuit has value Parameters and is shared with all
+    instances with the same weights and capacity, see circuits.template."""
+    if native:
+        return nsim.NativeQuadQAOA(problem, p)
+    import circuits
+    if template:
+        circuit = circuits.template(circuits.QuadQAOA, problem, p)
+    else:
+        circuit = circuits.QuadQAOA(problem, p)
+    sim.transpile_circuit(circuit)
+    return circuit
+
+
+def comparable_expectation_value(problem, p, a, b, native=False, circuit=None,
+                                 library=None):
+    """Calculate the expectation value of the approach independent objective function for given parameters.
+
+    If native, the circuit is simulated by native.NativeQuadQAOA. circuit
+    is a circuit from prepare_circuit, built here if None. library is
+    passed on to find_optimal_angles."""
+    if circuit is None:
+        circuit = prepare_circuit(problem, p, native)
+    if isinstance(circuit, nsim.NativeSimulation):
+        angles = find_optimal_angles(circuit, problem, a, b, library=library)
+        return circuit.comparable_expectation_value(angles, a, b)
+    angles = find_optimal_angles(circuit, problem, a, b, library=library)
     probs = get_probs_dict(circuit, problem, angles, a, b)
     obj = partial(comparable_objective_function, problem=problem)
     expectation = optimization.average_value(probs, obj)
     return expectation
 
 
-def approximation_ratio(problem, p, a, b):
+def approximation_ratio(problem, p, a, b, native=False, circuit=None,
+                        library=None):
     """Calculate the approximation ratio of the quadaqoa approach for given problem and parameters."""
-    expectation = comparable_expectation_value(problem, p, a, b)
-    best_known_solutions = knapsack.best_known_solutions(problem)
+    expectation = comparable_expectation_value(problem, p, a, b, native,
+                                               circuit, library)
+    best_known_solutions = problem_tables.best_known_solutions(problem)
     choice = best_known_solutions[0]
     best_value = knapsack.value(choice, problem)
     ratio = expectation / best_value
@@ -123,6 +210,9 @@ def approximation_ratio(problem, p, a, b):
 
 
 def main():
+    import circuits
+    import visualization
+
     a = 1
     b = 10
     problem = knapsack.toy_problems[0]
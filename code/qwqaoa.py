@@ -2,13 +2,13 @@
 from functools import partial
 
 import numpy as np
-from qiskit import transpile
 
 import knapsack
-import circuits
-import visualization
 import simulation as sim
+import native as nsim
 import optimization
+import problem_tables
+import sampling as smp
 
 
 def bitstring_to_choice(bitstring, problem):
@@ -25,10 +25,17 @@ def objective_function(bitstring, problem):
     return value
 
 
-def to_parameter_dict(angles, circuit):
+def objective_values(bits, problem):
+    """Vectorized objective_function for the rows of a matrix of bits."""
+    return bits[:, :problem.N] @ problem.values
+
+
+def to_parameter_dict(angles, circuit, problem=None):
     """Create a circuit specific parameter dict from given parameters.
     
-    angles = np.array([gamma0, beta0, gamma1, beta1, ...])"""
+    angles = np.array([gamma0, beta0, gamma1, beta1, ...])
+    The item values of problem are bound to the value Parameters of
+    circuits built as templates, see circuits.template."""
     gammas = angles[0::2]
     betas = angles[1::2]
     parameters = {}
@@ -36,44 +43,84 @@ def to_parameter_dict(angles, circuit):
         parameters[parameter] = value
     for parameter, value in zip(circuit.gammas, gammas):
         parameters[parameter] = value
+    if getattr(circuit, "values", None) is not None:
+        if problem is None:
+            raise ValueError("The circuit is a template, pass the problem "
+                             "to bind its item values.")
+        parameters.update(zip(circuit.values, map(float, problem.values)))
     return parameters
 
 
 def get_probs_dict(circuit, problem, angles, choices_only=True):
     """Simulate circuit for given parameters and return probability dict."""
-    transpiled_circuit = transpile(circuit, sim.backend)
-    parameter_dict = to_parameter_dict(angles, circuit)
-    statevector = sim.get_statevector(transpiled_circuit, parameter_dict)
-    if choices_only:
-        probs_dict = statevector.probabilities_dict(range(problem.N))
-    else:
-        probs_dict = statevector.probabilities_dict()
+    if isinstance(circuit, nsim.NativeSimulation):
+        return circuit.probabilities_dict(angles)
+    transpiled_circuit = sim.transpile_circuit(circuit)
+    parameter_dict = to_parameter_dict(angles, circuit, problem)
+    qubits = range(problem.N) if choices_only else None
+    probs_dict = sim.get_probabilities(transpiled_circuit, parameter_dict,
+                                       qubits, approach="qwqaoa")
     return probs_dict
 
 
-def get_expectation_value(circuit, problem, angles):
-    """Return the expectation value of the objective function for given parameters."""
-    probs_dict = get_probs_dict(circuit, angles)
+def sampled_objective(circuit, problem, sampling):
+    """Return a smp.SampledObjective of the objective function of circuit."""
+    if isinstance(circuit, nsim.NativeSimulation):
+        draw = smp.native_sampler(circuit.probabilities_dict, sampling)
+    else:
+        transpiled_circuit = sim.transpile_circuit(circuit)
+        angles_to_parameters = partial(to_parameter_dict, circuit=circuit,
+                                       problem=problem)
+        draw = smp.circuit_sampler(transpiled_circuit, angles_to_parameters,
+                                   range(problem.N), "qwqaoa", sampling)
+    objective = partial(objective_values, problem=problem)
+    return smp.SampledObjective(draw, objective, sampling)
+
+
+def get_expectation_value(circuit, problem, angles, sampling=None):
+    """Return the expectation value of the objective function for given parameters.
+
+    If sampling (a smp.SamplingConfig) is given, the expectation value is
+    estimated from sampling.shots samples instead."""
+    if sampling is not None:
+        objective = sampled_objective(circuit, problem, sampling)
+        return objective.estimate(objective.draw(angles, sampling.shots))[0]
+    probs_dict = get_probs_dict(circuit, problem, angles)
     obj = partial(objective_function, problem=problem)
     return optimization.average_value(probs_dict, obj)
 
 
-def find_optimal_angles(circuit, problem):
-    """Optimize the parameters beta, gamma for given circuit and parameters."""
-    transpiled_circuit = transpile(circuit, sim.backend)
-    obj = partial(objective_function, problem=problem)
-    angles_to_parameters = partial(to_parameter_dict, circuit=circuit)
+def find_optimal_angles(circuit, problem, sampling=None, **options):
+    """Optimize the parameters beta, gamma for given circuit and parameters.
+
+    If sampling (a smp.SamplingConfig) is given, the objective function is
+    estimated from samples, see smp.SampledObjective. The options library,
+    fourier, optimizer, domain, initial_angles and checkpoint are those of
+    optimization.optimize_approach_angles."""
+    if sampling is not None:
+        angles_to_value = sampled_objective(circuit, problem, sampling)
 
-    def angles_to_value(angles):
-        parameter_dict = angles_to_parameters(angles)
-        statevector = sim.get_statevector(transpiled_circuit, parameter_dict)
-        probs_dict = statevector.probabilities_dict()
-        value = - optimization.average_value(probs_dict, obj)
-        return value
+    elif isinstance(circuit, nsim.NativeSimulation):
+        def angles_to_value(angles):
+            return - circuit.expectation_value(angles)
 
-    return optimization.optimize_angles(circuit.p, angles_to_value,
-                                        circuit.gamma_range(),
-                                        circuit.beta_range())
+    else:
+        transpiled_circuit = sim.transpile_circuit(circuit)
+        obj = partial(objective_function, problem=problem)
+        angles_to_parameters = partial(to_parameter_dict, circuit=circuit,
+                                       problem=problem)
+
+        def angles_to_value(angles):
+            parameter_dict = angles_to_parameters(angles)
+            probs_dict = sim.get_probabilities(transpiled_circuit,
+                                               parameter_dict,
+                                               approach="qwqaoa")
+            value = - optimization.average_value(probs_dict, obj)
+            return value
+
+    return optimization.optimize_approach_angles(
+        "qwqaoa", circuit, problem, (), circuit.m,
+        angles_to_value, circuit.gamma_range(), sampling, **options)
 
 
 def comparable_objective_function(bitstring, problem):
@@ -84,20 +131,49 @@ def comparable_objective_function(bitstring, problem):
     return 0
 
 
-def comparable_expectation_value(problem, p, m):
-    """Calculate the expectation value of the approach independent objective function for given parameters."""
-    circuit = circuits.QuantumWalkQAOA(problem, p, m)
-    angles = find_optimal_angles(circuit, problem)
+def prepare_circuit(problem, p, m, native=False, template=False):
+    """Build and transpile the circuit, e.g. as the prepare step of sim.pipeline.
+
+    m = None uses the continuous-time quantum walk mixer, which is only
+    available natively. If template, the circuit has value Parameters and
+    is shared with all instances with the same weights and capacity, see
+    circuits.template."""
+    if native or m is None:
+        return nsim.NativeQuantumWalkQAOA(problem, p, m)
+    import circuits
+    if template:
+        circuit = circuits.template(circuits.QuantumWalkQAOA, problem, p, m)
+    else:
+        circuit = circuits.QuantumWalkQAOA(problem, p, m)
+    sim.transpile_circuit(circuit)
+    return circuit
+
+
+def comparable_expectation_value(problem, p, m, native=False, circuit=None,
+                                 library=None):
+    """Calculate the expectation value of the approach independent objective function for given parameters.
+
+    If native, the circuit is simulated by native.NativeQuantumWalkQAOA.
+    circuit is a circuit from prepare_circuit, built here if None. library
+    is passed on to find_optimal_angles."""
+    if circuit is None:
+        circuit = prepare_circuit(problem, p, m, native)
+    if isinstance(circuit, nsim.NativeSimulation):
+        angles = find_optimal_angles(circuit, problem, library=library)
+        return circuit.comparable_expectation_value(angles)
+    angles = find_optimal_angles(circuit, problem, library=library)
     probs = get_probs_dict(circuit, problem, angles)
     obj = partial(comparable_objective_function, problem=problem)
     expectation = optimization.average_value(probs, obj)
     return expectation
 
 
-def approximation_ratio(problem, p, m):
+def approximation_ratio(problem, p, m, native=False, circuit=None,
+                        library=None):
     """Calculate the approximation ratio of the qwqaoa approach for given problem and parameters."""
-    expectation = comparable_expectation_value(problem, p, m)
-    best_known_solutions = knapsack.best_known_solutions(problem)
+    expectation = comparable_expectation_value(problem, p, m, native, circuit,
+                                               library)
+    best_known_solutions = problem_tables.best_known_solutions(problem)
     choice = best_known_solutions[0]
     best_value = knapsack.value(choice, problem)
     ratio = expectation / best_value
@@ -105,6 +181,9 @@ def approximation_ratio(problem, p, m):
 
 
 def main():
+    import circuits
+    import visualization
+
     problem = knapsack.toy_problems[0]
     print(problem)
     print("Building Circuit...")
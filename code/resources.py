@@ -0,0 +1,365 @@
+"""Analytic resource estimates for the QAOA circuits in circuits.py.
+
+The estimates are derived from the structure of the circuits (sizes of the
+QFTs, bit patterns of the adders, oracle calls per walk step) without
+building any qiskit objects. Gate counts refer to the gates that circuits.py
+emits directly, i.e. after unrolling all composite instructions, but before
+any transpilation to a basis gate set.
+"""
+from collections import Counter
+from dataclasses import dataclass
+import math
+
+import numpy as np
+
+from knapsack import KnapsackProblem
+
+
+# Gates emitted directly by circuits.py; everything else is a composite
+BASE_GATES = {
+    "h", "x", "p", "cp", "cx", "ccx", "mcx", "mcx_gray", "rx", "crx", "rz",
+    "rzz", "measure", "barrier", "save_statevector",
+}
+
+# Instructions that do not count towards the circuit depth
+DIRECTIVES = {"barrier", "save_statevector"}
+
+BYTES_PER_AMPLITUDE = {
+    "double": 16,
+    "single": 8,
+}
+
+
+@dataclass
+class ResourceEstimate:
+    """Resources required by a QAOA circuit.
+
+    Attributes:
+    approach (str): one of "linqaoa", "quadqaoa", "qwqaoa"
+    qubits (int): total number of qubits
+    gate_counts (dict): number of gates by name, as emitted by circuits.py
+    depth (int): circuit depth, or None if it has not been calculated
+    """
+
+    approach: str
+    qubits: int
+    gate_counts: dict
+    depth: int = None
+
+    @property
+    def total_gates(self):
+        """Return the number of gates, excluding directives."""
+        return sum(count for name, count in self.gate_counts.items()
+                   if name not in DIRECTIVES)
+
+    def statevector_memory(self, precision="double"):
+        """Return the size of the statevector in bytes."""
+        return statevector_memory(self.qubits, precision)
+
+    def fits_in_memory(self, budget, precision="double"):
+        """Return whether the statevector fits into budget bytes."""
+        return self.statevector_memory(precision) <= budget
+
+
+def statevector_memory(num_qubits, precision="double"):
+    """Return the size of a statevector of num_qubits qubits in bytes."""
+    return 2**num_qubits * BYTES_PER_AMPLITUDE[precision]
+
+
+def weight_register_size(problem: KnapsackProblem):
+    """Return the size of the weight register used by LinQAOA and QuantumWalkQAOA."""
+    n = math.floor(math.log2(problem.total_weight)) + 1
+    c = math.floor(math.log2(problem.max_weight)) + 1
+    if c == n:
+        n += 1
+    return n
+
+
+def _capacity_bits(problem):
+    """Return the number of bits c used by the feasibility oracle."""
+    return math.floor(math.log2(problem.max_weight)) + 1
+
+
+def _mcx_name(num_ctrl_qubits):
+    """Return the name qiskit uses for a multi-controlled X gate."""
+    return {1: "cx", 2: "ccx", 3: "mcx", 4: "mcx"}.get(num_ctrl_qubits,
+                                                       "mcx_gray")
+
+
+def _set_bits(n):
+    """Return the indices of the set bits of a non-negative integer."""
+    return [idx for idx, bit in enumerate(reversed(bin(n)[2:])) if bit == "1"]
+
+
+def adder_gates(register_size, n):
+    """Return the number of phase gates of an Add circuit adding n."""
+    return sum(max(0, register_size - k) for k in _set_bits(n))
+
+
+def qft_gate_counts(register_size):
+    """Return the gate counts of a QFT on register_size qubits."""
+    return Counter(h=register_size,
+                   cp=register_size * (register_size - 1) // 2)
+
+
+def oracle_gate_counts(problem: KnapsackProblem, clean_up=True):
+    """Return the gate counts of a FeasibilityOracle."""
+    n = weight_register_size(problem)
+    c = _capacity_bits(problem)
+    w0 = 2**c - problem.max_weight - 1
+    subcirc = qft_gate_counts(n) + qft_gate_counts(n)
+    subcirc["cp"] += sum(adder_gates(n, weight) for weight in problem.weights)
+    subcirc["p"] += adder_gates(n, w0)
+    counts = subcirc + subcirc if clean_up else Counter(subcirc)
+    counts["x"] += 2 * (n - c)
+    counts[_mcx_name(n - c)] += 1
+    return counts
+
+
+def _measurement_counts(qubits):
+    """Return the gate counts of save_statevector and measure_all."""
+    return Counter(save_statevector=1, barrier=1, measure=qubits)
+
+
+def _scale(counts, factor):
+    """Multiply all gate counts by factor."""
+    return Counter({name: factor * count for name, count in counts.items()})
+
+
+def linqaoa_resources(problem: KnapsackProblem, p, depth=True):
+    """Estimate the resources of circuits.LinQAOA(problem, p)."""
+    N = problem.N
+    n = weight_register_size(problem)
+    qubits = N + n + 1
+    layer = _scale(oracle_gate_counts(problem, clean_up=False), 2)
+    layer += Counter(x=1, p=N + 1, cp=n, rx=N)
+    counts = Counter(h=N) + _scale(layer, p) + _measurement_counts(qubits)
+    estimate = ResourceEstimate("linqaoa", qubits, dict(counts))
+    if depth:
+        estimate.depth = _linqaoa_depth(problem, p)
+    return estimate
+
+
+def qwqaoa_resources(problem: KnapsackProblem, p, m, depth=True):
+    """Estimate the resources of circuits.QuantumWalkQAOA(problem, p, m)."""
+    N = problem.N
+    n = weight_register_size(problem)
+    qubits = N + n + 3
+    walk = _scale(oracle_gate_counts(problem, clean_up=True), 4)
+    walk += Counter(x=4, ccx=2, crx=1)
+    layer = Counter(p=N) + _scale(walk, m * N)
+    counts = _scale(layer, p) + _measurement_counts(qubits)
+    estimate = ResourceEstimate("qwqaoa", qubits, dict(counts))
+    if depth:
+        estimate.depth = _qwqaoa_depth(problem, p, m)
+    return estimate
+
+
+def quadqaoa_resources(problem: KnapsackProblem, p, depth=True):
+    """Estimate the resources of circuits.QuadQAOA(problem, p)."""
+    N = problem.N
+    W = problem.max_weight
+    qubits = N + W
+    layer = Counter(rz=qubits, barrier=2, rx=qubits,
+                    rzz=N * (N - 1) // 2 + W * (W - 1) // 2 + N * W)
+    counts = Counter(h=qubits) + _scale(layer, p) + _measurement_counts(qubits)
+    estimate = ResourceEstimate("quadqaoa", qubits, dict(counts))
+    if depth:
+        estimate.depth = _quadqaoa_depth(problem, p)
+    return estimate
+
+
+def estimate(approach, problem: KnapsackProblem, p, m=None, depth=True):
+    """Estimate the resources of the circuit of the given approach."""
+    if approach == "linqaoa":
+        return linqaoa_resources(problem, p, depth)
+    if approach == "quadqaoa":
+        return quadqaoa_resources(problem, p, depth)
+    if approach == "qwqaoa":
+        return qwqaoa_resources(problem, p, m, depth)
+    raise ValueError(f"Unknown approach {approach!r}.")
+
+
+# The following functions mirror the gate sequences of circuits.py on qubit
+# indices only. They are used to calculate the depth of the circuits.
+#
+# The depth is calculated in the max-plus algebra: the transfer matrix of a
+# gate sequence contains the longest paths (in gates) from every qubit at its
+# beginning to every qubit at its end, -inf if there is none. The transfer
+# matrix of a sequence repeated p times is the p-th max-plus power of its
+# matrix, so every distinct block of gates is walked once only.
+
+def _transfer(gates, num_qubits):
+    """Return the transfer matrix of a sequence of (name, qubits) tuples."""
+    levels = np.full((num_qubits, num_qubits), -np.inf)
+    np.fill_diagonal(levels, 0)
+    for name, qubits in gates:
+        # directives do not add a layer, but synchronize their qubits
+        level = levels[list(qubits)].max(axis=0)
+        if name not in DIRECTIVES:
+            level += 1
+        levels[list(qubits)] = level
+    return levels
+
+
+def _product(*matrices):
+    """Return the max-plus product of transfer matrices, the last one first."""
+    result = matrices[-1]
+    for matrix in reversed(matrices[:-1]):
+        result = (matrix[:, :, None] + result[None, :, :]).max(axis=1)
+    return result
+
+
+def _power(matrix, exponent):
+    """Return the transfer matrix of exponent repetitions."""
+    result = np.full_like(matrix, -np.inf)
+    np.fill_diagonal(result, 0)
+    while exponent:
+        if exponent & 1:
+            result = _product(result, matrix)
+        matrix = _product(matrix, matrix)
+        exponent >>= 1
+    return result
+
+
+def _depth(*transfers):
+    """Return the depth of the sequence of blocks with the given transfer matrices."""
+    return int(max(_product(*reversed(transfers)).max(), 0))
+
+
+def _qft_gates(register):
+    gates = []
+    for idx, qubit in reversed(list(enumerate(register))):
+        gates.append(("h", (qubit,)))
+        for control_qubit in reversed(register[:idx]):
+            gates.append(("cp", (qubit, control_qubit)))
+    return gates
+
+
+def _add_gates(register, n, control=None):
+    gates = []
+    for k in _set_bits(n):
+        for idx, qubit in enumerate(register):
+            if idx + 1 > k:
+                if control is None:
+                    gates.append(("p", (qubit,)))
+                else:
+                    gates.append(("cp", (qubit, control)))
+    return gates
+
+
+def _oracle_gates(choice_reg, weight_reg, flag_qubit, problem, clean_up=True):
+    c = _capacity_bits(problem)
+    w0 = 2**c - problem.max_weight - 1
+    qft = _qft_gates(weight_reg)
+    subcirc = list(qft)
+    for qubit, weight in zip(choice_reg, problem.weights):
+        subcirc += _add_gates(weight_reg, weight, control=qubit)
+    subcirc += _add_gates(weight_reg, w0)
+    subcirc += qft[::-1]
+    high = tuple(weight_reg[c:])
+    gates = list(subcirc)
+    gates += [("x", (qubit,)) for qubit in high]
+    gates.append((_mcx_name(len(high)), (*high, flag_qubit)))
+    gates += [("x", (qubit,)) for qubit in high]
+    if clean_up:
+        gates += subcirc[::-1]
+    return gates
+
+
+def _measurement_gates(qubits):
+    gates = [("save_statevector", tuple(qubits)), ("barrier", tuple(qubits))]
+    gates += [("measure", (qubit,)) for qubit in qubits]
+    return gates
+
+
+def _linqaoa_depth(problem, p):
+    N = problem.N
+    n = weight_register_size(problem)
+    choice_reg = list(range(N))
+    weight_reg = list(range(N, N + n))
+    flag = N + n
+    oracle = _oracle_gates(choice_reg, weight_reg, flag, problem,
+                           clean_up=False)
+    layer = [("x", (flag,))]
+    layer += [("p", (qubit,)) for qubit in choice_reg]
+    layer += oracle
+    layer += [("cp", (flag, qubit)) for qubit in weight_reg]
+    layer.append(("p", (flag,)))
+    layer += oracle[::-1]
+    layer += [("rx", (qubit,)) for qubit in choice_reg]
+    qubits = N + n + 1
+    return _depth(_transfer([("h", (qubit,)) for qubit in choice_reg], qubits),
+                  _power(_transfer(layer, qubits), p),
+                  _transfer(_measurement_gates(range(qubits)), qubits))
+
+
+def _qwqaoa_depth(problem, p, m):
+    N = problem.N
+    n = weight_register_size(problem)
+    choice_reg = list(range(N))
+    weight_reg = list(range(N, N + n))
+    flag_x, flag_neighbor, flag_both = N + n, N + n + 1, N + n + 2
+    mixer = []
+    for j in range(N):
+        oracle_x = _oracle_gates(choice_reg, weight_reg, flag_x, problem)
+        oracle_neighbor = _oracle_gates(choice_reg, weight_reg, flag_neighbor,
+                                        problem)
+        flip = [("x", (j,))]
+        mixer += oracle_x + flip + oracle_neighbor + flip
+        mixer.append(("ccx", (flag_x, flag_neighbor, flag_both)))
+        mixer.append(("crx", (flag_both, j)))
+        mixer.append(("ccx", (flag_x, flag_neighbor, flag_both)))
+        mixer += flip + oracle_neighbor + flip + oracle_x
+    qubits = N + n + 3
+    phase = _transfer([("p", (qubit,)) for qubit in choice_reg], qubits)
+    layer = _product(_power(_transfer(mixer, qubits), m), phase)
+    return _depth(_power(layer, p),
+                  _transfer(_measurement_gates(range(qubits)), qubits))
+
+
+def _quadqaoa_depth(problem, p):
+    N = problem.N
+    qubits = list(range(N + problem.max_weight))
+    choice_reg = qubits[:N]
+    weight_reg = qubits[N:]
+    layer = [("rz", (qubit,)) for qubit in qubits]
+    layer.append(("barrier", tuple(qubits)))
+    for idx1, qubit1 in enumerate(choice_reg):
+        layer += [("rzz", (qubit1, qubit2)) for qubit2 in choice_reg[:idx1]]
+    for idx1, qubit1 in enumerate(weight_reg):
+        layer += [("rzz", (qubit1, qubit2)) for qubit2 in weight_reg[:idx1]]
+    layer.append(("barrier", tuple(qubits)))
+    layer += [("rzz", (qubit1, qubit2))
+              for qubit1 in choice_reg for qubit2 in weight_reg]
+    layer += [("rx", (qubit,)) for qubit in qubits]
+    num_qubits = len(qubits)
+    return _depth(_transfer([("h", (qubit,)) for qubit in qubits], num_qubits),
+                  _power(_transfer(layer, num_qubits), p),
+                  _transfer(_measurement_gates(qubits), num_qubits))
+
+
+# Helpers for cross-checking the estimates against built circuits
+
+def unroll(circuit):
+    """Return a copy of circuit with all composite instructions unrolled."""
+    unrolled = circuit.copy_empty_like()
+    for instruction in circuit.data:
+        operation = instruction.operation
+        if operation.name in BASE_GATES or operation.definition is None:
+            unrolled.append(instruction)
+            continue
+        definition = unroll(operation.definition)
+        mapping = dict(zip(definition.qubits, instruction.qubits))
+        for inner in definition.data:
+            unrolled.append(inner.operation,
+                            [mapping[qubit] for qubit in inner.qubits],
+                            [])
+    return unrolled
+
+
+def circuit_resources(circuit, approach=None):
+    """Return the resources of a built circuit, for comparison with the estimates."""
+    unrolled = unroll(circuit)
+    return ResourceEstimate(approach, unrolled.num_qubits,
+                            dict(unrolled.count_ops()), unrolled.depth())
@@ -0,0 +1,231 @@
+"""Shot based evaluation of the objective functions.
+
+Instead of the exact expectation value over the statevector, the objective
+function is estimated from a finite number of samples, drawn either from
+qiskit's shot based simulator or from the probabilities of a native
+simulation. The estimate is the mean or the conditional value at risk
+CVaR_alpha, i.e. the mean of the best alpha fraction of the samples.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+import simulation as sim
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """Return the shot based simulator, created on first use."""
+    from qiskit import Aer
+    return Aer.get_backend("aer_simulator")
+
+
+def __getattr__(name):
+    # backend is created on first access, as importing qiskit_aer is slow
+    if name == "backend":
+        return get_backend()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@dataclass
+class SamplingConfig:
+    """Configuration of the shot based evaluation.
+
+    Attributes:
+    shots (int): number of shots of an evaluation
+    max_shots (int): maximum number of shots of an evaluation, None for
+        no adaptive shots
+    alpha (float): fraction of the best samples for CVaR_alpha, 1 for the
+        mean
+    resolution (float): the shots of an evaluation are doubled while its
+        estimate is within resolution standard errors of the best estimate
+    seed (int): seed of the random number generators
+    """
+
+    shots: int = 1024
+    max_shots: int = None
+    alpha: float = 1.0
+    resolution: float = 2.0
+    seed: int = None
+
+
+def decode(bitstrings):
+    """Convert qiskit bitstrings of equal length to integers, vectorized."""
+    bitstrings = list(bitstrings)
+    num_bits = len(bitstrings[0])
+    characters = np.frombuffer("".join(bitstrings).encode("ascii"),
+                               dtype=np.uint8)
+    bits = characters.reshape(len(bitstrings), num_bits) - ord("0")
+    return bits[:, ::-1].astype(np.int64) @ (1 << np.arange(num_bits))
+
+
+class Samples:
+    """Measurement outcomes and how often they occurred.
+
+    Attributes:
+    outcomes (np.ndarray): the distinct outcomes, as integers
+    counts (np.ndarray): the number of occurrences of every outcome
+    num_bits (int): the number of measured qubits
+    """
+
+    def __init__(self, outcomes, counts, num_bits):
+        self.outcomes = np.asarray(outcomes, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.num_bits = num_bits
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Create the samples from qiskit counts with bitstring keys."""
+        outcomes = decode(counts.keys())
+        num_bits = len(next(iter(counts)))
+        return cls(outcomes, list(counts.values()), num_bits)
+
+    @property
+    def shots(self):
+        return int(self.counts.sum())
+
+    def bits(self):
+        """Return the bits of the outcomes, one row per outcome.
+
+        As in qiskit, bit q of an outcome is the result of qubit q."""
+        return (self.outcomes[:, None] >> np.arange(self.num_bits)) & 1
+
+    def merge(self, other):
+        """Return the samples of both self and other."""
+        outcomes, inverse = np.unique(
+            np.concatenate([self.outcomes, other.outcomes]),
+            return_inverse=True)
+        counts = np.bincount(inverse, np.concatenate([self.counts,
+                                                      other.counts]))
+        return Samples(outcomes, counts, self.num_bits)
+
+    def cvar(self, values, alpha=1.0):
+        """Return CVaR_alpha of values and its standard error.
+
+        values are the values of the objective function for the outcomes,
+        which is maximized, so the best samples are those of largest value."""
+        values = np.asarray(values, dtype=float)
+        order = np.argsort(-values)
+        values = values[order]
+        size = max(alpha * self.shots, 1)
+        counts = np.minimum(self.counts[order],
+                            np.maximum(size - np.cumsum(self.counts[order])
+                                       + self.counts[order], 0))
+        mean = counts.dot(values) / size
+        variance = counts.dot((values - mean)**2) / size
+        return mean, np.sqrt(variance / size)
+
+
+def sample_probabilities_dict(probs_dict, shots, rng):
+    """Draw shots samples from a probability dict."""
+    probabilities = np.array(list(probs_dict.values()))
+    counts = rng.multinomial(shots, probabilities / probabilities.sum())
+    samples = np.flatnonzero(counts)
+    outcomes = decode(probs_dict.keys())[samples]
+    num_bits = len(next(iter(probs_dict)))
+    return Samples(outcomes, counts[samples], num_bits)
+
+
+def native_sampler(probabilities_dict, config):
+    """Return draw(angles, shots) sampling from a native simulation.
+
+    probabilities_dict(angles) returns the probabilities of the measured
+    qubits. The probabilities of the last angles are reused, so adding
+    shots does not repeat the simulation."""
+    rng = np.random.default_rng(config.seed)
+    last = {}
+
+    def draw(angles, shots):
+        key = tuple(angles)
+        if key not in last:
+            last.clear()
+            last[key] = probabilities_dict(angles)
+        return sample_probabilities_dict(last[key], shots, rng)
+
+    return draw
+
+
+def measured_circuit(transpiled_circuit, qubits):
+    """Return the circuit with a measurement of qubits only.
+
+    The saved statevector and any other measurements are removed."""
+    from qiskit import ClassicalRegister, QuantumCircuit
+    register = ClassicalRegister(len(qubits))
+    circuit = QuantumCircuit(*transpiled_circuit.qregs, register,
+                             global_phase=transpiled_circuit.global_phase)
+    for instruction in transpiled_circuit.data:
+        if instruction.operation.name not in ("save_statevector", "measure"):
+            circuit.append(instruction)
+    circuit.measure(qubits, register)
+    return circuit
+
+
+def circuit_sampler(transpiled_circuit, angles_to_parameters, qubits,
+                    approach=None, config=None, simulation_config=None):
+    """Return draw(angles, shots) sampling from qiskit's shot based simulator.
+
+    The simulation method is chosen as in simulation.get_probabilities."""
+    config = config or SamplingConfig()
+    simulation_config = simulation_config or sim.default_config
+    circuit = measured_circuit(transpiled_circuit, list(qubits))
+    num_qubits = circuit.num_qubits
+    method = simulation_config.method_for(num_qubits, approach)
+    options = simulation_config.run_options(num_qubits, method)
+    rng = np.random.default_rng(config.seed)
+
+    def draw(angles, shots):
+        bound_circuit = circuit.bind_parameters(angles_to_parameters(angles))
+        seed = int(rng.integers(2**31))
+        result = get_backend().run(bound_circuit, shots=shots,
+                                   seed_simulator=seed, **options).result()
+        return Samples.from_counts(result.get_counts())
+
+    return draw
+
+
+class SampledObjective:
+    """Estimate of an objective function from samples, for optimize_angles.
+
+    Calling an instance with angles returns the negative estimate, to be
+    minimized. If config.max_shots exceeds config.shots, the shots of an
+    evaluation are doubled while it may be better than the best evaluation
+    so far, i.e. only where the optimizer needs the finer resolution.
+
+    Attributes:
+    draw (callable): draw(angles, shots) returns Samples
+    objective (callable): objective(bits) returns the values of the
+        objective function for the rows of bits
+    config (SamplingConfig): the configuration
+    best (float): the best estimate so far
+    total_shots (int): the number of shots used so far
+    """
+
+    def __init__(self, draw, objective, config):
+        self.draw = draw
+        self.objective = objective
+        self.config = config
+        self.best = -np.inf
+        self.total_shots = 0
+
+    def estimate(self, samples):
+        """Return CVaR_alpha of the objective and its standard error."""
+        return samples.cvar(self.objective(samples.bits()), self.config.alpha)
+
+    def value(self, angles):
+        """Return the estimate of the objective for the given angles."""
+        config = self.config
+        max_shots = max(config.max_shots or config.shots, config.shots)
+        samples = self.draw(angles, config.shots)
+        estimate, error = self.estimate(samples)
+        while (samples.shots < max_shots
+               and estimate + config.resolution * error >= self.best):
+            shots = min(samples.shots, max_shots - samples.shots)
+            samples = samples.merge(self.draw(angles, shots))
+            estimate, error = self.estimate(samples)
+        self.total_shots += samples.shots
+        self.best = max(self.best, estimate)
+        return estimate
+
+    def __call__(self, angles):
+        return - self.value(angles)
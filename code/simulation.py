@@ -1,12 +1,242 @@
 """Definitions and helper functions for circuit simulation using qiskit."""
-from qiskit import Aer
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+import os
 
+import resources
 
-backend = Aer.get_backend("aer_simulator_statevector")
 
+@lru_cache(maxsize=None)
+def get_backend():
+    """Return the statevector simulator, created on first use."""
+    from qiskit import Aer
+    return Aer.get_backend("aer_simulator_statevector")
 
-def get_statevector(transpiled_circuit, parameter_dict):
+
+def __getattr__(name):
+    # backend is created on first access, as importing qiskit_aer is slow
+    if name == "backend":
+        return get_backend()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """Raised if a circuit cannot be simulated within the memory budget."""
+
+
+def available_memory():
+    """Return the available physical memory in bytes.
+
+    Uses psutil if it is installed, otherwise sysconf (free pages, which
+    excludes reclaimable caches), or infinity if neither is available."""
+    try:
+        import psutil
+    except ImportError:
+        try:
+            return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (AttributeError, ValueError, OSError):
+            return float("inf")
+    return psutil.virtual_memory().available
+
+
+@dataclass
+class SimulationConfig:
+    """Configuration of the statevector simulation.
+
+    Attributes:
+    precision (str): "double" (complex128) or "single" (complex64)
+    max_parallel_threads (int): maximum number of threads, 0 for all cores
+    fusion_enable (bool): whether the simulator fuses gates
+    fusion_threshold (int): minimum number of qubits for gate fusion
+    memory_budget (int): memory available for a simulation in bytes,
+        None for the currently available physical memory
+    allow_downgrade (bool): whether to fall back to single precision if
+        a circuit does not fit into the memory budget in double precision
+    allow_method_switch (bool): whether to fall back to the matrix product
+        state method if a circuit does not fit into the memory budget
+    mps_qubits (dict): number of qubits per approach from which on the
+        matrix product state method is used
+    mps_max_bond_dimension (int): maximum bond dimension of the matrix
+        product states, None for no limit
+    mps_truncation_threshold (float): discarded weight of the Schmidt
+        coefficients when truncating a matrix product state
+    """
+
+    precision: str = "double"
+    max_parallel_threads: int = 0
+    fusion_enable: bool = True
+    fusion_threshold: int = 14
+    memory_budget: int = None
+    allow_downgrade: bool = True
+    allow_method_switch: bool = True
+    mps_qubits: dict = field(default_factory=lambda: {"quadqaoa": 26})
+    mps_max_bond_dimension: int = None
+    mps_truncation_threshold: float = 1e-16
+
+    def budget(self):
+        """Return the memory budget in bytes."""
+        if self.memory_budget is None:
+            return available_memory()
+        return self.memory_budget
+
+    def precision_for(self, num_qubits):
+        """Return the precision to simulate num_qubits qubits with.
+
+        Raises MemoryBudgetExceeded if the circuit does not fit into the
+        memory budget in any allowed precision."""
+        budget = self.budget()
+        precisions = [self.precision]
+        if self.allow_downgrade and self.precision == "double":
+            precisions.append("single")
+        for precision in precisions:
+            if required_memory(num_qubits, precision) <= budget:
+                return precision
+        required = required_memory(num_qubits, precisions[-1])
+        raise MemoryBudgetExceeded(
+            f"Simulating {num_qubits} qubits requires {required / 2**30:.2f} "
+            f"GiB in {precisions[-1]} precision, but the memory budget is "
+            f"{budget / 2**30:.2f} GiB.")
+
+    def method_for(self, num_qubits, approach=None):
+        """Return the simulation method for a circuit of the given approach.
+
+        Raises MemoryBudgetExceeded if the statevector method is required,
+        but the circuit does not fit into the memory budget."""
+        threshold = self.mps_qubits.get(approach)
+        if threshold is not None and num_qubits >= threshold:
+            return "matrix_product_state"
+        try:
+            self.precision_for(num_qubits)
+        except MemoryBudgetExceeded:
+            if self.allow_method_switch:
+                return "matrix_product_state"
+            raise
+        return "statevector"
+
+    def run_options(self, num_qubits, method="statevector"):
+        """Return the simulator options for a circuit of num_qubits qubits."""
+        options = {
+            "method": method,
+            "max_parallel_threads": self.max_parallel_threads,
+        }
+        if method == "matrix_product_state":
+            options["matrix_product_state_max_bond_dimension"] = self.mps_max_bond_dimension
+            options["matrix_product_state_truncation_threshold"] = self.mps_truncation_threshold
+        else:
+            options["precision"] = self.precision_for(num_qubits)
+            options["fusion_enable"] = self.fusion_enable
+            options["fusion_threshold"] = self.fusion_threshold
+        return options
+
+
+# The configuration used if no other configuration is passed
+default_config = SimulationConfig()
+
+
+def required_memory(num_qubits, precision="double"):
+    """Return the memory in bytes needed to obtain a statevector.
+
+    This includes the state of the simulator in the given precision and the
+    statevector returned by qiskit, which is always in double precision."""
+    return (resources.statevector_memory(num_qubits, precision)
+            + resources.statevector_memory(num_qubits, "double"))
+
+
+def transpile_circuit(circuit):
+    """Return circuit transpiled for the backend.
+
+    The result is kept as circuit.transpiled, so a circuit is transpiled
+    only once, e.g. ahead of its simulation in pipeline."""
+    from qiskit import transpile
+    if getattr(circuit, "transpiled", None) is None:
+        circuit.transpiled = transpile(circuit, get_backend())
+    return circuit.transpiled
+
+
+def get_statevector(transpiled_circuit, parameter_dict, config=None):
+    """Simulate a circuit and return its statevector.
+
+    The memory required is checked before running the simulation, see
+    SimulationConfig.precision_for."""
+    config = config or default_config
+    options = config.run_options(transpiled_circuit.num_qubits)
     bound_circuit = transpiled_circuit.bind_parameters(parameter_dict)
-    result = backend.run(bound_circuit, shots=1).result()
+    result = get_backend().run(bound_circuit, shots=1, **options).result()
     statevector = result.get_statevector()
     return statevector
+
+
+def get_probabilities(transpiled_circuit, parameter_dict, qubits=None,
+                      approach=None, config=None):
+    """Simulate a circuit and return the probabilities of the given qubits.
+
+    The result has the format of Statevector.probabilities_dict. Depending
+    on the approach and the size of the circuit, the simulation uses the
+    statevector or the matrix product state method, see
+    SimulationConfig.method_for."""
+    config = config or default_config
+    num_qubits = transpiled_circuit.num_qubits
+    if qubits is None:
+        qubits = range(num_qubits)
+    qubits = list(qubits)
+    method = config.method_for(num_qubits, approach)
+    if method == "statevector":
+        statevector = get_statevector(transpiled_circuit, parameter_dict,
+                                      config)
+        return statevector.probabilities_dict(qubits)
+    # a matrix product state does not need the full statevector
+    circuit = transpiled_circuit.copy_empty_like()
+    for instruction in transpiled_circuit.data:
+        if instruction.operation.name not in ("save_statevector", "measure"):
+            circuit.append(instruction)
+    circuit.save_probabilities_dict(qubits)
+    bound_circuit = circuit.bind_parameters(parameter_dict)
+    options = config.run_options(num_qubits, method)
+    result = get_backend().run(bound_circuit, shots=1, **options).result()
+    probabilities = result.data()["probabilities"]
+    return {format(key, f"0{len(qubits)}b"): value
+            for key, value in probabilities.items()}
+
+
+async def pipeline(points, prepare, evaluate, workers=1, lookahead=1):
+    """Asynchronously yield (point, evaluate(point, prepare(point))).
+
+    prepare, e.g. building and transpiling a circuit, runs in its own
+    worker thread, ahead of evaluate, e.g. the simulation, which runs in
+    workers further threads. The simulator releases the GIL, so preparing
+    the next points overlaps with evaluating the current ones. At most
+    lookahead points are prepared but not yet evaluated. The results are
+    yielded as they complete."""
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(workers + lookahead)
+    with ThreadPoolExecutor(1) as preparer, ThreadPoolExecutor(workers) as evaluator:
+        async def process(point):
+            async with slots:
+                prepared = await loop.run_in_executor(preparer, prepare, point)
+                result = await loop.run_in_executor(evaluator, evaluate,
+                                                    point, prepared)
+            return point, result
+
+        tasks = [asyncio.ensure_future(process(point)) for point in points]
+        for task in asyncio.as_completed(tasks):
+            yield await task
+
+
+def sweep(points, prepare, evaluate, workers=1, lookahead=1):
+    """Return [evaluate(point, prepare(point)) for point in points], pipelined.
+
+    See pipeline for the meaning of the arguments."""
+    points = list(points)
+
+    async def collect():
+        results = [None] * len(points)
+        async for (index, __), result in pipeline(
+                enumerate(points), lambda item: prepare(item[1]),
+                lambda item, prepared: evaluate(item[1], prepared),
+                workers, lookahead):
+            results[index] = result
+        return results
+
+    return asyncio.run(collect())
@@ -0,0 +1,210 @@
+"""Surrogate model based optimization of the angles.
+
+Every evaluation of the objective function is a full simulation, so the
+optimizer fits a Gaussian process to all evaluations so far and evaluates
+the angles minimizing the lower confidence bound of the model next. The
+model can be seeded with the evaluations of a neighboring sweep point
+(e.g. adjacent a, b or p), which enter the model with additional noise, as
+they belong to a different, but similar objective function.
+"""
+import json
+import os
+
+import numpy as np
+
+
+class Evaluations:
+    """Evaluated angles and their values.
+
+    Attributes:
+    angles (list): the evaluated angles
+    values (list): the values of angles_to_value for the angles
+    """
+
+    def __init__(self):
+        self.angles = []
+        self.values = []
+
+    def add(self, angles, value):
+        self.angles.append(np.array(angles, dtype=float))
+        self.values.append(float(value))
+
+    def __len__(self):
+        return len(self.values)
+
+    def arrays(self, p=None):
+        """Return the angles and the values as arrays.
+
+        If p is given, angles of another depth are interpolated to p
+        layers, see interpolate_angles."""
+        angles = [interpolate_angles(angles, p) if p is not None else angles
+                  for angles in self.angles]
+        return np.array(angles), np.array(self.values)
+
+    def save(self, path):
+        """Save the evaluations as JSON, e.g. to seed a later process."""
+        with open(path, "w") as f:
+            json.dump({"angles": [angles.tolist() for angles in self.angles],
+                       "values": self.values}, f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        """Load evaluations saved by save."""
+        with open(path) as f:
+            data = json.load(f)
+        evaluations = cls()
+        for angles, value in zip(data["angles"], data["values"]):
+            evaluations.add(angles, value)
+        return evaluations
+
+
+def interpolate_angles(angles, p):
+    """Linearly interpolate the schedules of angles to p layers."""
+    angles = np.asarray(angles)
+    old_p = len(angles) // 2
+    if old_p == p:
+        return angles
+    old_layers = (np.arange(old_p) + 0.5) / old_p
+    layers = (np.arange(p) + 0.5) / p
+    result = np.empty(2 * p)
+    result[0::2] = np.interp(layers, old_layers, angles[0::2])
+    result[1::2] = np.interp(layers, old_layers, angles[1::2])
+    return result
+
+
+class GaussianProcess:
+    """Gaussian process regression with a squared exponential kernel.
+
+    The length scale (relative to the width of the bounds) is chosen from
+    length_scales by the marginal likelihood."""
+
+    length_scales = [0.05, 0.1, 0.2, 0.4]
+
+    def __init__(self, bounds):
+        self.lower = bounds[:, 0]
+        self.width = bounds[:, 1] - bounds[:, 0]
+
+    def _kernel(self, x, y, length_scale):
+        x = (x - self.lower) / (self.width * length_scale)
+        y = (y - self.lower) / (self.width * length_scale)
+        distances = (np.sum(x**2, axis=1)[:, None] + np.sum(y**2, axis=1)[None, :]
+                     - 2 * x @ y.T)
+        return np.exp(-0.5 * np.maximum(distances, 0))
+
+    def fit(self, x, y, noise):
+        """Fit the model to values y at x, with noise variances relative to var(y)."""
+        self.x = x
+        self.mean = y.mean()
+        self.scale = y.std() or 1
+        y = (y - self.mean) / self.scale
+        best = -np.inf
+        for length_scale in self.length_scales:
+            kernel = self._kernel(x, x, length_scale) + np.diag(noise + 1e-8)
+            try:
+                cholesky = np.linalg.cholesky(kernel)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = np.linalg.solve(cholesky.T, np.linalg.solve(cholesky, y))
+            likelihood = -0.5 * y @ alpha - np.sum(np.log(np.diag(cholesky)))
+            if likelihood > best:
+                best = likelihood
+                self.length_scale = length_scale
+                self.cholesky = cholesky
+                self.alpha = alpha
+
+    def predict(self, x):
+        """Return the mean and the standard deviation of the model at x."""
+        kernel = self._kernel(x, self.x, self.length_scale)
+        mean = kernel @ self.alpha
+        v = np.linalg.solve(self.cholesky, kernel.T)
+        variance = np.maximum(1 - np.sum(v**2, axis=0), 1e-12)
+        return self.mean + self.scale * mean, self.scale * np.sqrt(variance)
+
+
+class SurrogateOptimizer:
+    """Optimizer of the angles using a Gaussian process surrogate model.
+
+    An instance can be passed as optimizer to optimization.optimize_angles
+    and the find_optimal_angles functions. If carry_over, the evaluations
+    of every optimization seed the next one, so reusing an instance along
+    a sweep seeds every point with its predecessor.
+
+    Attributes:
+    budget (int): the number of evaluations of an optimization
+    initial (int): the number of evaluations before the model is used;
+        the best seeds are evaluated first, then random angles
+    kappa (float): weight of the standard deviation in the lower
+        confidence bound mean - kappa * std
+    seed_noise (float): noise variance of the seeds, relative to the
+        variance of their values
+    candidates (int): the number of candidates the acquisition is
+        minimized over
+    seeds (Evaluations): evaluations of a similar objective function, may
+        be given as the path of evaluations saved by Evaluations.save
+    carry_over (bool): whether to seed the next optimization with the
+        evaluations of this one
+    history (Evaluations): the evaluations of the last optimization
+    """
+
+    def __init__(self, budget=40, initial=8, kappa=2.0, seed_noise=0.1,
+                 candidates=2000, seeds=None, carry_over=True, seed=None):
+        self.budget = budget
+        self.initial = initial
+        self.kappa = kappa
+        self.seed_noise = seed_noise
+        self.candidates = candidates
+        if isinstance(seeds, (str, os.PathLike)):
+            seeds = Evaluations.load(seeds)
+        self.seeds = seeds
+        self.carry_over = carry_over
+        self.history = None
+        self.rng = np.random.default_rng(seed)
+
+    def _candidates(self, bounds, best):
+        """Return random angles in bounds and perturbations of best."""
+        lower, upper = bounds[:, 0], bounds[:, 1]
+        uniform = self.rng.uniform(lower, upper, (self.candidates, len(bounds)))
+        local = best + 0.05 * (upper - lower) * self.rng.standard_normal(
+            (self.candidates // 4, len(bounds)))
+        return np.vstack([uniform, np.clip(local, lower, upper)])
+
+    def __call__(self, p, angles_to_value, gamma_range, beta_range,
+                 bounds=None):
+        """Return the best angles found within the budget.
+
+        bounds (a 2p x 2 array) replace the ranges, e.g. the bounds of a
+        domains.AngleDomain."""
+        if bounds is None:
+            bounds = np.array([gamma_range, beta_range] * p, dtype=float)
+        evaluations = Evaluations()
+        seed_angles = np.zeros((0, 2 * p))
+        seed_values = np.zeros(0)
+        if self.seeds is not None and len(self.seeds):
+            seed_angles, seed_values = self.seeds.arrays(p)
+            seed_angles = np.clip(seed_angles, bounds[:, 0], bounds[:, 1])
+        for angles in seed_angles[np.argsort(seed_values)][:self.initial // 2]:
+            evaluations.add(angles, angles_to_value(angles))
+        while len(evaluations) < min(self.initial, self.budget):
+            angles = self.rng.uniform(bounds[:, 0], bounds[:, 1])
+            evaluations.add(angles, angles_to_value(angles))
+        model = GaussianProcess(bounds)
+        while len(evaluations) < self.budget:
+            x, y = evaluations.arrays()
+            noise = np.zeros(len(y))
+            if len(seed_values):
+                # offset the seeds to the values of this objective function
+                offset = y.mean() - seed_values.mean()
+                x = np.vstack([x, seed_angles])
+                y = np.concatenate([y, seed_values + offset])
+                noise = np.concatenate([noise, np.full(len(seed_values),
+                                                       self.seed_noise)])
+            model.fit(x, y, noise)
+            candidates = self._candidates(bounds, x[np.argmin(y)])
+            mean, std = model.predict(candidates)
+            angles = candidates[np.argmin(mean - self.kappa * std)]
+            evaluations.add(angles, angles_to_value(angles))
+        self.history = evaluations
+        if self.carry_over:
+            self.seeds = evaluations
+        angles, values = evaluations.arrays()
+        return angles[np.argmin(values)]
@@ -11,6 +11,14 @@ plt.rcParams.update({
 })
 
 
+def use_fast_backend(fast=True):
+    """Render text with matplotlib's mathtext instead of LaTeX, if fast.
+
+    Labels such as r"$p(x)$" are rendered by both, but mathtext does not
+    start a LaTeX process for every label."""
+    plt.rcParams["text.usetex"] = not fast
+
+
 def key_to_label(key):
     digits = list(reversed(list(key)))
     label = "(" + ", ".join(digits) + ")"
@@ -29,3 +37,70 @@ def hist(ax, probs):
     ax.set_ylabel(r"Probability $p(x)$")
 
 
+def probabilities_array(probs, num_qubits):
+    """Convert a probability dict to a dense array indexed by the choices."""
+    probabilities = np.zeros(2**num_qubits)
+    indices = np.fromiter((int(key, 2) for key in probs.keys()), dtype=np.int64,
+                          count=len(probs))
+    probabilities[indices] = list(probs.values())
+    return probabilities
+
+
+def top_choices(probabilities, k):
+    """Return the k most probable choices, their probabilities and the rest."""
+    k = min(k, len(probabilities))
+    indices = np.argpartition(probabilities, -k)[-k:]
+    indices = indices[np.argsort(-probabilities[indices], kind="stable")]
+    heights = probabilities[indices]
+    return indices, heights, probabilities.sum() - heights.sum()
+
+
+def hist_top(ax, probabilities, num_qubits, k=20):
+    """Plot the k most probable choices and the remaining probability.
+
+    probabilities is a dense array as returned by probabilities_array, so
+    only k + 1 bars and labels are drawn, independent of num_qubits."""
+    indices, heights, other = top_choices(probabilities, k)
+    labels = [key_to_label(format(index, f"0{num_qubits}b"))
+              for index in indices]
+    ax.bar(range(len(indices) + 1), [*heights, other],
+           tick_label=[*labels, "other"])
+    ax.tick_params(axis='x', rotation=70)
+    ax.set_xlabel(r"Item choice $x$")
+    ax.set_ylabel(r"Probability $p(x)$")
+
+
+def value_distribution(probabilities, values, bins=None):
+    """Return the objective values and their total probabilities.
+
+    If bins is given, the values are aggregated into as many bins of equal
+    width and the centers of the bins are returned."""
+    if bins is None:
+        distinct, inverse = np.unique(values, return_inverse=True)
+        return distinct, np.bincount(inverse, probabilities,
+                                     minlength=len(distinct))
+    heights, edges = np.histogram(values, bins, weights=probabilities)
+    return (edges[:-1] + edges[1:]) / 2, heights
+
+
+def hist_by_value(ax, probabilities, values, bins=None):
+    """Plot the probability of the objective values.
+
+    values[i] is the value of choice i, e.g. native.computational_sums of
+    the item values."""
+    centers, heights = value_distribution(probabilities, values, bins)
+    width = np.min(np.diff(centers)) if len(centers) > 1 else 1
+    ax.bar(centers, heights, width=0.8 * width)
+    ax.set_xlabel(r"Objective value $f(x)$")
+    ax.set_ylabel(r"Probability $p(f(x))$")
+
+
+def hist_feasibility(ax, probabilities, feasible):
+    """Plot the probabilities of feasible and of infeasible choices.
+
+    feasible[i] states whether choice i is feasible."""
+    feasible_probability = probabilities[feasible].sum()
+    ax.bar([0, 1], [feasible_probability,
+                    probabilities.sum() - feasible_probability],
+           tick_label=["feasible", "infeasible"])
+    ax.set_ylabel(r"Probability")
@@ -0,0 +1,60 @@
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+
+import angle_library
+import linqaoa
+import native
+import qwqaoa
+from knapsack import KnapsackProblem, toy_problems
+
+
+def test_record_and_lookup(tmp_path):
+    library = angle_library.AngleLibrary()
+    problem = KnapsackProblem(values=[2, 4], weights=[1, 1], max_weight=1)
+    library.record("linqaoa", problem, 1, None, (8,), angles=[0.5, 1.0])
+    library.record("linqaoa", problem, 1, None, (8,), angles=[0.52, 1.02])
+    library.record("linqaoa", problem, 1, None, (8,), angles=[3.0, 3.0])
+    # the same normalized penalty factor a / max(values) for other values
+    scaled = KnapsackProblem(values=[4, 8], weights=[1, 1], max_weight=1)
+    assert np.allclose(library.lookup("linqaoa", scaled, 1, None, (16,)),
+                       [0.26, 1.02])
+    assert library.lookup("linqaoa", scaled, 1, None, (8,)) is None
+    assert library.lookup("linqaoa", scaled, 2, None, (16,)) is None
+    library.save(tmp_path / "library.json")
+    loaded = angle_library.AngleLibrary.load(tmp_path / "library.json",
+                                             method="cluster")
+    assert loaded.entries == library.entries
+    assert np.allclose(loaded.lookup("linqaoa", problem, 1, None, (8,)),
+                       [0.51, 1.01])
+
+
+def test_find_optimal_angles_with_library():
+    problem = toy_problems[3]
+    a = 2 * linqaoa.amin(problem)
+    circuit = native.NativeLinQAOA(problem, 1)
+    library = angle_library.AngleLibrary(refine=False)
+    angles = linqaoa.find_optimal_angles(circuit, problem, a, library=library)
+    assert len(library.entries) == 1
+    assert np.allclose(linqaoa.find_optimal_angles(circuit, problem, a,
+                                                   library=library), angles)
+    library.refine = True
+    refined = linqaoa.find_optimal_angles(circuit, problem, a, library=library)
+    assert (circuit.expectation_value(refined, a)
+            >= circuit.expectation_value(angles, a) - 1e-9)
+    assert len(library.entries[next(iter(library.entries))]) == 1
+
+
+def test_qwqaoa_with_library():
+    problem = toy_problems[3]
+    circuit = native.NativeQuantumWalkQAOA(problem, 1, 2)
+    library = angle_library.AngleLibrary(refine=False)
+    start = [0.3, 0.4]
+    # given initial angles are refined and recorded, as for the other approaches
+    refined = qwqaoa.find_optimal_angles(circuit, problem, library=library,
+                                         initial_angles=start)
+    assert not np.allclose(refined, start)
+    assert len(library.entries) == 1
+    assert np.allclose(qwqaoa.find_optimal_angles(circuit, problem,
+                                                  library=library), refined)
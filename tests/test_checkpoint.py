@@ -0,0 +1,105 @@
+import subprocess
+import sys
+import threading
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+
+import checkpoint
+import linqaoa
+import native
+from knapsack import toy_problems
+
+
+class Interrupted(Exception):
+    pass
+
+
+class CountingLinQAOA(native.NativeLinQAOA):
+    """Simulation counting its evaluations, interrupted at interrupt_at."""
+
+    calls = 0
+    interrupt_at = None
+
+    def expectation_value(self, angles, a):
+        if self.calls == self.interrupt_at:
+            raise Interrupted
+        self.calls += 1
+        return super().expectation_value(angles, a)
+
+
+def test_resume(tmp_path):
+    problem = toy_problems[4]
+    a = 2 * linqaoa.amin(problem)
+    circuit = CountingLinQAOA(problem, 2)
+    path = tmp_path / "angles.journal"
+    expected = linqaoa.find_optimal_angles(circuit, problem, a)
+    total = circuit.calls
+
+    circuit.calls, circuit.interrupt_at = 0, 40
+    with pytest.raises(Interrupted):
+        linqaoa.find_optimal_angles(circuit, problem, a, checkpoint=path)
+    assert path.exists()
+    circuit.calls, circuit.interrupt_at = 0, None
+    angles = linqaoa.find_optimal_angles(circuit, problem, a, checkpoint=path)
+    assert np.array_equal(angles, expected)
+    assert circuit.calls == total - 40
+    # the journal of a complete optimization is removed
+    assert not path.exists()
+
+
+def test_other_optimization(tmp_path):
+    problem = toy_problems[4]
+    a = 2 * linqaoa.amin(problem)
+    circuit = CountingLinQAOA(problem, 2)
+    path = tmp_path / "angles.journal"
+    circuit.interrupt_at = 40
+    with pytest.raises(Interrupted):
+        linqaoa.find_optimal_angles(circuit, problem, a, checkpoint=path)
+    circuit.interrupt_at = None
+    expected = linqaoa.find_optimal_angles(circuit, problem, 3 * a / 2)
+    with pytest.warns(UserWarning, match="another optimization"):
+        angles = linqaoa.find_optimal_angles(circuit, problem, 3 * a / 2,
+                                             checkpoint=path)
+    assert np.array_equal(angles, expected)
+
+
+def test_divergence(tmp_path):
+    path = tmp_path / "angles.journal"
+    with checkpoint.Journal(path, 2) as journal:
+        function = journal.wrap(lambda angles: angles.sum())
+        function([1, 2])
+        function([3, 4])
+    # an incomplete record is ignored
+    with open(path, "ab") as f:
+        f.write(b"\0" * 8)
+    journal = checkpoint.Journal(path, 2)
+    assert journal.values == [3, 7]
+    function = journal.wrap(lambda angles: angles.sum())
+    assert function([1, 2]) == 3
+    with pytest.warns(UserWarning):
+        assert function([5, 6]) == 11
+    journal.close()
+    assert checkpoint.Journal(path, 2).values == [3, 11]
+
+
+def stable_key():
+    import optimization
+    import optimizers
+    import surrogate
+    from fractions import Fraction
+    return ("linqaoa", toy_problems[4], (Fraction(3, 2),),
+            optimization.refine_angles, optimizers.get_optimizer("spsa"),
+            surrogate.SurrogateOptimizer(seed=1))
+
+
+def test_digest_is_stable_between_processes():
+    code = ("import sys; sys.path.append('../code/'); "
+            "import checkpoint, test_checkpoint; "
+            "print(checkpoint.digest(test_checkpoint.stable_key()).hex())")
+    output = subprocess.run([sys.executable, "-c", code], check=True,
+                            capture_output=True, text=True).stdout
+    assert output.strip() == checkpoint.digest(stable_key()).hex()
+    with pytest.raises(ValueError):
+        checkpoint.describe(threading.Lock())
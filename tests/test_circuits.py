@@ -87,3 +87,29 @@ def test_feasibility_oracle():
     assert run_feasibility_oracle([0, 0, 1]) == non_feasible_dict
     assert run_feasibility_oracle([0, 1, 1]) == non_feasible_dict
     assert run_feasibility_oracle([1, 1, 1]) == non_feasible_dict
+
+
+def test_templates():
+    import numpy as np
+    import linqaoa
+    import quadqaoa
+    import qwqaoa
+    first = KnapsackProblem(values=[1, 2, 4], weights=[1, 2, 3], max_weight=3)
+    second = KnapsackProblem(values=[3, 1, 2], weights=[1, 2, 3], max_weight=3)
+    angles = np.array([0.4, 0.3])
+    cases = [
+        (linqaoa, (1,), (4,)),
+        (quadqaoa, (1,), (1, 5)),
+        (qwqaoa, (1, 1), ()),
+    ]
+    for module, args, penalties in cases:
+        template = module.prepare_circuit(first, *args, template=True)
+        assert module.prepare_circuit(second, *args, template=True) is template
+        for problem in [first, second]:
+            expected = module.get_probs_dict(
+                module.prepare_circuit(problem, *args), problem, angles,
+                *penalties)
+            probs = module.get_probs_dict(template, problem, angles, *penalties)
+            assert probs.keys() == expected.keys()
+            assert np.allclose(list(probs.values()),
+                               [expected[key] for key in probs])
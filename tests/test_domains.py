@@ -0,0 +1,116 @@
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+from fractions import Fraction
+
+import domains
+import linqaoa
+import native
+import optimization
+import optimizers
+import quadqaoa
+from knapsack import toy_problems
+
+
+def test_rational_gcd():
+    assert domains.rational_gcd([4, 6, 10]) == 2
+    assert domains.rational_gcd([0.5, 0.75]) == Fraction(1, 4)
+    assert domains.rational_gcd([1, np.sqrt(2)]) is None
+    assert domains.rational_gcd([0, 0]) is None
+
+
+def simulations(problem):
+    a = 2 * linqaoa.amin(problem)
+    b = 2 * quadqaoa.bmin(1, problem)
+    return [
+        ("linqaoa", native.NativeLinQAOA(problem, 2), (a,), None),
+        ("linqaoa", native.NativeLinQAOA(problem, 2), (1.5,), None),
+        ("quadqaoa", native.NativeQuadQAOA(problem, 2), (1, b), None),
+        ("qwqaoa", native.NativeQuantumWalkQAOA(problem, 2, 2), (), 2),
+    ]
+
+
+@pytest.mark.parametrize("problem", toy_problems[3:6])
+def test_symmetries(problem):
+    rng = np.random.default_rng(0)
+    for approach, simulation, penalties, m in simulations(problem):
+        domain = domains.angle_domain(approach, problem, penalties, m)
+        angles = rng.uniform(0, 3, 4)
+        value = simulation.expectation_value(angles, *penalties)
+        shifts = np.diag([domain.gamma_period, domain.beta_period] * 2)
+        for shift in shifts:
+            assert np.isclose(simulation.expectation_value(
+                angles + shift, *penalties), value)
+        assert np.isclose(simulation.expectation_value(-angles, *penalties),
+                          value)
+        canonical = domain.canonical(angles + 5 * shifts[2] - 3 * shifts[1])
+        bounds = domain.bounds(2)
+        assert np.all((bounds[:, 0] <= canonical) & (canonical <= bounds[:, 1]))
+        assert np.isclose(simulation.expectation_value(canonical, *penalties),
+                          value)
+
+
+def test_reduced_domain():
+    problem = toy_problems[4]
+    a = 2 * linqaoa.amin(problem)
+    circuit = native.NativeLinQAOA(problem, 1)
+    domain = domains.angle_domain("linqaoa", problem, (a,))
+    assert domain.volume_fraction(1, circuit.gamma_range(a),
+                                  circuit.beta_range()) <= 0.5
+    angles = linqaoa.find_optimal_angles(circuit, problem, a, domain=True)
+    assert np.allclose(angles, domain.canonical(angles))
+
+
+def test_domain_with_other_searches():
+    problem = toy_problems[4]
+    a = 2 * linqaoa.amin(problem)
+    circuit = native.NativeLinQAOA(problem, 2)
+    domain = domains.angle_domain("linqaoa", problem, (a,))
+    bounds = domain.bounds(2)
+    evaluated = []
+
+    def angles_to_value(angles):
+        evaluated.append(np.array(angles))
+        return - circuit.expectation_value(angles, a)
+
+    optimizer = optimizers.get_optimizer("nelder-mead", max_evaluations=30,
+                                        seed=0)
+    for options in [{"optimizer": optimizer},
+                    {"initial_angles": [0.1, 0.2, 0.3, 0.4]}]:
+        evaluated.clear()
+        optimization.optimize_angles(2, angles_to_value,
+                                     circuit.gamma_range(a),
+                                     circuit.beta_range(), domain=domain,
+                                     **options)
+        assert np.all((bounds[:, 0] - 1e-9 <= evaluated)
+                      & (evaluated <= bounds[:, 1] + 1e-9))
+    with pytest.raises(ValueError):
+        optimization.optimize_angles(2, angles_to_value,
+                                     circuit.gamma_range(a),
+                                     circuit.beta_range(), fourier=1,
+                                     domain=domain)
+
+
+def test_walk_beta_period():
+    # all choices are feasible, so m pi is a period
+    full = native.NativeQuantumWalkQAOA(toy_problems[2], 2, 3)
+    assert np.isclose(domains.walk_beta_period(full), 3 * np.pi)
+    restricted = native.NativeQuantumWalkQAOA(toy_problems[6], 2, 3)
+    period = domains.walk_beta_period(restricted)
+    assert np.isclose(period, 6 * np.pi)
+    angles = np.array([0.4, 0.3, 1.1, 0.7])
+    value = restricted.expectation_value(angles)
+    assert np.isclose(restricted.expectation_value(angles + [0, 0, 0, period]),
+                      value)
+    assert not np.isclose(restricted.expectation_value(
+        angles + [0, 0, 0, period / 2]), value)
+
+
+def test_continuous_walk_beta_limit():
+    problem = toy_problems[6]
+    circuit = native.NativeQuantumWalkQAOA(problem, 1, None, beta_max=10)
+    domain = domains.angle_domain("qwqaoa", problem, (), None,
+                                  circuit.beta_range()[1])
+    assert domain.beta_range == (0, 10)
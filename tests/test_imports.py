@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize("module", ["linqaoa", "quadqaoa", "qwqaoa",
+                                    "sampling", "outofcore"])
+def test_lazy_imports(module):
+    code = (f"import sys; sys.path.append('../code/'); import {module}; "
+            "print([name for name in ('qiskit', 'qiskit_aer', 'matplotlib', "
+            "'scipy.optimize', 'psutil') if name in sys.modules])")
+    output = subprocess.run([sys.executable, "-c", code], check=True,
+                            capture_output=True, text=True).stdout
+    assert output.strip() == "[]"
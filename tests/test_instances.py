@@ -0,0 +1,37 @@
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+
+import instances
+from knapsack import toy_problems
+
+
+@pytest.mark.parametrize("family", instances.FAMILIES)
+def test_random_problem(family):
+    problem = instances.random_problem(8, family, R=20, seed=1)
+    assert problem == instances.random_problem(8, family, R=20, seed=1)
+    assert problem.N == 8
+    assert min(problem.values) >= 1 and 1 <= min(problem.weights) <= max(problem.weights) <= 20
+    assert problem.max_weight == sum(problem.weights) // 2
+    if family == "subset sum":
+        assert problem.values == problem.weights
+    if family == "strongly correlated":
+        assert np.all(np.subtract(problem.values, problem.weights) == 2)
+
+
+def test_problem_batch(tmp_path):
+    batch = instances.ProblemBatch.from_problems(toy_problems)
+    assert len(batch) == len(toy_problems)
+    assert list(batch) == toy_problems
+    generated = instances.ProblemBatch.generate(100, 5, seed=2)
+    assert generated[3].N == 5
+    combined = instances.ProblemBatch.concatenate([batch, generated])
+    assert combined[len(batch) + 3] == generated[3]
+    combined.save(tmp_path / "batch")
+    loaded = instances.ProblemBatch.load(tmp_path / "batch")
+    assert isinstance(loaded.values, np.memmap)
+    assert loaded[2] == toy_problems[2]
+    selected = loaded.select([len(batch) + 3, 1])
+    assert list(selected) == [generated[3], toy_problems[1]]
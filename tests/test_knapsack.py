@@ -0,0 +1,44 @@
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+
+import instances
+import knapsack
+from knapsack import toy_problems
+
+
+def brute_force_feasible(problem):
+    indices = np.arange(2**problem.N)
+    weights = knapsack.choice_bits(indices, problem.N) @ problem.weights
+    return indices[weights <= problem.max_weight]
+
+
+@pytest.mark.parametrize("problem", toy_problems + [
+    instances.random_problem(14, family, seed=0, capacity_ratio=0.3)
+    for family in instances.FAMILIES])
+def test_feasible_states(problem):
+    expected = brute_force_feasible(problem)
+    assert np.array_equal(knapsack.feasible_states(problem), expected)
+    blocks = list(knapsack.feasible_choices(problem, block_size=5,
+                                            inner_items=2))
+    assert all(len(block) >= 5 for block in blocks[:-1])
+    assert np.array_equal(np.sort(np.concatenate(blocks)), expected)
+
+
+def test_best_known_solutions():
+    problem = knapsack.KnapsackProblem([1, 1, 2, 2], [1, 1, 2, 2], 2)
+    expected = [[1, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+    assert np.array_equal(knapsack.best_known_solutions(problem), expected)
+
+
+def test_neighbor_index():
+    problem = toy_problems[6]
+    states = knapsack.feasible_states(problem)
+    pairs = knapsack.neighbor_index(states, problem.N)
+    for j, (lower, upper) in enumerate(pairs):
+        assert np.all(states[upper] == states[lower] + 2**j)
+        count = sum(state & 2**j == 0 and state + 2**j in states
+                    for state in states)
+        assert len(lower) == count
@@ -0,0 +1,165 @@
+import sys
+from fractions import Fraction
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+
+import circuits
+import instances
+import knapsack
+import linqaoa
+import native
+import quadqaoa
+import qwqaoa
+from knapsack import KnapsackProblem, toy_problems
+
+
+problems = [
+    toy_problems[3],
+    toy_problems[4],
+    KnapsackProblem(values=[3, 3, 1, 3], weights=[2, 2, 5, 2], max_weight=6),
+]
+angles = np.array([0.4, 1.1, 2.3, 0.7])
+
+
+def assert_dicts_close(probs, expected):
+    for key in probs.keys() | expected.keys():
+        assert probs.get(key, 0) == pytest.approx(expected.get(key, 0),
+                                                  abs=1e-10)
+
+
+def test_identical_items():
+    assert native.identical_items(problems[2]) == [[0, 1, 3], [2]]
+
+
+def test_basis():
+    basis = native.Basis([[0, 2], [1]])
+    assert basis.dimension == 6
+    assert basis.multiplicities.sum() == 2**3
+    probs = np.arange(6) / 15
+    expanded = basis.expand(probs)
+    assert expanded.sum() == pytest.approx(1)
+    # |x2 x1 x0> = |101> has two items of the first group
+    assert expanded[0b101] == probs[2]
+    assert expanded[0b001] == expanded[0b100] == probs[1] / 2
+
+
+@pytest.mark.parametrize("problem", problems)
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_native_linqaoa(problem, symmetric):
+    circuit = circuits.LinQAOA(problem, 2)
+    native_circuit = native.NativeLinQAOA(problem, 2, symmetric)
+    expected = linqaoa.get_probs_dict(circuit, problem, angles, 2.5)
+    probs = linqaoa.get_probs_dict(native_circuit, problem, angles, 2.5)
+    assert_dicts_close(probs, expected)
+
+
+@pytest.mark.parametrize("problem", problems)
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_native_quadqaoa(problem, symmetric):
+    circuit = circuits.QuadQAOA(problem, 2)
+    native_circuit = native.NativeQuadQAOA(problem, 2, symmetric)
+    for choices_only in [True, False]:
+        expected = quadqaoa.get_probs_dict(circuit, problem, angles, 1, 3,
+                                           choices_only)
+        probs = quadqaoa.get_probs_dict(native_circuit, problem, angles, 1, 3,
+                                        choices_only)
+        assert_dicts_close(probs, expected)
+
+
+@pytest.mark.parametrize("problem", problems[:2])
+def test_native_qwqaoa(problem):
+    circuit = circuits.QuantumWalkQAOA(problem, 2, 2)
+    native_circuit = native.NativeQuantumWalkQAOA(problem, 2, 2)
+    expected = qwqaoa.get_probs_dict(circuit, problem, angles)
+    probs = qwqaoa.get_probs_dict(native_circuit, problem, angles)
+    assert_dicts_close(probs, expected)
+
+
+@pytest.mark.parametrize("m", [1, 3, 20])
+def test_native_qwqaoa_mixer_methods(m):
+    problem = problems[2]
+    direct = native.NativeQuantumWalkQAOA(problem, 2, m, mixer_method="direct")
+    power = native.NativeQuantumWalkQAOA(problem, 2, m, mixer_method="power")
+    assert np.allclose(power.statevector(angles), direct.statevector(angles))
+
+
+def test_native_qwqaoa_continuous():
+    problem = problems[2]
+    continuous = native.NativeQuantumWalkQAOA(problem, 2, None)
+    walks = native.NativeQuantumWalkQAOA(problem, 2, 4096, mixer_method="power")
+    assert np.allclose(continuous.statevector(angles), walks.statevector(angles),
+                       atol=1e-3)
+    continuous.max_eigh_dimension = 0
+    assert np.allclose(continuous.statevector(angles),
+                       walks.statevector(angles), atol=1e-3)
+
+
+def test_native_qwqaoa_continuous_beta_range():
+    problem = toy_problems[6]
+    continuous = native.NativeQuantumWalkQAOA(problem, 1, None)
+    assert continuous.beta_range() == (0, 2 * np.pi)
+    # pi is not a period if not all choices are feasible
+    assert not np.isclose(continuous.expectation_value([0.5, 0.7]),
+                          continuous.expectation_value([0.5, 0.7 + np.pi]))
+    wider = native.NativeQuantumWalkQAOA(problem, 1, None, beta_max=10)
+    assert wider.beta_range() == (0, 10)
+
+
+def test_prefix_cache():
+    problem = problems[2]
+    p = 3
+    angles_p = np.linspace(0.1, 1, 2 * p)
+    changed = angles_p.copy()
+    changed[-2:] = [0.3, 0.7]
+    simulations = [
+        (native.NativeLinQAOA(problem, p), (2,)),
+        (native.NativeQuadQAOA(problem, p), (1, 3)),
+        (native.NativeQuantumWalkQAOA(problem, p, 2), ()),
+    ]
+    for simulation, penalties in simulations:
+        expected = [simulation.statevector(angles_p, *penalties),
+                    simulation.statevector(changed, *penalties)]
+        simulation.cache_prefixes()
+        for angles_, state in zip([angles_p, changed], expected):
+            assert np.allclose(simulation.statevector(angles_, *penalties), state)
+        # the second evaluation only applies the last layer
+        assert simulation.prefix_cache.applied_layers == p + 1
+
+
+def test_batched_linqaoa():
+    batch = instances.ProblemBatch.generate(5, 4, seed=4)
+    batched = native.BatchedLinQAOA(batch, 2)
+    circuits_ = [native.NativeLinQAOA(problem, 2, symmetric=False)
+                 for problem in batch]
+    a = np.arange(1, 6)
+    assert np.allclose(batched.expectation_values(angles, a),
+                       [circuit.expectation_value(angles, a_i)
+                        for circuit, a_i in zip(circuits_, a)])
+    per_instance = np.outer(np.linspace(0.5, 1.5, 5), angles)
+    ratios = batched.approximation_ratios(per_instance, 3)
+    for problem, circuit, instance_angles, ratio in zip(batch, circuits_,
+                                                        per_instance, ratios):
+        assert np.isclose(ratio, circuit.comparable_expectation_value(
+            instance_angles, 3) / best_value(problem))
+
+
+def best_value(problem):
+    choice = knapsack.best_known_solutions(problem)[0]
+    return knapsack.value(choice, problem)
+
+
+def test_quadqaoa_gamma_range_denominator():
+    # the range is 2 pi lcm(denominators) / gcd(numerators)
+    assert np.isclose(native.NativeQuadQAOA.gamma_range(1, Fraction(3, 2))[1],
+                      4 * np.pi)
+    assert np.isclose(circuits.QuadQAOA.gamma_range(1, Fraction(3, 2))[1],
+                      4 * np.pi)
+    problem = toy_problems[4]
+    simulation = native.NativeQuadQAOA(problem, 1)
+    angles = np.array([0.3, 0.4])
+    period = simulation.gamma_range(1, Fraction(3, 2))[1]
+    assert np.isclose(
+        simulation.expectation_value(angles, 1, Fraction(3, 2)),
+        simulation.expectation_value(angles + [period, 0], 1, Fraction(3, 2)))
@@ -0,0 +1,56 @@
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+
+import linqaoa
+import native
+import optimization
+import optimizers
+from knapsack import toy_problems
+
+
+def test_fourier_angles():
+    angles = optimization.fourier_angles([1, 2], 2)
+    assert np.allclose(angles, [np.sin(np.pi / 8), 2 * np.cos(np.pi / 8),
+                                np.sin(3 * np.pi / 8), 2 * np.cos(3 * np.pi / 8)])
+    # q = p pairs of coefficients span all angles
+    matrix = np.array([optimization.fourier_angles(row, 3)
+                       for row in np.eye(6)])
+    assert np.linalg.matrix_rank(matrix) == 6
+
+
+def test_fourier_optimization():
+    problem = toy_problems[4]
+    a = 2 * linqaoa.amin(problem)
+    circuit = native.NativeLinQAOA(problem, 4)
+    angles = linqaoa.find_optimal_angles(circuit, problem, a, fourier=1)
+    assert len(angles) == 8
+    adaptive = linqaoa.find_optimal_angles(circuit, problem, a, fourier=3)
+    assert (circuit.expectation_value(adaptive, a)
+            >= circuit.expectation_value(angles, a) - 1e-9)
+
+
+def test_refine_layerwise():
+    problem = toy_problems[4]
+    a = 2 * linqaoa.amin(problem)
+    circuit = native.NativeLinQAOA(problem, 3).cache_prefixes()
+    start = np.full(6, 0.2)
+    angles = optimization.refine_layerwise(
+        lambda angles: -circuit.expectation_value(angles, a), start,
+        circuit.gamma_range(a), circuit.beta_range())
+    assert (circuit.expectation_value(angles, a)
+            > circuit.expectation_value(start, a))
+
+
+def test_layerwise_optimizer():
+    problem = toy_problems[4]
+    a = 2 * linqaoa.amin(problem)
+    circuit = native.NativeLinQAOA(problem, 3)
+    optimizer = optimizers.get_optimizer("layerwise", seed=0)
+    angles = linqaoa.find_optimal_angles(circuit, problem, a,
+                                         optimizer=optimizer)
+    # evaluations only apply the layers after a cached prefix, not all 3
+    assert circuit.prefix_cache.applied_layers < 2.5 * optimizer.run.evaluations
+    assert (circuit.expectation_value(angles, a)
+            > circuit.expectation_value([0] * 6, a))
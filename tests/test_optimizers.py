@@ -0,0 +1,86 @@
+import sys
+import time
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+
+import knapsack
+import linqaoa
+import native
+import optimizers
+from knapsack import toy_problems
+
+
+problem = toy_problems[4]
+a = 2 * linqaoa.amin(problem)
+circuit = native.NativeLinQAOA(problem, 1)
+best = knapsack.value(knapsack.best_known_solutions(problem)[0], problem)
+
+
+def angles_to_value(angles):
+    return - circuit.expectation_value(angles, a)
+
+
+def angles_to_ratio(angles):
+    return circuit.comparable_expectation_value(angles, a) / best
+
+
+@pytest.mark.parametrize("name", list(optimizers.OPTIMIZERS))
+def test_optimizers(name):
+    optimizer = optimizers.get_optimizer(name, max_evaluations=30, seed=1)
+    angles = optimizer(1, angles_to_value, circuit.gamma_range(a),
+                       circuit.beta_range())
+    assert len(angles) == 2
+    assert optimizer.run.evaluations <= 30
+    assert np.isclose(angles_to_value(angles), optimizer.run.best_value)
+
+
+def test_optimize_angles_by_name():
+    angles = linqaoa.find_optimal_angles(circuit, problem, a,
+                                         optimizer="shgo")
+    assert - angles_to_value(angles) > circuit.expectation_value([0, 0], a)
+
+
+def test_evaluations_to_target():
+    reports = optimizers.evaluations_to_target(
+        ["cobyla", "cma-es"], 1, angles_to_value, circuit.gamma_range(a),
+        circuit.beta_range(), angles_to_ratio, 0.0, max_evaluations=20,
+        seeds=[0, 1])
+    assert len(reports) == 4
+    for report in reports:
+        # every angles reach the ratio 0, so the first evaluation does
+        assert report["reached"] and report["target_evaluations"] == 1
+        assert report["evaluations"] <= 20
+    unreachable = optimizers.evaluations_to_target(
+        ["spsa"], 1, angles_to_value, circuit.gamma_range(a),
+        circuit.beta_range(), angles_to_ratio, 2.0, max_evaluations=20)
+    assert not unreachable[0]["reached"]
+    assert unreachable[0]["best_score"] <= 1
+
+
+def test_scoring_is_not_timed():
+    def slow_score(angles):
+        time.sleep(0.05)
+        return 1
+
+    run = optimizers.Run(angles_to_value, angles_to_score=slow_score, target=1)
+    run([0.1, 0.2])
+    assert run.reached
+    assert run.seconds < 0.05
+    assert run.target_seconds < 0.05
+
+
+@pytest.mark.parametrize("optimizer", [optimizers.SPSA, optimizers.CMAES])
+def test_budget_without_run(optimizer):
+    calls = []
+
+    def function(x):
+        calls.append(x)
+        return np.sum((x - 0.3)**2)
+
+    bounds = np.array([[0, 1], [0, 2]], dtype=float)
+    result = optimizer(max_evaluations=50).minimize(
+        function, bounds, np.random.default_rng(0))
+    assert len(calls) <= 50
+    assert np.all((bounds[:, 0] <= result) & (result <= bounds[:, 1]))
@@ -0,0 +1,57 @@
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+
+import native
+import outofcore
+from knapsack import KnapsackProblem
+
+
+angles = np.array([0.4, 1.1, 2.3, 0.7, 0.2, 0.9])
+
+
+@pytest.mark.parametrize("chunk_qubits", [4, 5, 7])
+def test_outofcore_linqaoa(chunk_qubits, tmp_path):
+    problem = KnapsackProblem(values=[3, 1, 4, 1, 5, 9, 2],
+                              weights=[2, 7, 1, 8, 2, 8, 1], max_weight=12)
+    expected = native.NativeLinQAOA(problem, 3, symmetric=False)
+    with outofcore.OutOfCoreLinQAOA(problem, 3, chunk_qubits,
+                                    directory=tmp_path) as simulation:
+        assert simulation.expectation_value(angles, 2.5) == pytest.approx(
+            expected.expectation_value(angles, 2.5))
+        feasible = simulation.state.reduce(
+            lambda sums, probabilities:
+            probabilities[sums(problem.weights) <= problem.max_weight].sum())
+        probabilities = expected.probabilities(angles, 2.5)
+        assert feasible == pytest.approx(sum(
+            probabilities[index] for index in range(2**problem.N)
+            if np.dot(problem.weights, [(index >> j) & 1 for j in
+                                        range(problem.N)]) <= problem.max_weight))
+        if simulation.state.chunk_qubits < problem.N:
+            with pytest.raises(ValueError):
+                simulation.probabilities(angles, 2.5)
+        else:
+            assert np.allclose(simulation.probabilities(angles, 2.5),
+                               probabilities)
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("chunk_qubits", [4, 7])
+def test_outofcore_quadqaoa(chunk_qubits, tmp_path):
+    problem = KnapsackProblem(values=[3, 1, 4], weights=[2, 3, 1],
+                              max_weight=4)
+    expected = native.NativeQuadQAOA(problem, 3, symmetric=False)
+    simulation = outofcore.OutOfCoreQuadQAOA(problem, 3, chunk_qubits,
+                                             directory=tmp_path)
+    assert np.allclose(simulation.probabilities(angles, 1, 3),
+                       expected.probabilities(angles, 1, 3))
+    if simulation.state.chunk_qubits == simulation.num_qubits:
+        assert np.allclose(simulation.probabilities(angles, 1, 3, False),
+                           expected.probabilities(angles, 1, 3, False))
+    assert simulation.comparable_expectation_value(angles, 1, 3) == pytest.approx(
+        expected.comparable_expectation_value(angles, 1, 3))
+    simulation.close()
+    simulation.close()
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,42 @@
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+
+import linqaoa
+import native
+import penalty_tuning
+from knapsack import toy_problems
+
+
+@pytest.mark.parametrize("approach", ["linqaoa", "quadqaoa"])
+def test_tune_penalty(approach):
+    problem = toy_problems[4]
+    best = penalty_tuning.tune_penalty(approach, problem, 1, native=True,
+                                       max_optimizations=6)
+    assert best.optimizations <= 6
+    lower = min(best.evaluations)
+    assert lower == max(problem.values)
+    assert lower <= best.factor <= 4 * lower
+    assert best.ratio == max(ratio for ratio, __ in best.evaluations.values())
+    # integer factors keep the range of gamma small
+    assert all(factor.denominator == 1 for factor in best.evaluations)
+    smallest = penalty_tuning.tune_penalty(approach, problem, 1, "smallest",
+                                           tolerance=0.05, native=True,
+                                           max_optimizations=10)
+    assert smallest.factor <= max(smallest.evaluations,
+                                  key=lambda f: smallest.evaluations[f][0])
+    assert smallest.ratio >= max(ratio for ratio, __
+                                 in smallest.evaluations.values()) - 0.05
+
+
+def test_initial_angles():
+    problem = toy_problems[4]
+    a = 2 * linqaoa.amin(problem)
+    circuit = native.NativeLinQAOA(problem, 2)
+    start = np.array([0.3, 0.5, 0.6, 0.2])
+    angles = linqaoa.find_optimal_angles(circuit, problem, a,
+                                         initial_angles=start)
+    assert (circuit.expectation_value(angles, a)
+            >= circuit.expectation_value(start, a))
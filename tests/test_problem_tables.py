@@ -0,0 +1,104 @@
+import multiprocessing
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+
+import instances
+import knapsack
+import native
+import problem_tables
+from knapsack import toy_problems
+
+
+def test_problem_tables():
+    problem = toy_problems[6]
+    tables = problem_tables.ProblemTables.compute(problem)
+    assert tables.N == problem.N
+    expected = knapsack.best_known_solutions(problem)
+    assert np.array_equal(tables.best_known_solutions(), expected)
+    assert tables.best_value() == knapsack.value(expected[0], problem)
+    choice = np.array([1, 0, 1, 1])
+    index = 0b1101
+    assert tables.values[index] == knapsack.value(choice, problem)
+    assert (tables.feasible[index]
+            == knapsack.is_choice_feasible(choice, problem))
+
+
+def test_save_load(tmp_path):
+    tables = problem_tables.ProblemTables.compute(toy_problems[4])
+    tables.save(tmp_path)
+    loaded = problem_tables.ProblemTables.load(tmp_path)
+    assert isinstance(loaded.values, np.memmap)
+    assert loaded.max_weight == tables.max_weight
+    assert np.array_equal(loaded.best_choices(), tables.best_choices())
+
+
+def worker_best_value(index):
+    worker_tables = problem_tables.worker_tables()
+    with pytest.raises(ValueError):
+        worker_tables.values[index] = 0
+    return worker_tables.best_value(), int(worker_tables.values[index])
+
+
+def test_shared_tables():
+    problem = instances.random_problem(10, seed=2)
+    tables = problem_tables.ProblemTables.compute(problem)
+    context = multiprocessing.get_context("spawn")
+    with tables.publish() as shared:
+        attached = problem_tables.ProblemTables.attach(shared.handle)
+        assert np.array_equal(attached.weights, tables.weights)
+        with context.Pool(2, initializer=problem_tables.attach_worker,
+                          initargs=(shared.handle,)) as pool:
+            results = pool.map(worker_best_value, [3, 700])
+        del attached
+    assert results == [(tables.best_value(),
+                        int(tables.values[index])) for index in [3, 700]]
+
+
+def simulations(problem):
+    return [(native.NativeLinQAOA(problem, 1), (2,)),
+            (native.NativeQuadQAOA(problem, 1), (1, 2)),
+            (native.NativeQuantumWalkQAOA(problem, 1, 2), ())]
+
+
+def worker_simulate(problem):
+    summed = []
+    basis_sums = native.Basis.sums
+    computational_sums = native.computational_sums
+
+    def recorded_basis_sums(basis, coefficients):
+        summed.append(coefficients)
+        return basis_sums(basis, coefficients)
+
+    def recorded_computational_sums(coefficients, indices):
+        summed.append(coefficients)
+        return computational_sums(coefficients, indices)
+
+    def no_feasible_choices(*args, **kwargs):
+        raise AssertionError("the feasible choices are enumerated")
+
+    native.Basis.sums = recorded_basis_sums
+    native.computational_sums = recorded_computational_sums
+    knapsack.feasible_choices = no_feasible_choices
+    results = [simulation.comparable_expectation_value([0.3, 0.4], *penalties)
+               for simulation, penalties in simulations(problem)]
+    best = problem_tables.best_known_solutions(problem)
+    # only the weight register of QuadQAOA is summed up
+    assert all(not any(coefficients[:problem.N]) for coefficients in summed)
+    return results, best
+
+
+def test_attached_tables_are_used():
+    problem = knapsack.KnapsackProblem([3, 1, 4, 1, 5], [2, 7, 1, 8, 2], 9)
+    expected = ([simulation.comparable_expectation_value([0.3, 0.4], *penalties)
+                 for simulation, penalties in simulations(problem)],
+                knapsack.best_known_solutions(problem))
+    context = multiprocessing.get_context("spawn")
+    with problem_tables.ProblemTables.compute(problem).publish() as shared:
+        with context.Pool(1, initializer=problem_tables.attach_worker,
+                          initargs=(shared.handle,)) as pool:
+            results, best = pool.apply(worker_simulate, (problem,))
+    assert np.allclose(results, expected[0])
+    assert np.array_equal(best, expected[1])
@@ -0,0 +1,56 @@
+import sys
+sys.path.append("../code/")
+
+import pytest
+
+import circuits
+import resources
+from knapsack import KnapsackProblem, toy_problems
+
+
+problems = [
+    toy_problems[0],
+    toy_problems[4],
+    toy_problems[6],
+    KnapsackProblem(values=[3, 1, 4, 1, 5], weights=[2, 7, 1, 8, 2],
+                    max_weight=9),
+]
+
+
+@pytest.mark.parametrize("problem", problems)
+@pytest.mark.parametrize("p", [1, 2])
+def test_linqaoa_resources(problem, p):
+    built = resources.circuit_resources(circuits.LinQAOA(problem, p))
+    estimate = resources.linqaoa_resources(problem, p)
+    assert estimate.qubits == built.qubits
+    assert estimate.gate_counts == built.gate_counts
+    assert estimate.depth == built.depth
+
+
+@pytest.mark.parametrize("problem", problems)
+@pytest.mark.parametrize("p", [1, 2])
+def test_quadqaoa_resources(problem, p):
+    built = resources.circuit_resources(circuits.QuadQAOA(problem, p))
+    estimate = resources.quadqaoa_resources(problem, p)
+    assert estimate.qubits == built.qubits
+    assert estimate.gate_counts == built.gate_counts
+    assert estimate.depth == built.depth
+
+
+@pytest.mark.parametrize("problem", problems[:3])
+@pytest.mark.parametrize("p, m", [(1, 1), (2, 3)])
+def test_qwqaoa_resources(problem, p, m):
+    built = resources.circuit_resources(circuits.QuantumWalkQAOA(problem, p, m))
+    estimate = resources.qwqaoa_resources(problem, p, m)
+    assert estimate.qubits == built.qubits
+    assert estimate.gate_counts == built.gate_counts
+    assert estimate.depth == built.depth
+
+
+def test_statevector_memory():
+    estimate = resources.quadqaoa_resources(toy_problems[6], 1, depth=False)
+    assert estimate.depth is None
+    assert estimate.statevector_memory() == 2**8 * 16
+    assert estimate.statevector_memory("single") == 2**8 * 8
+    assert estimate.fits_in_memory(2**12)
+    assert not estimate.fits_in_memory(2**11)
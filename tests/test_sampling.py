@@ -0,0 +1,74 @@
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+import pytest
+
+import circuits
+import linqaoa
+import native
+import quadqaoa
+import qwqaoa
+import sampling
+from knapsack import toy_problems
+
+
+angles = np.array([0.3, 0.7, 0.5, 0.2])
+
+
+def test_decode():
+    outcomes = sampling.decode(["000", "001", "110", "101"])
+    assert list(outcomes) == [0, 1, 6, 5]
+    samples = sampling.Samples(outcomes, [1, 1, 1, 1], 3)
+    assert samples.bits()[2].tolist() == [0, 1, 1]
+
+
+def test_cvar():
+    samples = sampling.Samples([0, 1, 2], [2, 1, 1], 2)
+    values = np.array([0, 4, 2])
+    assert samples.cvar(values)[0] == pytest.approx(1.5)
+    assert samples.cvar(values, 0.25)[0] == pytest.approx(4)
+    assert samples.cvar(values, 0.5)[0] == pytest.approx(3)
+    merged = samples.merge(sampling.Samples([2, 3], [1, 1], 2))
+    assert merged.outcomes.tolist() == [0, 1, 2, 3]
+    assert merged.counts.tolist() == [2, 1, 2, 1]
+
+
+@pytest.mark.parametrize("native_circuit", [False, True])
+def test_sampled_expectation_value(native_circuit):
+    problem = toy_problems[3]
+    a = linqaoa.amin(problem)
+    if native_circuit:
+        circuit = native.NativeLinQAOA(problem, 2)
+    else:
+        circuit = circuits.LinQAOA(problem, 2)
+    exact = linqaoa.get_expectation_value(circuit, problem, angles, a)
+    config = sampling.SamplingConfig(shots=20000, seed=1)
+    sampled = linqaoa.get_expectation_value(circuit, problem, angles, a, config)
+    assert sampled == pytest.approx(exact, abs=0.2)
+
+
+def test_sampled_quadqaoa_and_qwqaoa():
+    problem = toy_problems[0]
+    config = sampling.SamplingConfig(shots=20000, seed=2)
+    circuit = native.NativeQuadQAOA(problem, 2)
+    exact = quadqaoa.get_expectation_value(circuit, problem, angles, 1, 4)
+    sampled = quadqaoa.get_expectation_value(circuit, problem, angles, 1, 4,
+                                             config)
+    assert sampled == pytest.approx(exact, abs=0.5)
+    circuit = circuits.QuantumWalkQAOA(problem, 2, 2)
+    exact = qwqaoa.get_expectation_value(circuit, problem, angles)
+    sampled = qwqaoa.get_expectation_value(circuit, problem, angles, config)
+    assert sampled == pytest.approx(exact, abs=0.1)
+
+
+def test_adaptive_shots():
+    problem = toy_problems[3]
+    circuit = native.NativeLinQAOA(problem, 1)
+    config = sampling.SamplingConfig(shots=100, max_shots=1600, seed=3)
+    objective = linqaoa.sampled_objective(circuit, problem, 1, config)
+    objective(angles[:2])
+    assert objective.total_shots == 1600
+    objective.best = np.inf
+    objective(angles[:2])
+    assert objective.total_shots == 1700
@@ -0,0 +1,71 @@
+import sys
+sys.path.append("../code/")
+
+import pytest
+from qiskit import transpile
+
+import circuits
+import linqaoa
+import quadqaoa
+import simulation as sim
+from knapsack import toy_problems
+
+
+def test_precision_downgrade():
+    budget = sim.required_memory(21, "single")
+    config = sim.SimulationConfig(memory_budget=budget)
+    assert config.precision_for(20) == "double"
+    assert config.precision_for(21) == "single"
+    with pytest.raises(sim.MemoryBudgetExceeded):
+        config.precision_for(22)
+
+
+def test_no_precision_downgrade():
+    config = sim.SimulationConfig(memory_budget=sim.required_memory(20),
+                                  allow_downgrade=False)
+    with pytest.raises(sim.MemoryBudgetExceeded):
+        config.precision_for(21)
+
+
+def test_method_switch():
+    config = sim.SimulationConfig(memory_budget=sim.required_memory(20))
+    assert config.method_for(20) == "statevector"
+    assert config.method_for(22) == "matrix_product_state"
+    assert config.method_for(10, "quadqaoa") == "statevector"
+    assert config.method_for(30, "quadqaoa") == "matrix_product_state"
+    config.allow_method_switch = False
+    with pytest.raises(sim.MemoryBudgetExceeded):
+        config.method_for(22)
+
+
+def test_matrix_product_state_probabilities():
+    problem = toy_problems[4]
+    circuit = circuits.QuadQAOA(problem, 2)
+    transpiled_circuit = transpile(circuit, sim.backend)
+    parameter_dict = quadqaoa.to_parameter_dict([0.3, 0.2, 0.5, 0.1], 1, 5,
+                                                circuit)
+    statevector_config = sim.SimulationConfig()
+    mps_config = sim.SimulationConfig(mps_qubits={"quadqaoa": 1})
+    for qubits in [range(problem.N), None]:
+        expected = sim.get_probabilities(transpiled_circuit, parameter_dict,
+                                         qubits, "quadqaoa", statevector_config)
+        probs = sim.get_probabilities(transpiled_circuit, parameter_dict,
+                                      qubits, "quadqaoa", mps_config)
+        assert probs.keys() == expected.keys()
+        for key, value in expected.items():
+            assert probs[key] == pytest.approx(value)
+
+
+def test_sweep():
+    problems = [toy_problems[0], toy_problems[3], toy_problems[1]]
+    a = 3
+
+    def prepare(problem):
+        return linqaoa.prepare_circuit(problem, 1)
+
+    def evaluate(problem, circuit):
+        return linqaoa.approximation_ratio(problem, 1, a, circuit=circuit)
+
+    ratios = sim.sweep(problems, prepare, evaluate)
+    assert ratios == [linqaoa.approximation_ratio(problem, 1, a)
+                      for problem in problems]
@@ -0,0 +1,60 @@
+import sys
+sys.path.append("../code/")
+
+import numpy as np
+
+import linqaoa
+import native
+import surrogate
+from knapsack import toy_problems
+
+
+def test_interpolate_angles():
+    angles = np.array([0.0, 1.0, 1.0, 2.0])
+    assert np.allclose(surrogate.interpolate_angles(angles, 2), angles)
+    assert np.allclose(surrogate.interpolate_angles(angles, 1), [0.5, 1.5])
+    assert np.allclose(surrogate.interpolate_angles(angles, 4)[0::2],
+                       [0, 0.25, 0.75, 1])
+
+
+def test_gaussian_process():
+    bounds = np.array([[0, 1], [0, 2]])
+    x = np.random.default_rng(0).uniform(0, 1, (20, 2)) * [1, 2]
+    y = np.sin(3 * x[:, 0]) + x[:, 1]
+    model = surrogate.GaussianProcess(bounds)
+    model.fit(x, y, np.zeros(len(y)))
+    mean, std = model.predict(x)
+    assert np.allclose(mean, y, atol=1e-3)
+    assert np.all(std < 1e-2)
+
+
+def test_surrogate_optimizer():
+    problem = toy_problems[6]
+    a = 2 * linqaoa.amin(problem)
+    circuit = native.NativeLinQAOA(problem, 2)
+    optimizer = surrogate.SurrogateOptimizer(budget=30, seed=0)
+    angles = linqaoa.find_optimal_angles(circuit, problem, a,
+                                         optimizer=optimizer)
+    shgo_angles = linqaoa.find_optimal_angles(circuit, problem, a)
+    assert (circuit.expectation_value(angles, a)
+            >= circuit.expectation_value(shgo_angles, a))
+    assert len(optimizer.history) == 30
+    assert optimizer.seeds is optimizer.history
+    # the next sweep point is seeded with the evaluations of this one
+    circuit = native.NativeLinQAOA(problem, 3)
+    linqaoa.find_optimal_angles(circuit, problem, a, optimizer=optimizer)
+    assert len(optimizer.history) == 30
+
+
+def test_evaluations_save_load(tmp_path):
+    evaluations = surrogate.Evaluations()
+    evaluations.add([0.1, 0.2], -1.5)
+    evaluations.add([0.1, 0.2, 0.3, 0.4], 2)
+    evaluations.save(tmp_path / "evaluations.json")
+    loaded = surrogate.Evaluations.load(tmp_path / "evaluations.json")
+    assert len(loaded) == 2
+    assert loaded.values == evaluations.values
+    assert all(np.array_equal(x, y)
+               for x, y in zip(loaded.angles, evaluations.angles))
+    optimizer = surrogate.SurrogateOptimizer(seeds=tmp_path / "evaluations.json")
+    assert optimizer.seeds.values == evaluations.values
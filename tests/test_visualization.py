@@ -0,0 +1,37 @@
+import sys
+sys.path.append("../code/")
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+
+import visualization
+
+
+def test_probabilities_array():
+    probs = {"01": 0.25, "10": 0.75}
+    assert visualization.probabilities_array(probs, 2).tolist() == [0, 0.25, 0.75, 0]
+
+
+def test_aggregations():
+    probabilities = np.array([0.1, 0.4, 0.2, 0.3])
+    indices, heights, other = visualization.top_choices(probabilities, 2)
+    assert indices.tolist() == [1, 3]
+    assert np.isclose(other, 0.3)
+    values = np.array([0, 2, 2, 5])
+    centers, heights = visualization.value_distribution(probabilities, values)
+    assert centers.tolist() == [0, 2, 5]
+    assert np.allclose(heights, [0.1, 0.6, 0.3])
+    centers, heights = visualization.value_distribution(probabilities, values, 1)
+    assert np.allclose(heights, [1])
+
+
+def test_hist_top():
+    with matplotlib.rc_context():
+        visualization.use_fast_backend()
+        probabilities = np.random.default_rng(0).random(2**16)
+        fig, ax = matplotlib.pyplot.subplots()
+        visualization.hist_top(ax, probabilities / probabilities.sum(), 16, k=10)
+        fig.canvas.draw()
+        assert len(ax.patches) == 11
+        matplotlib.pyplot.close(fig)